@@ -2,6 +2,8 @@
 ASGI config for Hello project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. uvicorn) to keep the live order status
+stream (``/status/events/``) open without tying up a worker per client.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
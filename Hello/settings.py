@@ -107,12 +107,89 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'unique-snowflake',
-    }
+    },
+    # Rate-limit counters live in the database so all workers share one limit
+    'ratelimit': {
+        'BACKEND': 'home.ratelimit_cache.CounterCache',
+        'TIMEOUT': 300,
+        'OPTIONS': {'PURGE_INTERVAL': 300},  # Seconds between deletes of expired windows
+    },
+}
+
+# Production: a per-process LRU (L1) in front of the database cache (L2), shared by
+# all workers and servers. Only the key families in L1_NAMESPACES are kept in L1;
+# a write to one bumps that namespace's stamp so other workers drop their copies
+# (home/tiered_cache.py). Sessions and users are in L1 so a logged-in page view
+# reads neither cache_table nor the auth tables once warm; a logout or password
+# change reaches other workers within STAMP_CHECK_INTERVAL. Fragments and the rest
+# go straight to L2. Needs `python manage.py createcachetable`.
+PRODUCTION_CACHES = {
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'cache_table',
+    },
+    'default': {
+        'BACKEND': 'home.tiered_cache.TieredCache',
+        'OPTIONS': {
+            'L2_CACHE': 'shared',
+            'L1_MAX_ENTRIES': 10000,  # About three per active user (session, pointer, user)
+            'L1_TIMEOUT': 60,  # Longest a worker keeps a value without asking L2
+            'STAMP_CHECK_INTERVAL': 1,  # Seconds before another worker's write is seen
+            'L1_NAMESPACES': {
+                'cache_version': 'cache_version:',  # Content versions, read on every page
+                'pexels': 'pexels:',  # Pexels API results
+                'auth_user': 'auth_user:',  # Session users (home/auth_backends.py)
+                'sessions': 'django.contrib.sessions.cached_db',  # cached_db session keys
+            },
+        },
+    },
 }
+if not DEBUG:
+    CACHES.update(PRODUCTION_CACHES)
 
 # Cache timeout for API responses (1 hour)
 API_CACHE_TIMEOUT = 3600
 
+# Cache timeout for users loaded by AuthenticationMiddleware; saving a user drops it
+USER_CACHE_TIMEOUT = 3600
+
+# Cache timeout for versioned page fragments (1 day); edits invalidate them sooner
+CONTENT_CACHE_TIMEOUT = 86400
+
+# Live order status (Server-Sent Events)
+ORDER_EVENTS_POLL_INTERVAL = 15  # Seconds between DB polls / keepalives per stream
+ORDER_EVENTS_MAX_DURATION = 300  # Seconds before a stream closes and the browser reconnects
+
+# Order webhooks (delivered by `python manage.py deliver_webhooks`)
+WEBHOOK_BATCH_SIZE = 50  # Events per POST when several are pending for one endpoint
+WEBHOOK_MAX_ATTEMPTS = 8  # Give up (status "failed") after this many attempts
+WEBHOOK_BACKOFF_BASE = 30  # Seconds before the first retry; doubles on each failure
+WEBHOOK_BACKOFF_MAX = 3600  # Upper bound for the retry delay
+WEBHOOK_TIMEOUT = 10  # Seconds per HTTP request
+WEBHOOK_WORKERS = 8  # Concurrent HTTP requests per worker process
+WEBHOOK_ENDPOINT_CONCURRENCY = 2  # Concurrent requests to any one endpoint
+WEBHOOK_ALLOW_PRIVATE_ADDRESSES = False  # Allow endpoints on private/loopback networks (local testing only)
+
+
+# Password hashing
+# With argon2-cffi installed new passwords use Argon2id with the parameters below, and
+# PBKDF2 hashes are upgraded when their user next logs in. Measure the cost per login
+# with `python manage.py benchmark_login` before changing them.
+ARGON2_TIME_COST = 2
+ARGON2_MEMORY_COST = 19456  # KiB (19 MiB)
+ARGON2_PARALLELISM = 1
+
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+try:
+    import argon2  # noqa: F401
+    PASSWORD_HASHERS.insert(0, 'home.hashers.TunedArgon2PasswordHasher')
+except ImportError:  # Optional; PBKDF2 stays the default without it
+    pass
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -154,9 +231,31 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'home', 'static'),  # Adjusted to point to the correct path
 ]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# Production collectstatic writes content-hashed names (cacheable forever), .gz/.br
+# copies of text assets and smaller WebP/AVIF versions of raster images; see
+# home/static_storage.py and the {% static_picture %} tag.
+if not DEBUG:
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'home.static_storage.OptimizedStaticFilesStorage'},
+    }
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Protected order attachments (/orders/<id>/attachment/): after the ownership check the
+# transfer is handed to the front proxy. 'nginx' sends X-Accel-Redirect to
+# SENDFILE_URL_PREFIX (an `internal` location aliased to MEDIA_ROOT), 'apache' sends
+# X-Sendfile; empty streams the file from Django with Range support.
+SENDFILE_BACKEND = os.getenv('SENDFILE_BACKEND', '')
+SENDFILE_URL_PREFIX = '/protected-media/'
+
+# Resumable (tus-style) attachment uploads at /api/uploads/
+CHUNKED_UPLOAD_DIR = os.path.join(MEDIA_ROOT, 'partial_uploads')  # Parts being assembled
+CHUNKED_UPLOAD_MAX_SIZE = 1024 * 1024 * 1024  # 1 GB per file
+CHUNKED_UPLOAD_EXPIRY = 86400  # Seconds an unfinished upload is kept
+CHUNKED_UPLOAD_LEASE = 600  # Seconds one PATCH may hold an upload before another can take over
+
 INTERNAL_IPS = [
     # ...
     "127.0.0.1",
@@ -193,6 +292,11 @@ PHONENUMBER_DEFAULT_REGION = os.getenv('PHONENUMBER_DEFAULT_REGION', None)
 PHONENUMBER_DB_FORMAT = 'INTERNATIONAL'  # Store in international format
 
 # Session Configuration
+# Sessions are read from the cache and written through to the database, and users
+# come from the cache too (see PRODUCTION_CACHES for how they stay off cache_table).
+# home.session_utils is cached_db plus moving old ModelBackend sessions to the cached backend.
+SESSION_ENGINE = 'home.session_utils'
+AUTHENTICATION_BACKENDS = ['home.auth_backends.CachedModelBackend']
 # Default session age (7 days) if remember me is not used
 SESSION_COOKIE_AGE = 604800  # 7 days in seconds
 SESSION_COOKIE_NAME = 'enterprise_sessionid'
@@ -202,6 +306,13 @@ SESSION_COOKIE_SAMESITE = 'Lax'  # CSRF protection
 SESSION_SAVE_EVERY_REQUEST = False  # Don't update session on every request
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False  # Default to not expiring (overridden by remember me)
 
+# Maintenance commands run by `manage.py run_scheduler`: {command: seconds between runs}
+SCHEDULED_JOBS = {
+    'clear_expired_sessions': 3600,
+    'clear_expired_uploads': 3600,
+}
+
 # Rate limiting configuration
 RATELIMIT_VIEW = 'home.views.ratelimit_error'  # Custom error view
+RATELIMIT_USE_CACHE = 'ratelimit'  # Shared counter table (home/ratelimit_cache.py)
 RATELIMIT_ENABLE = not DEBUG and 'test' not in sys.argv  # Disable in DEBUG and test modes
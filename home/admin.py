@@ -1,6 +1,23 @@
-from django.contrib import admin
+import csv
+import io
+
+from django.contrib import admin, messages
+from django.contrib.auth.admin import UserAdmin
+from django.contrib.auth.models import User
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.utils import timezone
+from django.urls import path, reverse
 from django.utils.html import format_html
-from home.models import Contact, Order, AuditLog, ServicePage, PartnerLogo
+from home.models import (
+    Contact, Order, OrderLine, AuditLog, ServicePage, PartnerLogo, Client,
+    WebhookSubscription, WebhookDelivery, StoredBlob
+)
+from home.search_utils import fuzzy_search_orders
+from home.export_utils import export_orders_response
+from home.forms import ClientAdminForm, UserProvisionForm
+from home.provision_utils import ADMIN_PROVISION_MAX_ROWS, provision_users_csv
+from home.paginators import EstimatedCountPaginator
 
 
 @admin.register(AuditLog)
@@ -28,6 +45,11 @@ class AuditLogAdmin(admin.ModelAdmin):
     # Number of items per page
     list_per_page = 50
     
+    # Constant queries per page: users joined in, table size estimated
+    list_select_related = ('user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
     # Disable add/delete permissions for audit logs
     def has_add_permission(self, request):
         return False
@@ -55,6 +77,7 @@ class AuditLogAdmin(admin.ModelAdmin):
             'profile_update': '#ffc107',  # Yellow
             'password_change': '#fd7e14', # Orange
             'order_created': '#007bff',   # Blue
+            'orders_imported': '#0056b3', # Dark blue
             'order_updated': '#6610f2',   # Indigo
             'order_status_changed': '#e83e8c',  # Pink
             'contact_submitted': '#20c997',     # Teal
@@ -107,6 +130,11 @@ class ContactAdmin(admin.ModelAdmin):
     # Number of items per page
     list_per_page = 20
     
+    # Constant queries per page: users joined in, table size estimated
+    list_select_related = ('user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
     # Fieldsets for organized form layout
     fieldsets = (
         ('Contact Information', {
@@ -173,12 +201,22 @@ class ContactAdmin(admin.ModelAdmin):
         return self.model.all_objects.get_queryset()
 
 
+class OrderLineInline(admin.TabularInline):
+    """Line items of a multi-line order."""
+    model = OrderLine
+    fields = ('position', 'item', 'quantity')
+    extra = 0
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     """Enhanced admin interface for Order model with status management."""
     
+    inlines = [OrderLineInline]
+    
     # List display configuration
     list_display = (
+        'thumbnail_preview',
         'title', 
         'client_name', 
         'user_link',
@@ -196,7 +234,7 @@ class OrderAdmin(admin.ModelAdmin):
     search_fields = ('title', 'client_name', 'description', 'user__username')
     
     # Read-only fields
-    readonly_fields = ('created_at', 'updated_at', 'user')
+    readonly_fields = ('created_at', 'updated_at', 'user', 'client', 'file_name', 'thumbnail_preview')
     
     # Date hierarchy
     date_hierarchy = 'created_at'
@@ -207,13 +245,18 @@ class OrderAdmin(admin.ModelAdmin):
     # Number of items per page
     list_per_page = 20
     
+    # Constant queries per page: users joined in, table size estimated
+    list_select_related = ('user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
     # Fieldsets for organized form layout
     fieldsets = (
         ('Order Information', {
-            'fields': ('title', 'description', 'client_name')
+            'fields': ('title', 'description', 'client_name', 'client')
         }),
         ('Order Details', {
-            'fields': ('quantity', 'priority', 'status', 'file')
+            'fields': ('quantity', 'priority', 'status', 'file', 'file_name', 'thumbnail_preview')
         }),
         ('System Information', {
             'fields': ('user', 'created_at', 'updated_at'),
@@ -232,6 +275,16 @@ class OrderAdmin(admin.ModelAdmin):
         return '-'
     user_link.short_description = 'User'
     
+    def thumbnail_preview(self, obj):
+        """Show the generated attachment thumbnail (never the full image)."""
+        if obj.thumbnail:
+            return format_html(
+                '<img src="{}" alt="" loading="lazy" style="max-width: 64px; max-height: 64px; border-radius: 3px;">',
+                reverse('order_thumbnail', args=[obj.pk])
+            )
+        return '-'
+    thumbnail_preview.short_description = 'Preview'
+    
     def priority_badge(self, obj):
         """Display priority with color-coded badge."""
         if obj.priority == 'Urgent':
@@ -272,36 +325,38 @@ class OrderAdmin(admin.ModelAdmin):
         'mark_as_cancelled',
         'mark_as_urgent',
         'soft_delete_orders',
-        'restore_orders'
+        'restore_orders',
+        'export_as_csv',
+        'export_as_ndjson'
     ]
     
     def mark_as_processing(self, request, queryset):
         """Mark selected orders as Processing."""
-        updated = queryset.update(status='Processing')
+        updated = queryset.update(status='Processing', updated_at=timezone.now())
         self.message_user(request, f'{updated} order(s) marked as Processing.')
     mark_as_processing.short_description = 'Mark as Processing'
     
     def mark_as_shipped(self, request, queryset):
         """Mark selected orders as Shipped."""
-        updated = queryset.update(status='Shipped')
+        updated = queryset.update(status='Shipped', updated_at=timezone.now())
         self.message_user(request, f'{updated} order(s) marked as Shipped.')
     mark_as_shipped.short_description = 'Mark as Shipped'
     
     def mark_as_delivered(self, request, queryset):
         """Mark selected orders as Delivered."""
-        updated = queryset.update(status='Delivered')
+        updated = queryset.update(status='Delivered', updated_at=timezone.now())
         self.message_user(request, f'{updated} order(s) marked as Delivered.')
     mark_as_delivered.short_description = 'Mark as Delivered'
     
     def mark_as_cancelled(self, request, queryset):
         """Mark selected orders as Cancelled."""
-        updated = queryset.update(status='Cancelled')
+        updated = queryset.update(status='Cancelled', updated_at=timezone.now())
         self.message_user(request, f'{updated} order(s) marked as Cancelled.')
     mark_as_cancelled.short_description = 'Mark as Cancelled'
     
     def mark_as_urgent(self, request, queryset):
         """Mark selected orders as Urgent priority."""
-        updated = queryset.update(priority='Urgent')
+        updated = queryset.update(priority='Urgent', updated_at=timezone.now())
         self.message_user(request, f'{updated} order(s) marked as Urgent.')
     mark_as_urgent.short_description = 'Mark as Urgent Priority'
     
@@ -324,9 +379,89 @@ class OrderAdmin(admin.ModelAdmin):
         self.message_user(request, f'{count} order(s) restored.')
     restore_orders.short_description = 'Restore deleted orders'
     
+    def export_as_csv(self, request, queryset):
+        """Stream selected orders as a CSV download."""
+        return export_orders_response(queryset, 'csv')
+    export_as_csv.short_description = 'Export selected orders as CSV'
+    
+    def export_as_ndjson(self, request, queryset):
+        """Stream selected orders as an NDJSON download."""
+        return export_orders_response(queryset, 'ndjson')
+    export_as_ndjson.short_description = 'Export selected orders as NDJSON'
+    
     def get_queryset(self, request):
         """Show all orders including deleted in admin."""
         return self.model.all_objects.get_queryset()
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Extend the standard search with fuzzy title/client name matches."""
+        base_queryset = queryset
+        queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            fuzzy_ids = [order.pk for order in fuzzy_search_orders(search_term, base_queryset)]
+            if fuzzy_ids:
+                queryset |= base_queryset.filter(pk__in=fuzzy_ids)
+        return queryset, may_have_duplicates
+
+
+@admin.register(Client)
+class ClientAdmin(admin.ModelAdmin):
+    """Admin interface for normalized clients with per-client order totals."""
+    
+    list_display = ('name', 'normalized_name', 'order_count', 'total_quantity', 'created_at')
+    search_fields = ('name', 'normalized_name')
+    readonly_fields = ('normalized_name', 'order_count', 'total_quantity', 'created_at')
+    ordering = ('-order_count', 'name')
+    list_per_page = 50
+    
+    form = ClientAdminForm
+    actions = ['recalculate_counters']
+    
+    def recalculate_counters(self, request, queryset):
+        """Recompute order and quantity counters from the orders table."""
+        updated = Client.objects.recalculate_counters(queryset.values('pk'))
+        self.message_user(request, f'Counters recalculated for {updated} client(s).')
+    recalculate_counters.short_description = 'Recalculate order counters'
+
+
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class ProvisioningUserAdmin(UserAdmin):
+    """Django's user admin plus a page for creating users in bulk from a CSV file."""
+    
+    change_list_template = 'admin/auth/user/provision_change_list.html'
+    
+    def get_urls(self):
+        return [
+            path('provision/', self.admin_site.admin_view(self.provision_view), name='auth_user_provision'),
+        ] + super().get_urls()
+    
+    def provision_view(self, request):
+        if not self.has_add_permission(request):
+            return redirect('admin:auth_user_changelist')
+        result = None
+        form = UserProvisionForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            try:
+                stream = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+                result = provision_users_csv(stream, request=request, send_emails=form.cleaned_data['send_emails'],
+                                             max_rows=ADMIN_PROVISION_MAX_ROWS)
+            except (UnicodeDecodeError, csv.Error):
+                form.add_error('file', 'The file is not valid UTF-8 CSV.')
+            else:
+                messages.success(request, f'Created {result.created} user(s); {result.rejected} row(s) rejected.')
+                if not result.rejected:
+                    return redirect('admin:auth_user_changelist')
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Provision users from CSV',
+            'form': form,
+            'result': result,
+        }
+        return TemplateResponse(request, 'admin/auth/user/provision_users.html', context)
 
 
 # Customize admin site headers
@@ -386,15 +521,69 @@ class PartnerLogoAdmin(admin.ModelAdmin):
         ('Display Settings', {
             'fields': ('order', 'is_active')
         }),
+        ('Image Variants', {
+            'fields': ('width', 'height', 'variants'),
+            'classes': ('collapse',)
+        }),
     )
+    readonly_fields = ('width', 'height', 'variants')
     
     def logo_preview(self, obj):
         """Display logo preview in admin list."""
         if obj.logo:
             return format_html(
                 '<img src="{}" style="max-height: 50px; max-width: 100px; border-radius: 5px;" />',
-                obj.logo.url
+                obj.variant_url('webp_1x') or obj.logo.url
             )
         return '-'
     logo_preview.short_description = 'Logo'
 
+
+@admin.register(WebhookSubscription)
+class WebhookSubscriptionAdmin(admin.ModelAdmin):
+    """Admin interface for user webhook endpoints."""
+    
+    list_display = ('url', 'user', 'is_active', 'created_at')
+    list_filter = ('is_active', 'created_at')
+    list_select_related = ('user',)
+    search_fields = ('url', 'user__username')
+    readonly_fields = ('created_at',)
+
+
+@admin.register(WebhookDelivery)
+class WebhookDeliveryAdmin(admin.ModelAdmin):
+    """Admin interface for the webhook outbox."""
+    
+    list_display = ('event_type', 'subscription', 'status', 'attempts', 'next_attempt_at', 'delivered_at', 'last_error')
+    list_filter = ('status', 'event_type')
+    list_select_related = ('subscription__user',)  # Subscription.__str__ shows the user
+    search_fields = ('subscription__url', 'last_error')
+    readonly_fields = ('subscription', 'event_type', 'payload', 'created_at', 'delivered_at', 'attempts', 'last_error')
+    list_per_page = 50
+    
+    actions = ['retry_deliveries']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def retry_deliveries(self, request, queryset):
+        """Reschedule selected deliveries for immediate delivery."""
+        updated = queryset.exclude(status='delivered').update(
+            status='pending', attempts=0, next_attempt_at=timezone.now(), locked_until=None
+        )
+        self.message_user(request, f'{updated} delivery(ies) rescheduled.')
+    retry_deliveries.short_description = 'Retry selected deliveries now'
+
+
+@admin.register(StoredBlob)
+class StoredBlobAdmin(admin.ModelAdmin):
+    """Read-only view of deduplicated attachment files."""
+    
+    list_display = ('name', 'size', 'ref_count', 'thumbnail_status', 'created_at')
+    list_filter = ('thumbnail_status',)
+    search_fields = ('digest', 'name')
+    readonly_fields = ('digest', 'name', 'size', 'ref_count', 'thumbnail', 'thumbnail_status', 'created_at')
+    ordering = ('-ref_count',)
+    
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,85 @@
+"""
+Authentication backend that keeps session users in the cache.
+
+AuthenticationMiddleware resolves ``request.user`` through the backend's
+``get_user`` on every request. ModelBackend does that with a query on
+auth_user each time; this backend loads each user from the database once
+and then serves it from the cache.
+
+Cached users are keyed by a short digest of their password hash, and
+``auth_user:<id>`` points at the current digest. A signal
+(``invalidate_cached_user``) drops the pointer whenever the user is saved
+or deleted. Every successful login also re-points it from the database, so
+a password changed through ``update()`` or ``bulk_update()``, which skip
+the signal, takes effect at the next login instead of the new session
+being checked against the old hash. Otherwise it takes effect within
+USER_CACHE_TIMEOUT. The cached copy includes the password hash, so
+Django's session-hash check still logs out other sessions.
+
+In production the cache is TieredCache over the database cache, and
+``auth_user:`` is one of its L1 namespaces (Hello/settings.py), so a warm
+user is read from the worker's own memory rather than from cache_table. A
+save or login elsewhere reaches the other workers within
+STAMP_CHECK_INTERVAL.
+
+Sessions created before this backend stored ModelBackend's path. The
+session store (home/session_utils.py) rewrites it when such a session is
+next loaded, so ModelBackend itself does not have to stay in
+AUTHENTICATION_BACKENDS, where every failed login would hash the password
+a second time.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+LEGACY_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+CACHED_BACKEND = 'home.auth_backends.CachedModelBackend'
+
+
+def password_digest(user):
+    """Short hash of ``user.password``; changes whenever the password does."""
+    return hashlib.sha256(user.password.encode()).hexdigest()[:16]
+
+
+def user_pointer_key(user_id):
+    return f'auth_user:{user_id}'
+
+
+def user_cache_key(user_id, digest):
+    return f'auth_user:{user_id}:{digest}'
+
+
+def cache_user(user):
+    """Store a user just loaded from the database and point its id at it."""
+    digest = password_digest(user)
+    cache.set_many({
+        user_cache_key(user.pk, digest): user,
+        user_pointer_key(user.pk): digest,
+    }, settings.USER_CACHE_TIMEOUT)
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend whose get_user reads through the cache."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user = super().authenticate(request, username=username, password=password, **kwargs)
+        if user is not None:
+            cache_user(user)
+        return user
+
+    def get_user(self, user_id):
+        digest = cache.get(user_pointer_key(user_id))
+        user = cache.get(user_cache_key(user_id, digest)) if digest else None
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache_user(user)
+            return user
+        return user if self.user_can_authenticate(user) else None
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_pointer_key(user_id))
+
@@ -0,0 +1,44 @@
+"""
+Utility functions for versioned cache keys.
+
+Cached content is stored under keys that include a namespace version. Bumping
+the version makes every key built from the old one unreachable, so related
+entries can be invalidated together without knowing their individual keys.
+"""
+import time
+
+from django.core.cache import cache
+
+# Services page content and partner logos
+SERVICES_PAGE_NAMESPACE = 'services_page'
+
+
+def _version_key(namespace):
+    # Own ':' namespace, so the two-tier cache invalidates it apart from other keys
+    return f'cache_version:{namespace}'
+
+
+def _new_version():
+    # Millisecond clock: a version re-created after eviction never reuses an old value
+    return int(time.time() * 1000)
+
+
+def get_cache_version(namespace):
+    """Return the current version for a cache namespace, creating it if missing."""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_cache_version(namespace):
+    """Invalidate everything cached under a namespace by moving to a new version."""
+    key = _version_key(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _new_version()
+        cache.set(key, version, None)
+        return version
@@ -0,0 +1,139 @@
+"""
+Utility functions for serving protected files (order attachments).
+
+Views check permissions and then call ``protected_file_response``. With a
+front proxy configured (SENDFILE_BACKEND) the response is an empty body
+with an X-Accel-Redirect or X-Sendfile header and the proxy does the
+transfer. Without one, the file is streamed by FileResponse in large
+chunks, honouring single byte-range requests so interrupted downloads and
+media seeking do not restart from zero.
+"""
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import content_disposition_header, http_date
+from django.views.static import was_modified_since
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class _ChunkedFileResponse(FileResponse):
+    block_size = DOWNLOAD_CHUNK_SIZE
+
+
+class _RangeReader:
+    """Read-only view of ``length`` bytes of a file starting at ``start``."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive byte positions for a single-range Range header.
+
+    Returns None when the header is absent, malformed or multi-range (serve
+    the whole file) and raises ValueError when the range is unsatisfiable.
+    """
+    match = _RANGE_RE.match((header or '').strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:  # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError('Unsatisfiable range')
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('Unsatisfiable range')
+    return start, end
+
+
+def _sendfile_response(name, path):
+    response = HttpResponse()
+    if settings.SENDFILE_BACKEND == 'nginx':
+        response['X-Accel-Redirect'] = settings.SENDFILE_URL_PREFIX + quote(name)
+    else:
+        response['X-Sendfile'] = path
+    # Let the proxy fill in the type from the file
+    del response['Content-Type']
+    return response
+
+
+def protected_file_response(request, storage, name, filename='', as_attachment=True, max_age=None):
+    """
+    Response for a stored file the caller has already authorized.
+
+    Args:
+        request: The current request (for Range and conditional headers)
+        storage: FileSystemStorage holding the file
+        name: Storage name of the file
+        filename: Name offered to the browser (defaults to the stored name)
+        as_attachment: Content-Disposition attachment (True) or inline
+        max_age: Optional Cache-Control max-age (for content that never changes)
+    """
+    filename = filename or os.path.basename(name)
+    path = storage.path(name)
+    cache_control = {'private': True} if max_age is None else {'private': True, 'max_age': max_age}
+
+    if settings.SENDFILE_BACKEND:
+        response = _sendfile_response(name, path)
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+        patch_cache_control(response, **cache_control)
+        return response
+
+    stat = os.stat(path)
+    last_modified = http_date(stat.st_mtime)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+        return HttpResponseNotModified()
+
+    # Ignore Range when If-Range names a different version of the file
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != last_modified:
+        range_header = None
+
+    try:
+        byte_range = parse_range(range_header, stat.st_size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+
+    file = open(path, 'rb')
+    if byte_range is None:
+        response = _ChunkedFileResponse(file, as_attachment=as_attachment, filename=filename)
+    else:
+        start, end = byte_range
+        response = _ChunkedFileResponse(
+            _RangeReader(file, start, end - start + 1), as_attachment=as_attachment, filename=filename
+        )
+        response.status_code = 206
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    response['Accept-Ranges'] = 'bytes'
+    response['Last-Modified'] = last_modified
+    patch_cache_control(response, **cache_control)
+    return response
@@ -1,7 +1,7 @@
 """
 Email utility functions for sending notifications
 """
-from django.core.mail import send_mail
+from django.core.mail import send_mail, get_connection, EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.contrib.sites.shortcuts import get_current_site
@@ -39,6 +39,34 @@ def send_welcome_email(user, request=None):
         return False
 
 
+def send_welcome_emails(users, request=None):
+    """Send welcome emails to many new users over one mail connection; returns how many were sent."""
+    site_url = f"http://{get_current_site(request).domain}" if request else 'http://localhost:8000'
+    from_email = settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else 'noreply@enterprise.com'
+    messages = []
+    for user in users:
+        if not user.email:
+            continue
+        message = EmailMultiAlternatives(
+            subject='Welcome to Enterprise!',
+            body=f'Hello {user.username}, welcome to Enterprise!',
+            from_email=from_email,
+            to=[user.email],
+        )
+        message.attach_alternative(
+            render_to_string('emails/welcome_email.html', {'user': user, 'site_url': site_url}), 'text/html'
+        )
+        messages.append(message)
+    try:
+        with get_connection() as connection:
+            sent = connection.send_messages(messages) or 0
+        logger.info(f"Sent {sent} welcome email(s)")
+        return sent
+    except Exception as e:
+        logger.error(f"Failed to send {len(messages)} welcome email(s): {str(e)}")
+        return 0
+
+
 def send_order_confirmation_email(order, request=None):
     """Send order confirmation email to user."""
     try:
@@ -131,3 +159,37 @@ def send_contact_confirmation_email(contact):
     except Exception as e:
         logger.error(f"Failed to send contact confirmation to {contact.email}: {str(e)}")
         return False
+
+
+def send_orders_imported_email(user, result, request=None):
+    """Send one summary email after a bulk order import (instead of one per order)."""
+    try:
+        if not user.email:
+            logger.warning(f"Cannot send import summary - no email for user {user.username}")
+            return False
+        
+        site_url = 'http://localhost:8000'  # Default
+        if request:
+            site_url = f"http://{get_current_site(request).domain}"
+        
+        context = {
+            'user': user,
+            'result': result,
+            'order_status_url': f"{site_url}/status/",
+        }
+        
+        html_message = render_to_string('emails/orders_imported.html', context)
+        
+        send_mail(
+            subject=f'Orders Imported - {result.created} order(s)',
+            message=f'{result.created} order(s) were imported and are being processed. {result.rejected} row(s) were rejected.',
+            from_email=settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else 'noreply@enterprise.com',
+            recipient_list=[user.email],
+            html_message=html_message,
+            fail_silently=False,
+        )
+        logger.info(f"Import summary email sent to {user.email} ({result.created} orders)")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to send import summary to {user.email}: {str(e)}")
+        return False
@@ -0,0 +1,85 @@
+"""
+Utility functions for streaming order exports (CSV and NDJSON).
+
+Rows are read with ``.values().iterator()`` so no model instances are built,
+and written out in chunks of EXPORT_CHUNK_ROWS, so memory stays flat no
+matter how many orders are exported. CSV cells that a spreadsheet would
+run as a formula are escaped.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+EXPORT_FIELDS = (
+    'id', 'title', 'client_name', 'quantity', 'priority', 'status',
+    'description', 'file', 'created_at', 'updated_at',
+)
+EXPORT_CHUNK_ROWS = 500  # Rows per streamed chunk (and per DB fetch)
+
+# Cells starting with these are formulas to Excel/LibreOffice/Sheets (CSV injection)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class _LineBuffer:
+    """File-like object that hands back what csv.writer writes instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def _rows(queryset):
+    return queryset.order_by('-created_at', '-id').values_list(*EXPORT_FIELDS).iterator(
+        chunk_size=EXPORT_CHUNK_ROWS
+    )
+
+
+def csv_cell(value):
+    """A value as written to CSV: dates in ISO format, formula-like text prefixed with ``'``."""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_orders_csv(queryset):
+    """Yield CSV text for the orders, header first."""
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(EXPORT_FIELDS)
+    chunk = []
+    for row in _rows(queryset):
+        chunk.append(writer.writerow([csv_cell(value) for value in row]))
+        if len(chunk) == EXPORT_CHUNK_ROWS:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def stream_orders_ndjson(queryset):
+    """Yield one JSON object per line for the orders."""
+    chunk = []
+    for row in _rows(queryset):
+        chunk.append(json.dumps(dict(zip(EXPORT_FIELDS, row)), cls=DjangoJSONEncoder) + '\n')
+        if len(chunk) == EXPORT_CHUNK_ROWS:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def export_orders_response(queryset, export_format, filename_prefix='orders'):
+    """Streaming download of the orders in the given format ('csv' or 'ndjson')."""
+    stream = stream_orders_csv if export_format == 'csv' else stream_orders_ndjson
+    response = StreamingHttpResponse(stream(queryset), content_type=EXPORT_FORMATS[export_format])
+    filename = f"{filename_prefix}-{timezone.now():%Y%m%d-%H%M%S}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
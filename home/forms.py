@@ -1,6 +1,8 @@
 from django import forms
-from .models import Order
+from .models import Client, Order, OrderLine, WebhookSubscription, normalize_client_name
 from django.core.exceptions import ValidationError
+from .webhooks import UnsafeEndpoint, check_endpoint
+from .provision_utils import ADMIN_PROVISION_MAX_ROWS
 
 def validate_file_size(value):
     """Validate file size (max 5MB)."""
@@ -33,7 +35,7 @@ class OrderForm(forms.ModelForm):
         help_texts = {
             'file': 'Upload images or documents (max 5MB). Supported formats: JPG, PNG, GIF, PDF, DOC, DOCX',
             'description': 'Provide detailed information about your order requirements',
-            'quantity': 'Enter the number of items needed',
+            'quantity': 'Enter the number of items needed (calculated automatically when you add items below)',
         }
 
     def __init__(self, *args, **kwargs):
@@ -59,4 +61,117 @@ class OrderForm(forms.ModelForm):
         })
         self.fields['file'].widget.attrs.update({'class': 'form-control'})
         self.fields['file'].validators.append(validate_file_size)
-        self.fields['file'].validators.append(validate_file_type)
\ No newline at end of file
+        self.fields['file'].validators.append(validate_file_type)
+
+
+MAX_ORDER_LINES = 50
+
+
+class OrderLineForm(forms.ModelForm):
+    class Meta:
+        model = OrderLine
+        fields = ['item', 'quantity']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['item'].widget.attrs.update({
+            'class': 'form-control',
+            'placeholder': 'e.g., Thread, navy blue'
+        })
+        self.fields['quantity'].widget.attrs.update({
+            'class': 'form-control',
+            'placeholder': 'Qty',
+            'min': '1'
+        })
+
+
+class BaseOrderLineFormSet(forms.BaseFormSet):
+    def lines(self):
+        """Filled-in lines as unsaved OrderLine instances, in form order (call after is_valid())."""
+        filled = [form.cleaned_data for form in self.forms if form.cleaned_data]
+        return [
+            OrderLine(item=data['item'], quantity=data['quantity'], position=position)
+            for position, data in enumerate(filled)
+        ]
+
+
+OrderLineFormSet = forms.formset_factory(
+    OrderLineForm,
+    formset=BaseOrderLineFormSet,
+    extra=3,
+    max_num=MAX_ORDER_LINES,
+    validate_max=True,
+)
+
+
+class WebhookSubscriptionForm(forms.ModelForm):
+    class Meta:
+        model = WebhookSubscription
+        fields = ['url']
+        labels = {
+            'url': 'Endpoint URL',
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['url'].widget.attrs.update({
+            'class': 'form-control',
+            'placeholder': 'https://erp.example.com/hooks/orders'
+        })
+
+    def clean_url(self):
+        url = self.cleaned_data['url']
+        if not url.lower().startswith(('http://', 'https://')):
+            raise ValidationError('Only http and https endpoints are supported.')
+        try:
+            check_endpoint(url)
+        except UnsafeEndpoint as e:
+            raise ValidationError(str(e))
+        return url
+
+
+class ClientAdminForm(forms.ModelForm):
+    class Meta:
+        model = Client
+        fields = ['name']
+
+    def clean(self):
+        cleaned_data = super().clean()
+        normalized_name = normalize_client_name(cleaned_data.get('name'))
+        if not normalized_name:
+            self.add_error('name', 'Enter a client name with at least one letter or digit.')
+        elif Client.objects.filter(normalized_name=normalized_name).exclude(pk=self.instance.pk).exists():
+            self.add_error('name', f'A client with this name already exists ("{normalized_name}").')
+        self.instance.normalized_name = normalized_name
+        return cleaned_data
+
+
+def validate_csv_file(value):
+    """Validate a CSV import upload (.csv, max 10MB)."""
+    if not value.name.lower().endswith('.csv'):
+        raise ValidationError('Please upload a .csv file.')
+    if value.size > 10 * 1024 * 1024:
+        raise ValidationError('File size cannot exceed 10MB.')
+
+
+class UserProvisionForm(forms.Form):
+    file = forms.FileField(
+        label='CSV File',
+        validators=[validate_csv_file],
+        help_text=f'Columns: username, email, and optionally password, first_name, last_name '
+                  f'(at most {ADMIN_PROVISION_MAX_ROWS} rows; use the provision_users command for more). '
+                  f'Users without a password set one through password reset.',
+    )
+    send_emails = forms.BooleanField(label='Send welcome emails', required=False, initial=True)
+
+
+class OrderImportForm(forms.Form):
+    file = forms.FileField(
+        label='CSV File',
+        validators=[validate_csv_file],
+        help_text='Columns: title, client_name, priority, quantity, description (max 10MB)',
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['file'].widget.attrs.update({'class': 'form-control', 'accept': '.csv,text/csv'})
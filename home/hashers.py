@@ -0,0 +1,27 @@
+"""
+Password hasher with Argon2 parameters taken from settings.
+
+Listed first in PASSWORD_HASHERS when argon2-cffi is installed. Django
+verifies existing PBKDF2 hashes with the hashers listed after it, and after
+a successful login it re-hashes the password with this one. A stored hash
+whose parameters differ from the current settings is also re-hashed on the
+next login, so the parameters can be tuned and rolled out in place.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2id with ARGON2_TIME_COST, ARGON2_MEMORY_COST (KiB) and ARGON2_PARALLELISM."""
+
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
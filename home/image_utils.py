@@ -0,0 +1,75 @@
+"""
+Utility functions for normalizing uploaded partner logos.
+
+A new logo upload is decoded once, resized to fit the box the services page
+shows it in, and written out as WebP and as a PNG/JPEG fallback at 1x and 2x.
+Re-encoding drops EXIF, ICC and text metadata. The original upload is
+replaced by the 2x fallback, so nothing larger than needed is kept or served.
+"""
+import io
+import os
+
+from django.core.files.base import ContentFile
+from django.utils.text import slugify
+from PIL import Image, ImageOps
+
+LOGO_SIZE = (250, 240)  # Display box on the services page (CSS pixels)
+LOGO_SCALES = (1, 2)
+WEBP_QUALITY = 85
+JPEG_QUALITY = 85
+
+
+def _encode(image, image_format):
+    buffer = io.BytesIO()
+    if image_format == 'WEBP':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=6)
+    elif image_format == 'JPEG':
+        image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def normalize_partner_logo(logo):
+    """
+    Resize a freshly uploaded ``logo.logo`` and write its variants to storage.
+
+    Sets ``logo.logo`` (the 2x fallback), ``logo.width``/``logo.height`` (1x
+    display size) and ``logo.variants`` ({'webp_1x': name, ...}); the caller
+    saves the model.
+    """
+    with Image.open(logo.logo) as source:
+        source = ImageOps.exif_transpose(source)
+        has_alpha = source.mode in ('RGBA', 'LA', 'PA') or 'transparency' in source.info
+        image = source.convert('RGBA' if has_alpha else 'RGB')
+    fallback_format, fallback_ext = ('PNG', 'png') if has_alpha else ('JPEG', 'jpg')
+
+    storage = logo.logo.storage
+    base = slugify(os.path.splitext(os.path.basename(logo.logo.name))[0]) or 'logo'
+    variants = {}
+    fallback_2x = None
+    for scale in LOGO_SCALES:
+        resized = image.copy()
+        resized.thumbnail((LOGO_SIZE[0] * scale, LOGO_SIZE[1] * scale), Image.LANCZOS)
+        if scale == 1:
+            logo.width, logo.height = resized.size
+        variants[f'webp_{scale}x'] = storage.save(
+            f'partners/variants/{base}@{scale}x.webp', ContentFile(_encode(resized, 'WEBP'))
+        )
+        fallback = _encode(resized, fallback_format)
+        if scale == max(LOGO_SCALES):
+            fallback_2x = fallback
+        else:
+            variants[f'fallback_{scale}x'] = storage.save(
+                f'partners/variants/{base}@{scale}x.{fallback_ext}', ContentFile(fallback)
+            )
+
+    logo.logo.save(f'{base}.{fallback_ext}', ContentFile(fallback_2x), save=False)
+    variants[f'fallback_{max(LOGO_SCALES)}x'] = logo.logo.name
+    logo.variants = variants
+
+
+def delete_logo_files(storage, names):
+    """Remove a logo's stored files (original and variants), ignoring missing ones."""
+    for name in set(filter(None, names)):
+        storage.delete(name)
@@ -0,0 +1,140 @@
+"""
+Utility functions for bulk order import from CSV.
+
+Rows are read one at a time from the uploaded stream, validated with the
+same OrderForm used by the order page, and inserted with bulk_create in
+batches. Because bulk_create skips model signals, the bookkeeping those
+signals normally do (client links and counters, trigram index, webhook
+outbox) is done here once per batch. The whole import produces one audit
+entry and one confirmation email.
+
+Batches are committed as they go, so a file that stops decoding partway
+(bad UTF-8, broken quoting) is not rolled back. The rows before the bad
+spot stay imported, the problem is recorded on the result as
+``read_error``, and the audit entry and email still report what was
+created, so the user can fix the file and import only the rest.
+"""
+import csv
+
+from django.db import transaction
+
+from home.audit_utils import log_activity
+from home.email_utils import send_orders_imported_email
+from home.forms import OrderForm
+from home.models import Order, Client, normalize_client_name
+from home.search_utils import index_new_orders_trigrams
+from home.webhooks import enqueue_order_events
+
+IMPORT_FIELDS = ('title', 'client_name', 'priority', 'quantity', 'description')
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 200  # Row errors kept for display; the count is always exact
+
+
+class ImportResult:
+    """Outcome of an import: created orders, rejected rows and their errors."""
+
+    def __init__(self):
+        self.created = 0
+        self.total_quantity = 0
+        self.rejected = 0
+        self.errors = []  # (row number, message); the header is row 1
+        self.sample_orders = []  # First few created orders, for the summary email
+        self.read_error = None  # Why reading stopped early, if it did
+
+    def add_error(self, row_number, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row_number, message))
+
+
+def bulk_create_orders(user, orders):
+    """
+    Insert validated, unsaved orders in one transaction and do their signal bookkeeping.
+
+    Returns the created orders (with primary keys).
+    """
+    with transaction.atomic():
+        clients = Client.objects.get_for_names(order.client_name for order in orders)
+        for order in orders:
+            order.user = user
+            order.client = clients[normalize_client_name(order.client_name)]
+        created = Order.objects.bulk_create(orders)
+        Client.objects.recalculate_counters({client.pk for client in clients.values()})
+        index_new_orders_trigrams(created)
+        enqueue_order_events(created, 'order.created')
+    return created
+
+
+def _form_errors(form):
+    return '; '.join(
+        f"{field}: {' '.join(errors)}" if field != '__all__' else ' '.join(errors)
+        for field, errors in form.errors.items()
+    )
+
+
+def import_orders_csv(user, stream, request=None, source='CSV upload', batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import orders for a user from a text stream of CSV data.
+
+    Args:
+        user: Owner of the imported orders
+        stream: Text file-like object; the first row must name the columns
+        request: Optional request, for the audit entry and email links
+        source: Description of where the data came from, for the audit entry
+        batch_size: Rows per bulk_create
+
+    Returns:
+        ImportResult
+    """
+    result = ImportResult()
+    reader = csv.DictReader(stream)
+    try:
+        fieldnames = reader.fieldnames or []
+    except (UnicodeDecodeError, csv.Error) as e:
+        result.read_error = f'Could not read the file: {e}'
+        result.add_error(1, result.read_error)
+        return result
+    missing = [field for field in IMPORT_FIELDS if field not in fieldnames]
+    if missing:
+        result.add_error(1, f"Missing column(s): {', '.join(missing)}")
+        return result
+
+    batch = []
+
+    def flush():
+        created = bulk_create_orders(user, batch)
+        result.created += len(created)
+        result.total_quantity += sum(order.quantity for order in created)
+        result.sample_orders.extend(created[:10 - len(result.sample_orders)])
+        batch.clear()
+
+    row_number = 1
+    try:
+        for row_number, row in enumerate(reader, start=2):
+            form = OrderForm(data={field: (row.get(field) or '').strip() for field in IMPORT_FIELDS})
+            if form.is_valid():
+                batch.append(form.save(commit=False))
+                if len(batch) >= batch_size:
+                    flush()
+            else:
+                result.add_error(row_number, _form_errors(form))
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Earlier batches are already committed; keep the rows read so far and say where reading stopped
+        result.read_error = f'Could not read the file after row {row_number}: {e}'
+        result.add_error(row_number + 1, result.read_error)
+    if batch:
+        flush()
+
+    if result.created:
+        description = f'Imported {result.created} order(s) from {source}; {result.rejected} row(s) rejected'
+        if result.read_error:
+            description += f'; stopped early. {result.read_error}'
+        log_activity(
+            user=user,
+            action='orders_imported',
+            description=description,
+            request=request,
+            content_type='Order'
+        )
+        send_orders_imported_email(user, result, request)
+    return result
@@ -0,0 +1,101 @@
+"""
+Benchmark the login hot path and break its latency down by step.
+
+Usage: python manage.py benchmark_login --iterations 20 [--hasher home.hashers.TunedArgon2PasswordHasher]
+"""
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import login
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.contrib.auth.models import User, update_last_login
+from django.contrib.auth.signals import user_logged_in
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.module_loading import import_string
+
+from home.signals import log_user_login
+
+PASSWORD = 'benchmark-password-123'
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000
+
+
+class Command(BaseCommand):
+    help = 'Benchmark login latency: password hashing, DB writes and signal handlers, per hasher'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Timed logins per hasher')
+        parser.add_argument('--hasher', action='append', dest='hashers',
+                            help='Hasher class to compare (repeatable; default: the configured ones)')
+
+    def handle(self, *args, **options):
+        hashers = options['hashers'] or settings.PASSWORD_HASHERS[:2]
+        for path in hashers:
+            try:
+                hasher = import_string(path)()
+                if hasher.library:
+                    hasher._load_library()  # e.g. argon2-cffi for Argon2
+            except (ImportError, ValueError) as e:
+                raise CommandError(f'Cannot use {path}: {e}')
+        for path in hashers:
+            self.benchmark(path, options['iterations'])
+
+    def benchmark(self, hasher_path, iterations):
+        steps = {name: [] for name in ('hash', 'user lookup', 'session', 'last_login', 'audit', 'end-to-end')}
+        # Only this hasher: authenticate must not pick another one or re-hash
+        with override_settings(PASSWORD_HASHERS=[hasher_path], RATELIMIT_ENABLE=False), transaction.atomic():
+            hasher = get_hasher('default')
+            encoded = make_password(PASSWORD)
+            user = User.objects.create(username='__login_benchmark__', password=encoded)
+            request_factory = RequestFactory()
+            client = Client()
+
+            for _ in range(iterations):
+                request = request_factory.post('/login/')
+                SessionMiddleware(lambda r: None).process_request(request)
+
+                # The two parts of authenticate(): fetch the user, then check the password
+                steps['user lookup'].append(_timed(User._default_manager.get_by_natural_key, user.username))
+                steps['hash'].append(_timed(hasher.verify, PASSWORD, encoded))
+
+                # login() without its receivers: session rotation and save
+                user_logged_in.disconnect(dispatch_uid='update_last_login')
+                user_logged_in.disconnect(log_user_login)
+                try:
+                    steps['session'].append(_timed(login, request, user, settings.AUTHENTICATION_BACKENDS[0]))
+                finally:
+                    user_logged_in.connect(update_last_login, dispatch_uid='update_last_login')
+                    user_logged_in.connect(log_user_login)
+
+                # The user_logged_in receivers, one at a time
+                steps['last_login'].append(_timed(update_last_login, User, user))
+                steps['audit'].append(_timed(log_user_login, User, request, user))
+
+                client.cookies.clear()
+                steps['end-to-end'].append(_timed(
+                    client.post, '/login/', {'username': user.username, 'password': PASSWORD}
+                ))
+
+            with CaptureQueriesContext(connection) as queries:
+                client.cookies.clear()
+                client.post('/login/', {'username': user.username, 'password': PASSWORD})
+            transaction.set_rollback(True)
+
+        hash_ms = statistics.median(steps['hash'])
+        self.stdout.write(f"Login latency with {hasher_path} ({hasher.algorithm}, {iterations} iterations, median)")
+        for name, samples in steps.items():
+            self.stdout.write(f"  {name + ':':<14}{statistics.median(samples):9.2f} ms")
+        self.stdout.write(f"  {'queries:':<14}{len(queries):9d}   (full POST /login/)")
+        self.stdout.write(self.style.SUCCESS(
+            f"Hashing is {hash_ms / statistics.median(steps['end-to-end']):.0%} of a login; "
+            f"~{1000 / hash_ms:.0f} logins/s per core"
+        ))
@@ -0,0 +1,88 @@
+"""
+Benchmark rendering of the order status page with and without fragment caching.
+
+Usage: python manage.py benchmark_status_page --orders 150 --iterations 50
+"""
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from home.models import Order
+from home.views import status
+
+# Fragment cache that stores nothing: every {% cache %} block renders in full
+UNCACHED = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'},
+    'template_fragments': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark /status/ render time per page: uncached vs. cold vs. warm fragment cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=150, help='Orders to create for the benchmark user')
+        parser.add_argument('--iterations', type=int, default=50, help='Timed renders per scenario')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+
+        # All benchmark data is rolled back at the end
+        with transaction.atomic():
+            user = User.objects.create_user(username='__status_benchmark__')
+            orders = Order.objects.bulk_create([
+                Order(
+                    user=user,
+                    title=f'Benchmark Order {i}',
+                    description='Cotton thread, assorted colours',
+                    priority='Urgent' if i % 5 == 0 else 'Normal',
+                    quantity=i + 1,
+                    client_name='Benchmark Client',
+                    status=[choice for choice, label in Order.STATUS_CHOICES][i % 5],
+                )
+                for i in range(options['orders'])
+            ])
+            request_factory = RequestFactory()
+
+            def render_page():
+                request = request_factory.get('/status/', {'page': 1})
+                request.user = user
+                start = time.perf_counter()
+                status(request)
+                return (time.perf_counter() - start) * 1000
+
+            with override_settings(CACHES=UNCACHED):
+                uncached = [render_page() for _ in range(iterations)]
+
+            cache = caches['default']
+            cold = []
+            for _ in range(iterations):
+                cache.clear()
+                cold.append(render_page())
+
+            with CaptureQueriesContext(connection) as queries:
+                render_page()
+            warm = [render_page() for _ in range(iterations)]
+
+            # One order changes: only its card and the page wrapper re-render
+            Order.objects.filter(pk=orders[0].pk).update(status='Delivered', updated_at=timezone.now())
+            one_changed = render_page()
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"Status page render time ({len(orders)} orders, 15 per page, {iterations} iterations)")
+        self.stdout.write(f"  uncached:          {statistics.median(uncached):8.2f} ms/page (median)")
+        self.stdout.write(f"  cold cache:        {statistics.median(cold):8.2f} ms/page (median)")
+        self.stdout.write(f"  warm cache:        {statistics.median(warm):8.2f} ms/page (median)")
+        self.stdout.write(f"  one order changed: {one_changed:8.2f} ms/page")
+        self.stdout.write(f"  queries (warm):    {len(queries)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Warm cache speed-up: {statistics.median(uncached) / statistics.median(warm):.1f}x"
+        ))
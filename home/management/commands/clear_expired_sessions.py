@@ -0,0 +1,24 @@
+"""
+Delete expired sessions in small batches.
+
+Usage: python manage.py clear_expired_sessions [--batch-size 1000] [--pause 0.1]
+"""
+from django.core.management.base import BaseCommand
+
+from home.session_utils import SESSION_PURGE_BATCH_SIZE, purge_expired_sessions
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions in short batches that are safe to run alongside live traffic'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SESSION_PURGE_BATCH_SIZE,
+                            help='Sessions deleted per statement')
+        parser.add_argument('--pause', type=float, default=0.1, help='Seconds to sleep between batches')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches')
+
+    def handle(self, *args, **options):
+        deleted, elapsed = purge_expired_sessions(
+            batch_size=options['batch_size'], pause=options['pause'], max_batches=options['max_batches']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired session(s) in {elapsed:.2f}s'))
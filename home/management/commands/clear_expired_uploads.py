@@ -0,0 +1,16 @@
+"""
+Delete resumable uploads that were abandoned before completion.
+
+Usage: python manage.py clear_expired_uploads
+"""
+from django.core.management.base import BaseCommand
+
+from home.upload_utils import clear_expired_uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete unfinished attachment uploads idle for longer than CHUNKED_UPLOAD_EXPIRY'
+
+    def handle(self, *args, **options):
+        deleted = clear_expired_uploads()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired upload(s)'))
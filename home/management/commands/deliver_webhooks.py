@@ -0,0 +1,34 @@
+"""
+Deliver pending order webhooks from the outbox.
+
+Usage: python manage.py deliver_webhooks [--once] [--interval 5]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from home.webhooks import WebhookDispatcher
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued order webhook events in signed batches, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Deliver what is due now and exit')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to sleep when nothing is due')
+
+    def handle(self, *args, **options):
+        dispatcher = WebhookDispatcher()
+        try:
+            while True:
+                delivered, failed = dispatcher.deliver_due()
+                if delivered or failed:
+                    self.stdout.write(f'Delivered {delivered} event(s), {failed} failed')
+                if options['once']:
+                    break
+                if not (delivered or failed):
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            dispatcher.close()
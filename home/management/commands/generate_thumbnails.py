@@ -0,0 +1,37 @@
+"""
+Generate WebP thumbnails for image attachments in the background.
+
+Usage: python manage.py generate_thumbnails [--once] [--interval 5] [--workers N]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from home.thumbnails import generate_pending_thumbnails, shutdown_pool
+
+
+class Command(BaseCommand):
+    help = 'Create thumbnails for pending image attachments using a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process what is pending now and exit')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to sleep when nothing is pending')
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+        parser.add_argument('--batch-size', type=int, default=50, help='Images per round')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                done, failed = generate_pending_thumbnails(
+                    batch_size=options['batch_size'], workers=options['workers']
+                )
+                if done or failed:
+                    self.stdout.write(f'Generated {done} thumbnail(s), {failed} failed')
+                if options['once'] and not (done or failed):
+                    break
+                if not (done or failed):
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            shutdown_pool()
@@ -0,0 +1,38 @@
+"""
+Import orders for a user from a CSV file.
+
+Usage: python manage.py import_orders orders.csv --user USERNAME [--batch-size 500]
+"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from home.import_utils import import_orders_csv, IMPORT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Bulk-create orders from a CSV file (title, client_name, priority, quantity, description)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help='Path to the CSV file')
+        parser.add_argument('--user', required=True, help='Username that will own the orders')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist")
+
+        try:
+            with open(options['csv_path'], encoding='utf-8-sig', newline='') as stream:
+                result = import_orders_csv(
+                    user, stream, source=options['csv_path'], batch_size=options['batch_size']
+                )
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(f"Could not read {options['csv_path']}: {e}")
+
+        for row_number, message in result.errors:
+            self.stderr.write(f'Row {row_number}: {message}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.created} order(s); {result.rejected} row(s) rejected'
+        ))
@@ -0,0 +1,36 @@
+"""
+Resize existing partner logos and generate their WebP/fallback variants.
+
+New uploads are normalized when saved; this command catches up logos
+uploaded before that.
+
+Usage: python manage.py normalize_partner_logos [--all]
+"""
+from django.core.management.base import BaseCommand
+
+from home.image_utils import normalize_partner_logo, delete_logo_files
+from home.models import PartnerLogo
+
+
+class Command(BaseCommand):
+    help = 'Normalize partner logos that have no generated variants yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Also redo logos that already have variants')
+
+    def handle(self, *args, **options):
+        logos = PartnerLogo.objects.exclude(logo='')
+        if not options['all']:
+            logos = logos.filter(variants={})
+        done = 0
+        for logo in logos:
+            old_files = [logo.logo.name, *logo.variants.values()]
+            try:
+                normalize_partner_logo(logo)
+            except OSError as e:
+                self.stderr.write(f'{logo.name}: {e}')
+                continue
+            logo.save()
+            delete_logo_files(logo.logo.storage, [name for name in old_files if name not in logo.variants.values()])
+            done += 1
+        self.stdout.write(self.style.SUCCESS(f'Normalized {done} logo(s)'))
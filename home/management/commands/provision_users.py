@@ -0,0 +1,37 @@
+"""
+Create user accounts in bulk from a CSV file.
+
+Usage: python manage.py provision_users users.csv [--workers 4] [--no-email]
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from home.provision_utils import provision_users_csv
+
+
+class Command(BaseCommand):
+    help = 'Bulk-create users from a CSV file (username, email[, password, first_name, last_name])'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help='Path to the CSV file')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Password hashing processes (default: one per CPU)')
+        parser.add_argument('--no-email', action='store_true', help='Do not send welcome emails')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            with open(options['csv_path'], encoding='utf-8-sig', newline='') as stream:
+                result = provision_users_csv(
+                    stream, send_emails=not options['no_email'], workers=options['workers']
+                )
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(f"Could not read {options['csv_path']}: {e}")
+
+        for row_number, message in result.errors:
+            self.stderr.write(f'Row {row_number}: {message}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {result.created} user(s) in {time.monotonic() - started:.1f}s; '
+            f'{result.rejected} row(s) rejected; {result.emails_sent} welcome email(s) sent'
+        ))
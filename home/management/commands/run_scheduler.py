@@ -0,0 +1,47 @@
+"""
+Run the periodic maintenance commands listed in SCHEDULED_JOBS.
+
+Usage: python manage.py run_scheduler [--once] [--interval 30]
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Run each command in SCHEDULED_JOBS once per its interval'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run the jobs that are due and exit')
+        parser.add_argument('--interval', type=float, default=30, help='Seconds between checks for due jobs')
+
+    def run_due_jobs(self):
+        ran = []
+        for name, every in settings.SCHEDULED_JOBS.items():
+            # The key both marks the job as done for this interval and stops other
+            # schedulers sharing the cache from running it again
+            if not cache.add(f'scheduler:{name}', time.time(), every):
+                continue
+            self.stdout.write(f'Running {name}')
+            try:
+                call_command(name, stdout=self.stdout, stderr=self.stderr)
+            except Exception:
+                logger.exception(f"Scheduled job {name} failed")
+            ran.append(name)
+        return ran
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                self.run_due_jobs()
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,76 @@
+# Generated by Django 5.1.1 on 2026-10-19 04:28
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+_WORD_RE = re.compile(r'[^\W_]+')
+
+
+def trigrams(text):
+    """Copy of home.search_utils.trigrams, frozen so later changes there cannot alter this migration."""
+    result = set()
+    for word in _WORD_RE.findall((text or '').lower()):
+        padded = f'  {word} '
+        for i in range(len(padded) - 2):
+            result.add(padded[i:i + 3])
+    return result
+
+
+def enable_fuzzy_search(apps, schema_editor):
+    """Enable pg_trgm on PostgreSQL, otherwise backfill the trigram table in batches."""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS home_order_title_trgm ON home_order USING gin (title gin_trgm_ops)'
+        )
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS home_order_client_name_trgm ON home_order USING gin (client_name gin_trgm_ops)'
+        )
+        return
+
+    Order = apps.get_model('home', 'Order')
+    OrderSearchTrigram = apps.get_model('home', 'OrderSearchTrigram')
+    rows = []
+    for order in Order.objects.only('id', 'title', 'client_name').iterator(chunk_size=BATCH_SIZE):
+        for field in ('title', 'client_name'):
+            rows.extend(
+                OrderSearchTrigram(order_id=order.id, field=field, trigram=trigram)
+                for trigram in trigrams(getattr(order, field))
+            )
+        if len(rows) >= BATCH_SIZE:
+            OrderSearchTrigram.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+            rows = []
+    OrderSearchTrigram.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+
+def disable_fuzzy_search(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS home_order_title_trgm')
+        schema_editor.execute('DROP INDEX IF EXISTS home_order_client_name_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0010_partnerlogo_servicepage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderSearchTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('title', 'Title'), ('client_name', 'Client Name')], max_length=20)),
+                ('trigram', models.CharField(max_length=3)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_trigrams', to='home.order')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['trigram', 'order'], name='home_orders_trigram_1bc8fc_idx'), models.Index(fields=['order', 'field'], name='home_orders_order_i_27a425_idx')],
+            },
+        ),
+        migrations.RunPython(enable_fuzzy_search, disable_fuzzy_search),
+    ]
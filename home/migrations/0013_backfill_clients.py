@@ -0,0 +1,65 @@
+import re
+
+from django.db import migrations
+from django.db.models import Count, Sum
+
+BATCH_SIZE = 1000
+
+
+def normalize_client_name(name):
+    """Copy of home.models.normalize_client_name, frozen so later changes there cannot alter this migration."""
+    return ' '.join(re.sub(r'[^\w\s]|_', ' ', (name or '').lower()).split())
+
+
+def backfill_clients(apps, schema_editor):
+    """Create Client rows from existing order client names and link orders, in batches."""
+    Order = apps.get_model('home', 'Order')
+    Client = apps.get_model('home', 'Client')
+
+    last_pk = 0
+    while True:
+        batch = list(
+            Order.objects.filter(pk__gt=last_pk, client__isnull=True)
+            .order_by('pk').only('pk', 'client_name')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+
+        names = {}
+        for order in batch:
+            names.setdefault(normalize_client_name(order.client_name), order.client_name.strip())
+        Client.objects.bulk_create(
+            [Client(normalized_name=key, name=name) for key, name in names.items()],
+            ignore_conflicts=True
+        )
+        client_ids = dict(
+            Client.objects.filter(normalized_name__in=names).values_list('normalized_name', 'pk')
+        )
+        for order in batch:
+            order.client_id = client_ids[normalize_client_name(order.client_name)]
+        Order.objects.bulk_update(batch, ['client'], batch_size=BATCH_SIZE)
+
+    # Counters cover active (not soft-deleted) orders only
+    totals = (
+        Order.objects.filter(is_deleted=False, client__isnull=False)
+        .values('client_id').annotate(orders=Count('id'), quantity=Sum('quantity'))
+    )
+    clients = []
+    for row in totals.iterator(chunk_size=BATCH_SIZE):
+        clients.append(Client(pk=row['client_id'], order_count=row['orders'], total_quantity=row['quantity'] or 0))
+        if len(clients) >= BATCH_SIZE:
+            Client.objects.bulk_update(clients, ['order_count', 'total_quantity'])
+            clients = []
+    Client.objects.bulk_update(clients, ['order_count', 'total_quantity'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0012_client'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_clients, migrations.RunPython.noop),
+    ]
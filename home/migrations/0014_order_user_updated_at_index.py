@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-19 04:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0013_backfill_clients'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='home_order_user_id_d551e4_idx'),
+        ),
+    ]
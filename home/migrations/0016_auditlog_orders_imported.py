@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-19 04:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0015_webhooks'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='action',
+            field=models.CharField(choices=[('login', 'User Login'), ('logout', 'User Logout'), ('signup', 'User Signup'), ('profile_update', 'Profile Update'), ('password_change', 'Password Change'), ('order_created', 'Order Created'), ('orders_imported', 'Orders Imported'), ('order_updated', 'Order Updated'), ('order_status_changed', 'Order Status Changed'), ('contact_submitted', 'Contact Form Submitted')], db_index=True, max_length=50),
+        ),
+    ]
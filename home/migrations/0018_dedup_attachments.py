@@ -0,0 +1,51 @@
+# Generated by Django 5.1.1 on 2026-10-19 04:51
+
+import os
+
+import home.storage
+from django.db import migrations, models
+
+
+def backfill_file_names(apps, schema_editor):
+    """Existing attachments keep their upload names; record them as the original names."""
+    Order = apps.get_model('home', 'Order')
+    batch = []
+    for order in Order.objects.exclude(file='').exclude(file__isnull=True).only('pk', 'file').iterator(chunk_size=1000):
+        order.file_name = os.path.basename(order.file.name)[:255]
+        batch.append(order)
+        if len(batch) == 1000:
+            Order.objects.bulk_update(batch, ['file_name'])
+            batch = []
+    Order.objects.bulk_update(batch, ['file_name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0017_orderline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='file_name',
+            field=models.CharField(blank=True, help_text='Original name of the uploaded file', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=home.storage.ContentAddressedStorage(), upload_to='orders/'),
+        ),
+        migrations.RunPython(backfill_file_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.1 on 2026-10-19 04:58
+
+from django.db import migrations, models
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+
+def queue_existing_images(apps, schema_editor):
+    """Deduplicated image attachments stored before thumbnails existed get one too."""
+    StoredBlob = apps.get_model('home', 'StoredBlob')
+    for extension in IMAGE_EXTENSIONS:
+        StoredBlob.objects.filter(name__iendswith=extension).update(thumbnail_status='pending')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0019_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='thumbnail',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='storedblob',
+            name='thumbnail',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='storedblob',
+            name='thumbnail_status',
+            field=models.CharField(choices=[('none', 'Not an image'), ('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], db_index=True, default='none', max_length=10),
+        ),
+        migrations.RunPython(queue_existing_images, migrations.RunPython.noop),
+    ]
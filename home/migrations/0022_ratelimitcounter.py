@@ -0,0 +1,21 @@
+# Generated by Django 5.1.1 on 2026-10-19 05:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0021_partnerlogo_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitCounter',
+            fields=[
+                ('key', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+                ('expires', models.BigIntegerField(db_index=True)),
+            ],
+        ),
+    ]
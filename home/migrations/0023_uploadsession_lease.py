@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-19 06:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0022_ratelimitcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='lease_expires',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='lease_token',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+    ]
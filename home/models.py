@@ -4,6 +4,15 @@ from phonenumber_field.modelfields import PhoneNumberField
 from django.conf import settings
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from django.db.models import Count, Sum
+from home.storage import attachment_storage
+import re
+import uuid
+
+
+def normalize_client_name(name):
+    """Normalize a client name for grouping: lower-case, no punctuation, single spaces."""
+    return ' '.join(re.sub(r'[^\w\s]|_', ' ', (name or '').lower()).split())
 
 
 class AuditLog(models.Model):
@@ -16,6 +25,7 @@ class AuditLog(models.Model):
         ('profile_update', 'Profile Update'),
         ('password_change', 'Password Change'),
         ('order_created', 'Order Created'),
+        ('orders_imported', 'Orders Imported'),
         ('order_updated', 'Order Updated'),
         ('order_status_changed', 'Order Status Changed'),
         ('contact_submitted', 'Contact Form Submitted'),
@@ -91,6 +101,68 @@ class Contact(SoftDeleteModel):
         return f"{self.name} - {self.email}"
 
 
+class ClientManager(models.Manager):
+    """Manager for resolving client names and maintaining per-client counters."""
+    
+    def get_for_name(self, name):
+        """Return the Client for a free-text name, creating it if needed."""
+        client, created = self.get_or_create(
+            normalized_name=normalize_client_name(name),
+            defaults={'name': name.strip()}
+        )
+        return client
+    
+    def get_for_names(self, names):
+        """Resolve many free-text names at once; returns {normalized_name: Client}."""
+        keys = {}
+        for name in names:
+            keys.setdefault(normalize_client_name(name), name.strip())
+        self.bulk_create(
+            [Client(normalized_name=key, name=name) for key, name in keys.items()],
+            ignore_conflicts=True
+        )
+        return {client.normalized_name: client for client in self.filter(normalized_name__in=keys)}
+    
+    def recalculate_counters(self, client_ids=None):
+        """Recompute order_count/total_quantity from active orders in one grouped query."""
+        clients = self.all() if client_ids is None else self.filter(pk__in=client_ids)
+        totals = {
+            row['client_id']: row
+            for row in Order.objects.filter(client__in=clients).values('client_id').annotate(
+                orders=Count('id'), quantity=Sum('quantity')
+            )
+        }
+        updated = []
+        for client in clients.only('id'):
+            row = totals.get(client.id, {})
+            client.order_count = row.get('orders', 0)
+            client.total_quantity = row.get('quantity') or 0
+            updated.append(client)
+        self.bulk_update(updated, ['order_count', 'total_quantity'], batch_size=500)
+        return len(updated)
+
+
+class Client(models.Model):
+    """Normalized client entity shared by all orders for the same client."""
+    
+    name = models.CharField(max_length=255)  # Display name (first spelling seen)
+    normalized_name = models.CharField(max_length=255, unique=True)
+    
+    # Denormalized counters over active (not soft-deleted) orders
+    order_count = models.PositiveIntegerField(default=0)
+    total_quantity = models.PositiveBigIntegerField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    objects = ClientManager()
+    
+    class Meta:
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
+
 class Order(SoftDeleteModel):
     PRIORITY_CHOICES = (
         ('Normal', 'Normal'),
@@ -112,7 +184,10 @@ class Order(SoftDeleteModel):
     priority = models.CharField(max_length=6, choices=PRIORITY_CHOICES, db_index=True)
     quantity = models.PositiveIntegerField()
     client_name = models.CharField(max_length=255)
-    file = models.FileField(upload_to='orders/', blank=True, null=True)
+    client = models.ForeignKey(Client, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders')
+    file = models.FileField(upload_to='orders/', storage=attachment_storage, blank=True, null=True)
+    file_name = models.CharField(max_length=255, blank=True, help_text='Original name of the uploaded file')
+    thumbnail = models.CharField(max_length=255, blank=True, editable=False)  # Set by the thumbnail worker
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending', db_index=True)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -122,12 +197,28 @@ class Order(SoftDeleteModel):
         indexes = [
             models.Index(fields=['-created_at', 'status']),  # Composite index for common queries
             models.Index(fields=['user', '-created_at']),  # User's orders chronologically
+            models.Index(fields=['user', 'updated_at', 'id']),  # Incremental sync / change feeds
         ]
 
     def __str__(self):
         return f"{self.title} - {self.client_name} ({self.status})"
 
 
+class OrderLine(models.Model):
+    """One item of a multi-line order; the order's quantity is the sum of its lines."""
+    
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='lines')
+    item = models.CharField(max_length=255)
+    quantity = models.PositiveIntegerField()
+    position = models.PositiveSmallIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['order', 'position']
+    
+    def __str__(self):
+        return f"{self.item} x {self.quantity}"
+
+
 class ServicePage(models.Model):
     """Model for configurable service page content."""
     
@@ -169,6 +260,9 @@ class PartnerLogo(models.Model):
     order = models.IntegerField(default=0, help_text='Display order (lower numbers appear first)')
     is_active = models.BooleanField(default=True, help_text='Show this logo on the page')
     url = models.URLField(blank=True, help_text='Optional link to partner website')
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)  # 1x display size
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    variants = models.JSONField(default=dict, blank=True, editable=False)  # {'webp_1x': storage name, ...}
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -176,5 +270,163 @@ class PartnerLogo(models.Model):
         verbose_name = 'Partner Logo'
         verbose_name_plural = 'Partner Logos'
     
+    def save(self, *args, **kwargs):
+        # Normalize new uploads: bounded size, WebP + fallback at 1x/2x, no metadata
+        if self.logo and not self.logo._committed:
+            from home.image_utils import normalize_partner_logo, delete_logo_files
+            
+            old = PartnerLogo.objects.filter(pk=self.pk).values('logo', 'variants').first() if self.pk else None
+            normalize_partner_logo(self)
+            super().save(*args, **kwargs)
+            if old:
+                delete_logo_files(self.logo.storage, [old['logo'], *old['variants'].values()])
+            return
+        super().save(*args, **kwargs)
+    
+    def variant_url(self, key):
+        name = self.variants.get(key)
+        return self.logo.storage.url(name) if name else ''
+    
+    @property
+    def webp_srcset(self):
+        if 'webp_1x' not in self.variants:
+            return ''
+        return f"{self.variant_url('webp_1x')} 1x, {self.variant_url('webp_2x')} 2x"
+    
+    @property
+    def fallback_url(self):
+        return self.variant_url('fallback_1x') or self.logo.url
+    
+    @property
+    def fallback_srcset(self):
+        if 'fallback_1x' not in self.variants:
+            return ''
+        return f"{self.variant_url('fallback_1x')} 1x, {self.variant_url('fallback_2x')} 2x"
+    
+    def __str__(self):
+        return self.name
+
+class StoredBlob(models.Model):
+    """A deduplicated attachment file and how many orders reference it."""
+    
+    THUMBNAIL_STATUS_CHOICES = (
+        ('none', 'Not an image'),
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    )
+    
+    digest = models.CharField(max_length=64, unique=True)  # SHA-256 of the content
+    name = models.CharField(max_length=255, unique=True)  # Storage path
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    thumbnail = models.CharField(max_length=255, blank=True)  # Storage path of the WebP thumbnail
+    thumbnail_status = models.CharField(
+        max_length=10, choices=THUMBNAIL_STATUS_CHOICES, default='none', db_index=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+
+class OrderSearchTrigram(models.Model):
+    """Precomputed trigrams for fuzzy order search on databases without pg_trgm."""
+    
+    FIELD_CHOICES = (
+        ('title', 'Title'),
+        ('client_name', 'Client Name'),
+    )
+    
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='search_trigrams')
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    trigram = models.CharField(max_length=3)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['trigram', 'order']),  # Candidate lookup by trigram
+            models.Index(fields=['order', 'field']),  # Per-field trigram totals
+        ]
+    
+    def __str__(self):
+        return f"{self.order_id} {self.field}: '{self.trigram}'"
+
+
+class WebhookSubscription(models.Model):
+    """Endpoint a user registers to be notified when their orders change."""
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='webhook_subscriptions')
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=64, help_text='Shared secret used to sign payloads (HMAC-SHA256)')
+    is_active = models.BooleanField(default=True, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.user} -> {self.url}"
+
+
+class WebhookDelivery(models.Model):
+    """Outbox entry: one order event waiting to be delivered to one subscription."""
+    
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('delivered', 'Delivered'),
+        ('failed', 'Failed'),
+    )
+    
+    subscription = models.ForeignKey(WebhookSubscription, on_delete=models.CASCADE, related_name='deliveries')
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)  # Lease held by a delivery worker
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        verbose_name_plural = 'Webhook deliveries'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),  # Worker polling for due events
+        ]
+    
+    def __str__(self):
+        return f"{self.event_type} -> {self.subscription.url} ({self.status})"
+
+
+class UploadSession(models.Model):
+    """A resumable (tus-style) attachment upload in progress."""
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    length = models.PositiveBigIntegerField()  # Declared total size in bytes
+    offset = models.PositiveBigIntegerField(default=0)  # Bytes received so far
+    checksum = models.CharField(max_length=64, blank=True)  # Expected SHA-256 of the whole file (hex)
+    lease_token = models.CharField(max_length=32, blank=True)  # PATCH currently writing at ``offset``
+    lease_expires = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.length})"
+
+
+class RateLimitCounter(models.Model):
+    """A rate-limit window counter shared by every worker (see home/ratelimit_cache.py)."""
+    
+    key = models.CharField(max_length=255, primary_key=True)
+    value = models.BigIntegerField(default=0)
+    expires = models.BigIntegerField(db_index=True)  # Unix time
+    
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f"{self.key}: {self.value}"
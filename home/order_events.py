@@ -0,0 +1,149 @@
+"""
+Real-time order status events for Server-Sent Events (SSE) streams.
+
+Order saves publish to an in-process broker, which wakes the owner's open
+streams in the same worker immediately. Each stream also polls the database
+every ORDER_EVENTS_POLL_INTERVAL seconds, which picks up changes made in other
+worker processes and bulk updates that bypass signals.
+"""
+import asyncio
+import json
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from home.models import Order
+
+# Most events queued for one slow stream; overflow is recovered by the next poll
+QUEUE_SIZE = 100
+
+
+class OrderEventBroker:
+    """Thread-safe, in-process pub/sub of order events keyed by user id."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # user_id -> {(event loop, asyncio.Queue)}
+
+    def subscribe(self, user_id):
+        """Register a queue for the calling coroutine's event loop."""
+        subscription = (asyncio.get_running_loop(), asyncio.Queue(maxsize=QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, user_id, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscribers.pop(user_id, None)
+
+    def publish(self, user_id, event):
+        """Deliver an event to every stream of a user; callable from any thread."""
+        with self._lock:
+            subscriptions = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscriptions:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                pass  # Event loop already closed; stream is going away
+
+    @staticmethod
+    def _deliver(queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+
+broker = OrderEventBroker()
+
+
+def order_event(order):
+    """Event payload for an order (a dict with the fields the status page shows)."""
+    return {
+        'id': order.id,
+        'title': order.title,
+        'status': order.status,
+        'priority': order.priority,
+        'is_deleted': order.is_deleted,
+        'updated_at': order.updated_at,
+    }
+
+
+def event_cursor(event):
+    """(updated_at, id) position of an event; orders are streamed in this order."""
+    return event['updated_at'], event['id']
+
+
+def format_cursor(cursor):
+    """SSE id line for a cursor; browsers send it back as Last-Event-ID on reconnect."""
+    updated_at, pk = cursor
+    return f'id: {updated_at.isoformat()}|{pk}\n'
+
+
+def format_event(event):
+    """Serialize an event in SSE wire format; the event id is its (updated_at, id) cursor."""
+    data = json.dumps({**event, 'updated_at': event['updated_at'].isoformat()})
+    return f'{format_cursor(event_cursor(event))}event: order\ndata: {data}\n\n'
+
+
+def parse_cursor(last_event_id):
+    """
+    Resume point from a Last-Event-ID header, or (now, 0) for a fresh connection.
+
+    The header comes from the client: anything malformed, including a
+    timestamp without a timezone, starts from now instead of failing.
+    """
+    updated_at, _, pk = (last_event_id or '').partition('|')
+    try:
+        cursor = parse_datetime(updated_at), int(pk or 0)
+    except ValueError:
+        cursor = None, 0
+    if cursor[0] is None or timezone.is_naive(cursor[0]):
+        return timezone.now(), 0
+    return cursor
+
+
+def changed_orders(user_id, cursor, limit=100):
+    """Events for a user's orders (including soft-deleted ones) after the (updated_at, id) cursor."""
+    updated_at, pk = cursor
+    orders = Order.all_objects.filter(user_id=user_id).filter(
+        Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk)
+    ).order_by('updated_at', 'id')[:limit]
+    return [order_event(order) for order in orders]
+
+
+async def stream_order_events(user_id, cursor):
+    """
+    Async generator of SSE messages for a user's orders.
+
+    Closes after ORDER_EVENTS_MAX_DURATION seconds; browsers reconnect
+    automatically and resume from the Last-Event-ID they received.
+    """
+    poll_interval = settings.ORDER_EVENTS_POLL_INTERVAL
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.ORDER_EVENTS_MAX_DURATION
+    subscription = broker.subscribe(user_id)
+    queue = subscription[1]
+    try:
+        # Give fresh clients a resume point before any event arrives
+        yield f'retry: {poll_interval * 1000}\n{format_cursor(cursor)}\n'
+        while loop.time() < deadline:
+            try:
+                events = [await asyncio.wait_for(queue.get(), timeout=poll_interval)]
+            except asyncio.TimeoutError:
+                events = await sync_to_async(changed_orders)(user_id, cursor)
+            if not events:
+                yield f': keepalive\n{format_cursor(cursor)}\n'
+                continue
+            for event in events:
+                cursor = max(cursor, event_cursor(event))
+                yield format_event(event)
+    finally:
+        broker.unsubscribe(user_id, subscription)
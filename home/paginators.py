@@ -0,0 +1,54 @@
+"""
+Paginator for admin changelists over very large tables.
+
+Django's Paginator runs an exact ``COUNT(*)``, which on PostgreSQL scans
+the whole table. The admin runs that count on every changelist page.
+``EstimatedCountPaginator`` counts an unfiltered queryset differently. On
+PostgreSQL it takes the planner's row estimate (``pg_class.reltuples``) once
+the table is large enough for the estimate to be good. On other databases it
+caches the exact count of a large table for a few minutes. Filtered querysets (searches,
+list filters) are usually much smaller, so they are still counted exactly.
+"""
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+ESTIMATE_THRESHOLD = 100000  # Rows; below this the exact count is cheap enough
+COUNT_CACHE_TIMEOUT = 300  # Seconds a cached count is reused on other databases
+
+
+def estimated_row_count(model, using='default'):
+    """Planner estimate of a table's rows on PostgreSQL; None elsewhere or if never analyzed."""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [model._meta.db_table])
+        row = cursor.fetchone()
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that estimates (PostgreSQL) or caches the count of an unfiltered table."""
+
+    estimate_threshold = ESTIMATE_THRESHOLD
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query') or queryset.query.where:
+            return super().count
+        model = queryset.model
+        estimate = estimated_row_count(model, queryset.db)
+        if estimate is not None and estimate >= self.estimate_threshold:
+            return estimate
+        if estimate is not None:
+            return super().count
+        key = f'admin_count:{model._meta.db_table}'
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            if count >= self.estimate_threshold:
+                cache.set(key, count, COUNT_CACHE_TIMEOUT)
+        return count
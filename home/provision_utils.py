@@ -0,0 +1,206 @@
+"""
+Utility functions for bulk user provisioning from CSV.
+
+Onboarding a corporate client creates hundreds of accounts. Signing them up
+one by one costs two existence queries, a password hash, an audit row and an
+email each. Here all rows are validated up front, with one query each for
+taken usernames and emails, both compared case-insensitively. Hashing
+passwords is the slow part. The ``provision_users`` command hashes them in
+a process pool. The admin page hashes and emails inline so web workers
+never fork, so it takes at most ADMIN_PROVISION_MAX_ROWS rows and sends
+larger files to the command. Users are inserted with
+bulk_create. Rows whose username was taken after validation (for example by
+a concurrent signup) are reported and skipped. Signup audit rows are written
+in one batch, and the welcome emails go out over a single mail connection
+once the transaction commits.
+"""
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from home.audit_utils import get_client_ip, get_user_agent
+from home.email_utils import send_welcome_emails
+from home.models import AuditLog
+
+PROVISION_FIELDS = ('username', 'email')  # Required; password, first_name, last_name are optional
+PROVISION_BATCH_SIZE = 500
+MIN_PASSWORD_LENGTH = 8  # Same rule as signupUser
+MAX_REPORTED_ERRORS = 200
+ADMIN_PROVISION_MAX_ROWS = 50  # Keeps an admin request to a few seconds of hashing and email
+
+
+class ProvisionResult:
+    """Outcome of a provisioning run: created users and rejected rows."""
+
+    def __init__(self):
+        self.created = 0
+        self.rejected = 0
+        self.errors = []  # (row number, message); the header is row 1
+        self.emails_sent = 0
+
+    def add_error(self, row_number, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row_number, message))
+
+
+def _init_worker():
+    # Spawned workers start without Django; forked ones already have it
+    django.setup()
+
+
+def hash_passwords(passwords, workers=1):
+    """
+    Hash raw passwords with the default hasher; '' gives an unusable password.
+
+    ``workers`` > 1 (or None, one per CPU) hashes in a process pool. Only
+    use a pool from management commands, never inside a web request.
+    """
+    raw = [password or None for password in passwords]
+    if workers == 1 or len(raw) < 2:
+        return [make_password(password) for password in raw]
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(raw) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        return list(executor.map(make_password, raw, chunksize=chunksize))
+
+
+def _validate_rows(reader, result):
+    """Valid rows as (row number, dict); problems are recorded on ``result``."""
+    rows = []
+    seen_usernames, seen_emails = set(), set()
+    username_validator = User.username_validator
+    for row_number, row in enumerate(reader, start=2):
+        row = {key: (value or '').strip() for key, value in row.items() if key}
+        username, email, password = row.get('username', ''), row.get('email', '').lower(), row.get('password', '')
+        try:
+            if not username or not email:
+                raise ValidationError('username and email are required.')
+            username_validator(username)
+            validate_email(email)
+        except ValidationError as e:
+            result.add_error(row_number, ' '.join(e.messages))
+            continue
+        if password and len(password) < MIN_PASSWORD_LENGTH:
+            result.add_error(row_number, f'Password must be at least {MIN_PASSWORD_LENGTH} characters long.')
+        elif username.lower() in seen_usernames or email in seen_emails:
+            result.add_error(row_number, 'Duplicate username or email in the file.')
+        else:
+            seen_usernames.add(username.lower())
+            seen_emails.add(email)
+            rows.append((row_number, dict(row, username=username, email=email)))
+
+    return _reject_taken(rows, result)
+
+
+def _reject_taken(rows, result):
+    """Rows whose username and email are still free; the others are recorded on ``result``."""
+    # One query each for accounts that already exist, ignoring case like the in-file checks
+    usernames = {row['username'].lower() for _, row in rows}
+    emails = {row['email'] for _, row in rows}
+    taken_usernames = {name.lower() for name in User.objects.alias(username_lower=Lower('username'))
+                       .filter(username_lower__in=usernames).values_list('username', flat=True)}
+    taken_emails = {address.lower() for address in User.objects.alias(email_lower=Lower('email'))
+                    .filter(email_lower__in=emails).values_list('email', flat=True)}
+    valid = []
+    for row_number, row in rows:
+        if row['username'].lower() in taken_usernames:
+            result.add_error(row_number, 'Username already taken.')
+        elif row['email'] in taken_emails:
+            result.add_error(row_number, 'Email already in use.')
+        else:
+            valid.append((row_number, row))
+    return valid
+
+
+def provision_users_csv(stream, request=None, send_emails=True, workers=1, batch_size=PROVISION_BATCH_SIZE,
+                        max_rows=None):
+    """
+    Create user accounts from a text stream of CSV data.
+
+    Args:
+        stream: Text file-like object; columns username, email and optionally
+            password (blank = unusable, the user sets one via password reset),
+            first_name, last_name
+        request: Optional request, for audit IP/user agent and email links
+        send_emails: Queue welcome emails once the users are committed
+        workers: Hashing processes (default 1 = inline; None = one per CPU)
+        batch_size: Users per bulk_create
+        max_rows: Reject the whole file, creating nobody, if it has more data rows
+
+    Returns:
+        ProvisionResult
+    """
+    result = ProvisionResult()
+    reader = csv.DictReader(stream)
+    missing = [field for field in PROVISION_FIELDS if field not in (reader.fieldnames or [])]
+    if missing:
+        result.add_error(1, f"Missing column(s): {', '.join(missing)}")
+        return result
+
+    if max_rows is not None:
+        reader = list(islice(reader, max_rows + 1))
+        if len(reader) > max_rows:
+            result.add_error(1, f'The file has more than {max_rows} rows; '
+                                f'use the provision_users management command for larger files.')
+            return result
+
+    rows = _validate_rows(reader, result)
+    if not rows:
+        return result
+
+    hashes = hash_passwords([row.get('password', '') for _, row in rows], workers=workers)
+    users = [
+        User(
+            username=row['username'],
+            email=row['email'],
+            first_name=row.get('first_name', '')[:150],
+            last_name=row.get('last_name', '')[:150],
+            password=password_hash,
+        )
+        for (_, row), password_hash in zip(rows, hashes)
+    ]
+
+    ip_address = get_client_ip(request) if request else None
+    user_agent = get_user_agent(request) if request else ''
+
+    with transaction.atomic():
+        while True:
+            try:
+                with transaction.atomic():
+                    created = User.objects.bulk_create(users, batch_size=batch_size)
+                break
+            except IntegrityError:
+                # A username was taken since validation, e.g. by a signup; report and skip it
+                free = _reject_taken(rows, result)
+                if len(free) == len(rows):
+                    raise
+                free_rows = {row_number for row_number, _ in free}
+                users = [user for (row_number, _), user in zip(rows, users) if row_number in free_rows]
+                rows = free
+        # bulk_create skips the post_save signal that logs signups
+        AuditLog.objects.bulk_create([
+            AuditLog(
+                user=user,
+                action='signup',
+                description=f'New user {user.username} provisioned',
+                ip_address=ip_address,
+                user_agent=user_agent,
+            )
+            for user in created
+        ], batch_size=batch_size)
+        if send_emails:
+            def send():
+                result.emails_sent = send_welcome_emails(created, request)
+            transaction.on_commit(send)
+    result.created = len(created)
+    return result
@@ -0,0 +1,131 @@
+"""
+Database-backed counter cache for django_ratelimit.
+
+With LocMemCache every gunicorn worker counted separately, so a 5/m limit
+was really 5/m per worker. This backend keeps the counters in a single
+table (RateLimitCounter) shared by every worker and node. Each cache call
+runs one SQL statement, either an upsert or an ``UPDATE ... RETURNING``, so
+concurrent requests never lose an increment. A later ``add`` overwrites an
+expired window in place.
+
+Expired rows are purged about every PURGE_INTERVAL seconds by one worker
+in total, not by every worker. A worker whose own interval has passed
+tries to claim a shared marker row (PURGE_KEY) with the same conditional
+upsert ``add`` uses, and only the one that claims it runs the DELETE.
+
+Limits are still counted in fixed windows, not a sliding window or token
+bucket. django_ratelimit picks the window itself (one per key and period,
+offset by a hash of the key) and only asks the cache to ``add`` and
+``incr`` that window's counter, so a cache backend cannot change the
+algorithm. Like any fixed window, a client can get up to twice the rate
+through across a window boundary. This backend only fixes the
+per-worker counting.
+
+Only integer values are stored. Use it as RATELIMIT_USE_CACHE, not as a
+general cache. It needs ``INSERT ... ON CONFLICT`` and ``RETURNING``
+(PostgreSQL, SQLite 3.35+).
+"""
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.db import connections, router
+
+FOREVER = 2 ** 62  # Expiry for timeout=None
+PURGE_KEY = 'purge'  # Marker row; cache keys always carry a ":<version>:" prefix, so it cannot clash
+
+
+class CounterCache(BaseCache):
+    """Cache backend storing integer counters in the RateLimitCounter table."""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.purge_interval = int(options.get('PURGE_INTERVAL', 300))
+        self._next_purge = 0
+
+    @property
+    def model(self):
+        from home.models import RateLimitCounter
+        return RateLimitCounter
+
+    def _cursor(self):
+        return connections[router.db_for_write(self.model)].cursor()
+
+    def _sql(self, sql):
+        connection = connections[router.db_for_write(self.model)]
+        return sql.format(table=connection.ops.quote_name(self.model._meta.db_table))
+
+    def get_backend_timeout(self, timeout=DEFAULT_TIMEOUT):
+        """Absolute expiry in Unix seconds."""
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        return FOREVER if timeout is None else int(time.time() + max(timeout, 0))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = int(time.time())
+        self._purge_expired(now)
+        return self._claim(key, int(value), self.get_backend_timeout(timeout), now)
+
+    def _claim(self, key, value, expires, now):
+        # Inserts, or takes over a row whose window has ended; a live row is left alone
+        with self._cursor() as cursor:
+            cursor.execute(self._sql(
+                'INSERT INTO {table} ("key", "value", "expires") VALUES (%s, %s, %s) '
+                'ON CONFLICT ("key") DO UPDATE SET "value" = excluded."value", "expires" = excluded."expires" '
+                'WHERE {table}."expires" <= %s'
+            ), [key, value, expires, now])
+            return cursor.rowcount == 1
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._cursor() as cursor:
+            cursor.execute(self._sql(
+                'INSERT INTO {table} ("key", "value", "expires") VALUES (%s, %s, %s) '
+                'ON CONFLICT ("key") DO UPDATE SET "value" = excluded."value", "expires" = excluded."expires"'
+            ), [key, int(value), self.get_backend_timeout(timeout)])
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._cursor() as cursor:
+            cursor.execute(self._sql(
+                'SELECT "value" FROM {table} WHERE "key" = %s AND "expires" > %s'
+            ), [key, int(time.time())])
+            row = cursor.fetchone()
+        return default if row is None else row[0]
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._cursor() as cursor:
+            cursor.execute(self._sql(
+                'UPDATE {table} SET "value" = "value" + %s WHERE "key" = %s AND "expires" > %s RETURNING "value"'
+            ), [int(delta), key, int(time.time())])
+            row = cursor.fetchone()
+        if row is None:
+            raise ValueError(f"Key '{key}' not found")
+        return row[0]
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self.model.objects.filter(key=key, expires__gt=int(time.time())).update(
+            expires=self.get_backend_timeout(timeout)
+        ) == 1
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self.model.objects.filter(key=key).delete()[0] > 0
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self.model.objects.filter(key=key, expires__gt=int(time.time())).exists()
+
+    def clear(self):
+        self.model.objects.all().delete()
+
+    def _purge_expired(self, now):
+        if now < self._next_purge:
+            return
+        self._next_purge = now + self.purge_interval
+        # Whichever worker moves the marker's expiry forward purges; the rest skip this round
+        if self._claim(PURGE_KEY, 0, self._next_purge, now):
+            self.model.objects.filter(expires__lte=now).delete()
@@ -0,0 +1,123 @@
+"""
+Utility functions for fuzzy (trigram) order search.
+
+On PostgreSQL the pg_trgm extension does the work. Other databases use the
+precomputed OrderSearchTrigram table, which is kept up to date from the
+Order post_save signal.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Count, Q
+
+from home.models import Order, OrderSearchTrigram
+
+# Same default as pg_trgm.similarity_threshold
+SIMILARITY_THRESHOLD = 0.3
+
+# Order fields covered by fuzzy search
+FUZZY_FIELDS = ('title', 'client_name')
+
+_WORD_RE = re.compile(r'[^\W_]+')
+
+
+def trigrams(text):
+    """
+    Return the set of trigrams for a string, following pg_trgm rules.
+
+    Each alphanumeric word is lower-cased and padded with two spaces in front
+    and one behind, so "Linen" yields "  l", " li", "lin", "ine", "nen", "en ".
+    """
+    result = set()
+    for word in _WORD_RE.findall((text or '').lower()):
+        padded = f'  {word} '
+        for i in range(len(padded) - 2):
+            result.add(padded[i:i + 3])
+    return result
+
+
+def similarity(a, b):
+    """Trigram similarity of two strings (0.0 - 1.0), as pg_trgm.similarity()."""
+    trgm_a, trgm_b = trigrams(a), trigrams(b)
+    if not trgm_a or not trgm_b:
+        return 0.0
+    return len(trgm_a & trgm_b) / len(trgm_a | trgm_b)
+
+
+def uses_pg_trgm():
+    """Whether the database can run fuzzy search natively via pg_trgm."""
+    return connection.vendor == 'postgresql'
+
+
+def index_order_trigrams(order):
+    """Rebuild the stored trigrams for a single order."""
+    OrderSearchTrigram.objects.filter(order=order).delete()
+    index_new_orders_trigrams([order])
+
+
+def index_new_orders_trigrams(orders, batch_size=1000):
+    """Store trigrams for newly created orders (e.g. after bulk_create, which skips signals)."""
+    if uses_pg_trgm():
+        return
+    OrderSearchTrigram.objects.bulk_create([
+        OrderSearchTrigram(order=order, field=field, trigram=trigram)
+        for order in orders
+        for field in FUZZY_FIELDS
+        for trigram in trigrams(getattr(order, field))
+    ], batch_size=batch_size)
+
+
+def fuzzy_search_orders(query, queryset=None, threshold=SIMILARITY_THRESHOLD):
+    """
+    Find orders whose title or client name is similar to the query.
+
+    Args:
+        query: Search text
+        queryset: Optional Order queryset to restrict the search (e.g. a user's orders)
+        threshold: Minimum similarity for a match
+
+    Returns:
+        List of Order instances ranked by similarity, each with a
+        ``similarity`` attribute
+    """
+    if queryset is None:
+        queryset = Order.objects.all()
+
+    if uses_pg_trgm():
+        from django.contrib.postgres.search import TrigramSimilarity
+        from django.db.models.functions import Greatest
+
+        return list(
+            queryset.annotate(
+                similarity=Greatest(*[TrigramSimilarity(field, query) for field in FUZZY_FIELDS])
+            ).filter(similarity__gte=threshold).order_by('-similarity', '-created_at')
+        )
+
+    query_trigrams = trigrams(query)
+    if not query_trigrams:
+        return []
+
+    # One grouped query: total and matching trigram counts per (order, field)
+    # for every order sharing at least one trigram with the query.
+    candidates = OrderSearchTrigram.objects.filter(
+        trigram__in=query_trigrams
+    ).values('order_id')
+    rows = OrderSearchTrigram.objects.filter(
+        order__in=queryset.filter(pk__in=candidates)
+    ).values('order_id', 'field').annotate(
+        total=Count('id'),
+        hits=Count('id', filter=Q(trigram__in=query_trigrams)),
+    )
+
+    scores = {}
+    for row in rows:
+        score = row['hits'] / (row['total'] + len(query_trigrams) - row['hits'])
+        if score > scores.get(row['order_id'], 0.0):
+            scores[row['order_id']] = score
+
+    matched = {pk: score for pk, score in scores.items() if score >= threshold}
+    orders = list(queryset.filter(pk__in=matched))
+    for order in orders:
+        order.similarity = matched[order.pk]
+    orders.sort(key=lambda o: (-o.similarity, -o.created_at.timestamp()))
+    return orders
@@ -0,0 +1,69 @@
+"""
+Session store and utility functions for pruning expired sessions.
+
+``clearsessions`` deletes every expired row in one statement, which holds
+locks on django_session for as long as the delete takes on a large table.
+``purge_expired_sessions`` instead deletes in small batches selected
+through the ``expire_date`` index, committing each batch on its own and
+optionally pausing between batches so live logins are never blocked for
+long.
+
+This module is also the SESSION_ENGINE: ``SessionStore`` is the cached_db
+store, except that a session logged in through ModelBackend is switched to
+CachedModelBackend when it is loaded (see home/auth_backends.py).
+"""
+import time
+
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.contrib.sessions.backends import cached_db
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+
+from .auth_backends import CACHED_BACKEND, LEGACY_BACKEND
+
+SESSION_PURGE_BATCH_SIZE = 1000
+
+
+class SessionStore(cached_db.SessionStore):
+    """cached_db store that upgrades sessions logged in through ModelBackend."""
+
+    def load(self):
+        data = super().load()
+        if data.get(BACKEND_SESSION_KEY) == LEGACY_BACKEND:
+            data[BACKEND_SESSION_KEY] = CACHED_BACKEND
+            self.modified = True
+        return data
+
+
+def purge_expired_sessions(batch_size=SESSION_PURGE_BATCH_SIZE, pause=0.0, max_batches=None):
+    """
+    Delete expired sessions batch by batch.
+
+    Args:
+        batch_size: Rows deleted per statement
+        pause: Seconds to sleep between batches
+        max_batches: Stop after this many batches (None = until none are left)
+
+    Returns:
+        (rows deleted, seconds taken)
+    """
+    started = time.monotonic()
+    now = timezone.now()
+    deleted = batches = 0
+    while max_batches is None or batches < max_batches:
+        keys = list(
+            Session.objects.filter(expire_date__lt=now)
+            .order_by('expire_date')
+            .values_list('session_key', flat=True)[:batch_size]
+        )
+        if not keys:
+            break
+        # Re-check the expiry: a session renewed since the select is kept
+        count, _ = Session.objects.filter(session_key__in=keys, expire_date__lt=now).delete()
+        deleted += count
+        batches += 1
+        if len(keys) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return deleted, time.monotonic() - started
@@ -1,14 +1,23 @@
 """
 Django signals for handling model events
 """
-from django.db.models.signals import post_save, pre_save
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.signals import user_logged_in, user_logged_out
 from django.contrib.auth.models import User
-from .models import Order
+from .models import Order, Client, ServicePage, PartnerLogo, StoredBlob, normalize_client_name
 from .email_utils import send_order_status_update_email
 from .audit_utils import log_activity
+from .cache_utils import bump_cache_version, SERVICES_PAGE_NAMESPACE
+from .order_events import broker, order_event
+from .webhooks import enqueue_order_event, order_event_type
+from .search_utils import index_order_trigrams, uses_pg_trgm, FUZZY_FIELDS
+from .image_utils import delete_logo_files
+from .auth_backends import invalidate_cached_user
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
@@ -50,20 +59,116 @@ def log_user_signup(sender, instance, created, **kwargs):
         logger.info(f"New user registered: {instance.username}")
 
 
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    """Make the next request load the changed user from the database."""
+    invalidate_cached_user(instance.pk)
+
+
 @receiver(pre_save, sender=Order)
 def track_order_status_change(sender, instance, **kwargs):
     """Track if order status has changed before saving."""
+    instance._old_client_name = None
+    instance._old_client_share = None
+    instance._old_file = None
     if instance.pk:  # Only for existing orders
         try:
-            old_instance = Order.objects.get(pk=instance.pk)
+            old_instance = Order.all_objects.get(pk=instance.pk)
             instance._status_changed = old_instance.status != instance.status
             instance._old_status = old_instance.status
+            instance._old_client_name = old_instance.client_name
+            instance._old_client_share = _client_share(old_instance)
+            instance._old_file = old_instance.file.name or None
         except Order.DoesNotExist:
             instance._status_changed = False
     else:
         instance._status_changed = False
 
 
+@receiver(pre_save, sender=Order)
+def assign_order_client(sender, instance, **kwargs):
+    """Link the order to its normalized Client record."""
+    if instance.client_id is not None and instance._old_client_name is not None and (
+        normalize_client_name(instance._old_client_name) == normalize_client_name(instance.client_name)
+    ):
+        return
+    instance.client = Client.objects.get_for_name(instance.client_name) if instance.client_name else None
+
+
+def _client_share(order):
+    """The (client_id, quantity) an order contributes to its client's counters, if any."""
+    if order.client_id is None or order.is_deleted:
+        return None
+    return (order.client_id, order.quantity)
+
+
+def _apply_client_share(share, sign):
+    """Add (sign=1) or remove (sign=-1) an order's share from its client's counters."""
+    if share is None:
+        return
+    client_id, quantity = share
+    Client.objects.filter(pk=client_id).update(
+        order_count=F('order_count') + sign,
+        total_quantity=F('total_quantity') + sign * quantity
+    )
+
+
+@receiver(post_save, sender=Order)
+def update_client_counters(sender, instance, created, **kwargs):
+    """Keep per-client order/quantity counters in step with the order."""
+    old_share = None if created else getattr(instance, '_old_client_share', None)
+    new_share = _client_share(instance)
+    if old_share != new_share:
+        _apply_client_share(old_share, -1)
+        _apply_client_share(new_share, 1)
+
+
+@receiver(post_delete, sender=Order)
+def release_client_counters(sender, instance, **kwargs):
+    """Remove a hard-deleted order from its client's counters."""
+    _apply_client_share(_client_share(instance), -1)
+
+
+@receiver(pre_save, sender=Order)
+def remember_attachment_name(sender, instance, **kwargs):
+    """Keep the original file name; storage renames attachments to their content digest."""
+    if instance.file and not instance.file._committed:
+        instance.file_name = os.path.basename(instance.file.name)[:255]
+    elif not instance.file:
+        instance.file_name = ''
+
+
+@receiver(post_save, sender=Order)
+def release_replaced_attachment(sender, instance, created, **kwargs):
+    """Drop the reference to an attachment that was replaced or cleared."""
+    old_file = getattr(instance, '_old_file', None)
+    if old_file and old_file != instance.file.name:
+        instance.file.storage.delete(old_file)
+
+
+@receiver(post_save, sender=Order)
+def sync_order_thumbnail(sender, instance, created, **kwargs):
+    """Reuse a finished thumbnail when an order gets an attachment that already has one."""
+    if (instance.file.name or None) == getattr(instance, '_old_file', None):
+        return
+    thumbnail = ''
+    if instance.file:
+        thumbnail = StoredBlob.objects.filter(
+            name=instance.file.name, thumbnail_status='ready'
+        ).values_list('thumbnail', flat=True).first() or ''
+    if thumbnail != instance.thumbnail:
+        instance.thumbnail = thumbnail
+        Order.all_objects.filter(pk=instance.pk).update(thumbnail=thumbnail)
+
+
+@receiver(post_delete, sender=Order)
+def release_attachment(sender, instance, **kwargs):
+    """Drop a hard-deleted order's reference to its attachment."""
+    if instance.file:
+        instance.file.storage.delete(instance.file.name)
+
+
 @receiver(post_save, sender=Order)
 def send_status_update_email(sender, instance, created, **kwargs):
     """Send email and log activity when order status is updated."""
@@ -89,3 +194,43 @@ def send_status_update_email(sender, instance, created, **kwargs):
         logger.info(f"Order {instance.id} status changed from {instance._old_status} to {instance.status}")
         send_order_status_update_email(instance)
 
+
+
+@receiver(post_save, sender=Order)
+def update_order_search_trigrams(sender, instance, created, update_fields=None, **kwargs):
+    """Keep the fuzzy search trigram table in sync (not needed with pg_trgm)."""
+    if uses_pg_trgm():
+        return
+    if update_fields is not None and not set(update_fields) & set(FUZZY_FIELDS):
+        return
+    index_order_trigrams(instance)
+
+
+@receiver(post_save, sender=ServicePage)
+@receiver(post_delete, sender=ServicePage)
+@receiver(post_save, sender=PartnerLogo)
+@receiver(post_delete, sender=PartnerLogo)
+def invalidate_services_page(sender, **kwargs):
+    """Drop the cached services page whenever its content or logos change."""
+    bump_cache_version(SERVICES_PAGE_NAMESPACE)
+
+
+@receiver(post_delete, sender=PartnerLogo)
+def delete_partner_logo_files(sender, instance, **kwargs):
+    """Remove a deleted logo's image and its generated variants."""
+    if instance.logo:
+        delete_logo_files(instance.logo.storage, [instance.logo.name, *instance.variants.values()])
+
+
+@receiver(post_save, sender=Order)
+def publish_order_event(sender, instance, **kwargs):
+    """Push the saved order to the owner's live status streams after commit."""
+    if instance.user_id:
+        event = order_event(instance)
+        transaction.on_commit(lambda: broker.publish(instance.user_id, event))
+
+
+@receiver(post_save, sender=Order)
+def queue_order_webhooks(sender, instance, created, **kwargs):
+    """Write the change to the webhook outbox in the order's own transaction."""
+    enqueue_order_event(instance, order_event_type(instance, created))
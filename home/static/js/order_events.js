@@ -0,0 +1,23 @@
+/**
+ * Live Order Status
+ * Listens for order status events (Server-Sent Events) and refreshes the page
+ */
+
+(function() {
+    const script = document.currentScript;
+
+    document.addEventListener('DOMContentLoaded', function() {
+        if (!window.EventSource || !script) return;
+
+        const source = new EventSource(script.dataset.eventsUrl);
+        let refreshTimer = null;
+
+        source.addEventListener('order', function() {
+            // Coalesce bursts of updates (e.g. bulk status changes) into one refresh
+            clearTimeout(refreshTimer);
+            refreshTimer = setTimeout(function() {
+                window.location.reload();
+            }, 1000);
+        });
+    });
+})();
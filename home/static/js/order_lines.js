@@ -0,0 +1,22 @@
+/**
+ * Order Line Items
+ * Adds rows to the order's line item formset from its empty-form template
+ */
+
+(function() {
+    document.addEventListener('DOMContentLoaded', function() {
+        const button = document.getElementById('add-order-line');
+        const template = document.getElementById('order-line-template');
+        const rows = document.getElementById('order-lines');
+        const total = document.getElementById('id_lines-TOTAL_FORMS');
+        const max = document.getElementById('id_lines-MAX_NUM_FORMS');
+        if (!button || !template || !rows || !total) return;
+
+        button.addEventListener('click', function() {
+            const index = parseInt(total.value, 10);
+            if (max && index >= parseInt(max.value, 10)) return;
+            rows.insertAdjacentHTML('beforeend', template.innerHTML.replace(/__prefix__/g, index));
+            total.value = index + 1;
+        });
+    });
+})();
@@ -0,0 +1,144 @@
+"""
+Static files storage for production: hashed names, precompression and image variants.
+
+Used as the ``staticfiles`` storage when DEBUG is off. ``collectstatic``
+first hashes every file (ManifestStaticFilesStorage), so hashed URLs can be
+cached forever. It then writes, next to each hashed file:
+
+* ``.gz`` and ``.br`` copies of text assets (CSS, JS, SVG, ...), for the
+  front proxy or WhiteNoise to serve to clients that accept them;
+* ``.webp`` (and ``.avif`` where Pillow can encode it) versions of raster
+  images, kept only when smaller than the original.
+
+Image variants are recorded in the manifest and used by the
+``{% static_picture %}`` template tag.
+"""
+import gzip
+import io
+import json
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, StaticFilesStorage
+from django.core.files.base import ContentFile
+from PIL import Image
+
+try:
+    import brotli
+except ImportError:  # Optional; only gzip copies are written without it
+    brotli = None
+
+try:
+    import pillow_avif  # noqa: F401  Registers the AVIF plugin on Pillow < 11.3
+except ImportError:
+    pass
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.svg', '.json', '.map', '.txt', '.xml', '.ico')
+COMPRESS_MIN_SIZE = 256  # Bytes; smaller files are not worth a compressed copy
+RASTER_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+IMAGE_VARIANT_FORMATS = (
+    # (manifest key, Pillow format, save options); best first
+    ('avif', 'AVIF', {'quality': 55}),
+    ('webp', 'WEBP', {'quality': 80, 'method': 6}),
+)
+
+
+def _can_encode(image_format):
+    Image.init()
+    return image_format in Image.SAVE
+
+
+class OptimizedStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also precompresses text and converts images."""
+
+    def load_manifest(self):
+        content = self.read_manifest()
+        try:
+            self.image_variants = json.loads(content).get('variants', {}) if content else {}
+        except json.JSONDecodeError:
+            self.image_variants = {}
+        return super().load_manifest()
+
+    def save_manifest(self):
+        # Same as ManifestFilesMixin.save_manifest, plus the image variants
+        self.manifest_hash = self.file_hash(
+            None, ContentFile(json.dumps(sorted(self.hashed_files.items())).encode())
+        )
+        payload = {
+            'paths': self.hashed_files,
+            'variants': getattr(self, 'image_variants', {}),
+            'version': self.manifest_version,
+            'hash': self.manifest_hash,
+        }
+        if self.manifest_storage.exists(self.manifest_name):
+            self.manifest_storage.delete(self.manifest_name)
+        self.manifest_storage._save(self.manifest_name, ContentFile(json.dumps(payload).encode()))
+
+    def post_process(self, paths, dry_run=False, **options):
+        self.image_variants = {}
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+
+        for name, hashed_name in self.hashed_files.items():
+            extension = os.path.splitext(name)[1].lower()
+            if extension in COMPRESSIBLE_EXTENSIONS:
+                for compressed_name in self._precompress(hashed_name):
+                    yield name, compressed_name, True
+            elif extension in RASTER_EXTENSIONS:
+                variants = self._image_variants(hashed_name)
+                if variants:
+                    self.image_variants[name] = variants
+                    for variant_name in variants.values():
+                        yield name, variant_name, True
+        self.save_manifest()
+
+    def _precompress(self, hashed_name):
+        with self.open(hashed_name) as original:
+            data = original.read()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return []
+        encoders = [('.gz', lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            encoders.append(('.br', lambda d: brotli.compress(d, quality=11)))
+        written = []
+        for suffix, encode in encoders:
+            compressed = encode(data)
+            if len(compressed) < len(data):
+                self._replace(hashed_name + suffix, compressed)
+                written.append(hashed_name + suffix)
+        return written
+
+    def _image_variants(self, hashed_name):
+        """Write smaller AVIF/WebP copies of a hashed image; returns {key: name}."""
+        with self.open(hashed_name) as original:
+            data = original.read()
+        variants = {}
+        image = None
+        for key, image_format, save_options in IMAGE_VARIANT_FORMATS:
+            if not _can_encode(image_format):
+                continue
+            variant_name = os.path.splitext(hashed_name)[0] + '.' + key
+            if self.exists(variant_name):  # Hashed source unchanged since the last run
+                variants[key] = variant_name
+                continue
+            if image is None:
+                with Image.open(io.BytesIO(data)) as source:
+                    image = source.convert('RGBA' if source.mode in ('RGBA', 'LA', 'P') else 'RGB')
+            buffer = io.BytesIO()
+            image.save(buffer, image_format, **save_options)
+            if buffer.tell() < len(data):
+                self._replace(variant_name, buffer.getvalue())
+                variants[key] = variant_name
+        return variants
+
+    def _replace(self, name, content):
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(content))
+
+    def variant_urls(self, name):
+        """{format: url} of the image variants of a static file ({} if none)."""
+        return {
+            key: StaticFilesStorage.url(self, variant_name)
+            for key, variant_name in self.image_variants.get(name, {}).items()
+        }
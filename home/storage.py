@@ -0,0 +1,120 @@
+"""
+Content-addressed, deduplicated file storage for order attachments.
+
+Uploads are streamed to a temporary file in chunks while being hashed, then
+stored under their SHA-256 digest (``orders/ab/cd/abcd....pdf``). Identical
+uploads share one file on disk; a StoredBlob row counts the references, and
+``delete()`` only removes the file once the last reference is released.
+Image blobs are queued for a WebP thumbnail (see home/thumbnails.py), stored
+next to the original.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+# Attachments that get a thumbnail
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+
+
+def thumbnail_name(name):
+    """Storage name of the thumbnail for the blob stored as ``name``."""
+    return os.path.splitext(name)[0] + '.thumb.webp'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by content digest and reference-counts them."""
+
+    def _spool(self, content, directory):
+        """Copy content to a temporary file in ``directory``; returns (digest, size, temp path)."""
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    size += len(chunk)
+                    temp_file.write(chunk)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return digest.hexdigest(), size, temp_path
+
+    def blob_name(self, name, digest):
+        """Storage name for content with the given digest, keeping the upload's directory and extension."""
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(directory, digest[:2], digest[2:4], digest + extension).replace('\\', '/')
+
+    def _save(self, name, content):
+        from home.models import StoredBlob
+
+        digest, size, temp_path = self._spool(content, self.path(os.path.dirname(name)))
+        try:
+            with transaction.atomic():
+                blob, created = StoredBlob.objects.select_for_update().get_or_create(
+                    digest=digest,
+                    defaults={
+                        'name': self.blob_name(name, digest),
+                        'size': size,
+                        'ref_count': 1,
+                        'thumbnail_status': 'pending' if self._is_image(name) else 'none',
+                    },
+                )
+                if not created:
+                    StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+                full_path = self.path(blob.name)
+                if not os.path.exists(full_path):
+                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                    os.replace(temp_path, full_path)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(full_path, self.file_permissions_mode)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return blob.name
+
+    @staticmethod
+    def _is_image(name):
+        return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+    def get_available_name(self, name, max_length=None):
+        # Names are chosen from the digest in _save(); no collision suffixes needed.
+        return name
+
+    def delete(self, name):
+        """Release one reference; the file is removed after the last one is released and committed."""
+        from home.models import StoredBlob
+
+        if not name:
+            raise ValueError('The name must be given to delete().')
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                return  # Not a tracked blob (e.g. uploaded before deduplication); leave it alone
+            if blob.ref_count > 1:
+                StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+                return
+            blob.delete()
+        transaction.on_commit(lambda: self._remove_unreferenced(name, blob.thumbnail))
+
+    def _remove_unreferenced(self, name, thumbnail=''):
+        from home.models import StoredBlob
+
+        # A concurrent upload of the same content may have re-created the blob meanwhile
+        if not StoredBlob.objects.filter(name=name).exists():
+            super().delete(name)
+            if thumbnail:
+                super().delete(thumbnail)
+
+
+attachment_storage = ContentAddressedStorage()
@@ -37,6 +37,11 @@ def breadcrumbs(context):
             {'title': 'Home', 'url': '/'},
             {'title': 'Place Order', 'url': None}
         ],
+        '/orders/import/': [
+            {'title': 'Home', 'url': '/'},
+            {'title': 'Place Order', 'url': '/orders/'},
+            {'title': 'Import Orders', 'url': None}
+        ],
         '/status/': [
             {'title': 'Home', 'url': '/'},
             {'title': 'Order Status', 'url': None}
@@ -60,6 +65,11 @@ def breadcrumbs(context):
             {'title': 'Profile', 'url': '/profile/'},
             {'title': 'Change Password', 'url': None}
         ],
+        '/profile/webhooks/': [
+            {'title': 'Home', 'url': '/'},
+            {'title': 'Profile', 'url': '/profile/'},
+            {'title': 'Webhooks', 'url': None}
+        ],
         '/login/': [
             {'title': 'Login', 'url': None}
         ],
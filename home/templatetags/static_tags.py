@@ -0,0 +1,32 @@
+"""
+Template tags for optimized static images.
+"""
+from django import template
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.forms.utils import flatatt
+from django.templatetags.static import static
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+# Source order matters: browsers use the first type they support
+VARIANT_TYPES = (('avif', 'image/avif'), ('webp', 'image/webp'))
+
+
+@register.simple_tag
+def static_picture(path, **attrs):
+    """
+    Render a static image as <picture> with its AVIF/WebP variants when collectstatic made any.
+    Usage: {% static_picture 'images/logo.jpeg' class="rounded-circle" width=150 height=150 alt="Logo" %}
+    """
+    img = format_html('<img src="{}"{}>', static(path), flatatt({k: str(v) for k, v in attrs.items()}))
+    variant_urls = getattr(staticfiles_storage, 'variant_urls', None)
+    variants = variant_urls(path) if variant_urls else {}
+    if not variants:
+        return img
+    sources = ''.join(
+        format_html('<source type="{}" srcset="{}">', mime_type, variants[key])
+        for key, mime_type in VARIANT_TYPES if key in variants
+    )
+    return format_html('<picture>{}{}</picture>', mark_safe(sources), img)
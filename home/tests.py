@@ -1,10 +1,22 @@
-from django.test import TestCase, TransactionTestCase
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.contrib.auth.models import User
 from django.test import Client
 from django.urls import reverse
 from .models import Contact, Order, AuditLog, ServicePage, PartnerLogo
+from .models import Client as ClientRecord
+from .models import WebhookSubscription, WebhookDelivery
 from datetime import date
+from django.utils import timezone
+import csv
+import io
+import re
 import json
+import asyncio
+import threading
+import importlib.util
+import os
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 # Create your tests here.
 
@@ -88,6 +100,294 @@ class ViewTests(TestCase):
         self.assertTemplateUsed(response, 'signup.html')
 
 
+class RateLimitStoreTests(TestCase):
+    def make_cache(self):
+        from .ratelimit_cache import CounterCache
+        return CounterCache('', {'TIMEOUT': 60})
+    
+    def test_counters_shared_between_workers(self):
+        """Test two cache instances (workers) increment the same counter"""
+        worker_a, worker_b = self.make_cache(), self.make_cache()
+        self.assertTrue(worker_a.add('login:1.2.3.4', 1))
+        self.assertFalse(worker_b.add('login:1.2.3.4', 1))
+        self.assertEqual(worker_b.incr('login:1.2.3.4'), 2)
+        self.assertEqual(worker_a.incr('login:1.2.3.4'), 3)
+        self.assertEqual(worker_b.get('login:1.2.3.4'), 3)
+        with self.assertRaises(ValueError):
+            worker_a.incr('missing')
+    
+    def test_expired_windows_replaced_and_purged(self):
+        """Test an ended window is taken over by add and purged later"""
+        from .models import RateLimitCounter
+        from .ratelimit_cache import PURGE_KEY
+        cache = self.make_cache()
+        cache.add('old', 5, timeout=0)
+        self.assertIsNone(cache.get('old'))
+        self.assertTrue(cache.add('old', 1))
+        self.assertEqual(cache.get('old'), 1)
+        cache.set('stale', 9, timeout=0)
+        cache._next_purge = 0
+        RateLimitCounter.objects.filter(key=PURGE_KEY).update(expires=0)
+        cache.add('fresh', 1)
+        keys = set(RateLimitCounter.objects.exclude(key=PURGE_KEY).values_list('key', flat=True))
+        self.assertEqual(keys, {':1:old', ':1:fresh'})
+    
+    def test_one_worker_purges_per_interval(self):
+        """Test workers share the purge schedule instead of each running their own"""
+        from .models import RateLimitCounter
+        from .ratelimit_cache import PURGE_KEY
+        worker_a, worker_b = self.make_cache(), self.make_cache()
+        worker_a.add('first', 1)
+        worker_a.set('stale', 9, timeout=0)
+        worker_b.add('second', 1)  # Its own interval is due, but worker_a purged this round
+        self.assertTrue(RateLimitCounter.objects.filter(key=':1:stale').exists())
+        
+        RateLimitCounter.objects.filter(key=PURGE_KEY).update(expires=0)
+        worker_b._next_purge = 0
+        worker_b.add('third', 1)
+        self.assertFalse(RateLimitCounter.objects.filter(key=':1:stale').exists())
+    
+    def test_ratelimit_uses_shared_store(self):
+        """Test django_ratelimit counts requests in the shared table"""
+        from django.test import RequestFactory, override_settings
+        from django_ratelimit.core import get_usage
+        request = RequestFactory().post('/login/', REMOTE_ADDR='10.0.0.1')
+        with override_settings(RATELIMIT_ENABLE=True):
+            usages = [get_usage(request, group='login', key='ip', rate='2/m', increment=True) for _ in range(3)]
+        self.assertEqual([usage['count'] for usage in usages], [1, 2, 3])
+        self.assertTrue(usages[2]['should_limit'])
+
+
+class CachedAuthTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        ServicePage.objects.create(title='Our Partners', heading='Heading', content='Content')
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+    
+    def test_authenticated_page_view_needs_no_auth_queries(self):
+        """Test session and user are served from the cache once warm"""
+        self.client.get('/services/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/services/')
+        self.assertEqual(response.wsgi_request.user, self.user)
+    
+    def test_saving_user_refreshes_cached_copy(self):
+        """Test edits and password changes reach the cached request.user"""
+        self.client.get('/services/')
+        self.user.first_name = 'Renamed'
+        self.user.save()
+        response = self.client.get('/services/')
+        self.assertEqual(response.wsgi_request.user.first_name, 'Renamed')
+        
+        self.user.set_password('newpass456')
+        self.user.save()
+        response = self.client.get('/services/')
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+    
+    def test_password_update_without_signal_is_seen_at_next_login(self):
+        """Test a queryset password update reaches the cached user once the user logs in"""
+        from django.contrib.auth.hashers import make_password
+        from .auth_backends import CachedModelBackend
+        backend = CachedModelBackend()
+        self.assertEqual(backend.get_user(self.user.pk).password, self.user.password)
+        User.objects.filter(pk=self.user.pk).update(password=make_password('newpass456'))
+        
+        user = backend.authenticate(None, username='testuser', password='newpass456')
+        self.assertEqual(backend.get_user(self.user.pk).password, user.password)
+        self.assertNotEqual(user.password, self.user.password)
+    
+    def test_production_cache_serves_session_and_user_from_memory(self):
+        """Test the production tiered cache needs no auth, session or cache_table reads for them"""
+        import copy
+        from django.conf import settings
+        from django.core.management import call_command
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        # Same config, but a longer stamp interval so the assertion does not depend on timing
+        production = copy.deepcopy(settings.PRODUCTION_CACHES)
+        production['default']['OPTIONS']['STAMP_CHECK_INTERVAL'] = 60
+        with override_settings(CACHES=dict(settings.CACHES, **production)):
+            call_command('createcachetable', verbosity=0)
+            client = Client()
+            client.login(username='testuser', password='testpass123')
+            client.get('/services/')
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get('/services/')
+        self.assertEqual(response.wsgi_request.user, self.user)
+        # Page fragments are L2-only by design; nothing else may reach the database
+        self.assertEqual([q['sql'] for q in queries if 'template.cache.' not in q['sql']], [])
+    
+    def test_wrong_password_leaves_later_backends_to_run(self):
+        """Test a failed login returns None instead of stopping the backend chain"""
+        from .auth_backends import CachedModelBackend
+        self.assertIsNone(CachedModelBackend().authenticate(None, username='testuser', password='wrong'))
+    
+    def test_sessions_from_model_backend_stay_logged_in(self):
+        """Test sessions created with the plain ModelBackend still resolve their user"""
+        from django.contrib.auth import BACKEND_SESSION_KEY
+        legacy = Client()
+        legacy.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        self.assertEqual(legacy.get('/services/').wsgi_request.user, self.user)
+        self.assertEqual(legacy.session[BACKEND_SESSION_KEY], 'home.auth_backends.CachedModelBackend')
+
+
+class SessionMaintenanceTests(TestCase):
+    def create_sessions(self, count, expire_date):
+        from django.contrib.sessions.models import Session
+        Session.objects.bulk_create(
+            Session(session_key=f'{expire_date:%Y%m%d%H%M%S}{i:08d}', session_data='', expire_date=expire_date)
+            for i in range(count)
+        )
+    
+    def test_expired_sessions_purged_in_batches(self):
+        """Test only expired sessions are deleted, batch by batch"""
+        from datetime import timedelta
+        from django.contrib.sessions.models import Session
+        from .session_utils import purge_expired_sessions
+        self.create_sessions(5, timezone.now() - timedelta(days=1))
+        self.create_sessions(2, timezone.now() + timedelta(days=1))
+        
+        deleted, _ = purge_expired_sessions(batch_size=2, max_batches=2)
+        self.assertEqual((deleted, Session.objects.count()), (4, 3))
+        deleted, _ = purge_expired_sessions(batch_size=2)
+        self.assertEqual((deleted, Session.objects.count()), (1, 2))
+    
+    def test_scheduler_runs_due_jobs_once_per_interval(self):
+        """Test run_scheduler runs each job, then skips it until its interval passes"""
+        from datetime import timedelta
+        from django.core.cache import cache
+        from django.core.management import call_command
+        from django.test import override_settings
+        cache.clear()
+        self.create_sessions(3, timezone.now() - timedelta(days=1))
+        out = io.StringIO()
+        with override_settings(SCHEDULED_JOBS={'clear_expired_sessions': 3600}):
+            call_command('run_scheduler', once=True, stdout=out)
+            call_command('run_scheduler', once=True, stdout=out)
+        self.assertEqual(out.getvalue().count('Running clear_expired_sessions'), 1)
+        self.assertIn('Deleted 3 expired session(s)', out.getvalue())
+
+
+class UserProvisioningTests(TestCase):
+    CSV = (
+        'username,email,password,first_name\n'
+        'alice,Alice@Example.com,longpassword1,Alice\n'
+        'bob,bob@example.com,,Bob\n'
+        'carol,carol@example.com,short,Carol\n'
+        'alice,other@example.com,longpassword2,\n'
+        'taken,new@example.com,longpassword3,\n'
+    )
+    
+    def setUp(self):
+        User.objects.create_user(username='taken', email='taken@example.com', password='testpass123')
+    
+    def test_provision_users_from_csv(self):
+        """Test valid rows become users with audit rows and welcome emails"""
+        from django.core import mail
+        from .provision_utils import provision_users_csv
+        with self.captureOnCommitCallbacks(execute=True):
+            result = provision_users_csv(io.StringIO(self.CSV), workers=2)
+        self.assertEqual((result.created, result.rejected), (2, 3))
+        self.assertEqual([row for row, _ in result.errors], [4, 5, 6])
+        alice = User.objects.get(username='alice')
+        self.assertEqual((alice.email, alice.first_name), ('alice@example.com', 'Alice'))
+        self.assertTrue(alice.check_password('longpassword1'))
+        self.assertFalse(User.objects.get(username='bob').has_usable_password())
+        self.assertEqual(AuditLog.objects.filter(action='signup', description__contains='provisioned').count(), 2)
+        self.assertEqual(result.emails_sent, 2)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['alice@example.com', 'bob@example.com'])
+    
+    def test_username_taken_during_provisioning_is_reported(self):
+        """Test a signup racing the insert rejects only its row instead of failing the run"""
+        from django.db import connection
+        from .provision_utils import provision_users_csv
+        
+        def signup_after_validation(execute, sql, params, many, context):
+            rows = execute(sql, params, many, context)
+            if not raced and 'LOWER("auth_user"."email") IN' in sql:  # The last validation query
+                raced.append(True)
+                User.objects.create_user(username='bob', email='bob@elsewhere.com')
+            return rows
+        
+        raced = []
+        with connection.execute_wrapper(signup_after_validation):
+            result = provision_users_csv(io.StringIO(self.CSV), send_emails=False)
+        self.assertEqual((result.created, result.rejected), (1, 4))
+        self.assertIn((3, 'Username already taken.'), result.errors)
+        self.assertEqual(User.objects.get(username='bob').email, 'bob@elsewhere.com')
+        self.assertTrue(User.objects.filter(username='alice').exists())
+    
+    def test_existing_accounts_matched_ignoring_case(self):
+        """Test usernames and emails already taken in another case are rejected"""
+        from .provision_utils import provision_users_csv
+        User.objects.create_user(username='Dave', email='Erin@Example.com')
+        csv_data = 'username,email\ndave,dave@example.com\nerin,erin@example.com\n'
+        result = provision_users_csv(io.StringIO(csv_data), send_emails=False)
+        self.assertEqual((result.created, result.errors), (0, [(2, 'Username already taken.'), (3, 'Email already in use.')]))
+    
+    def test_admin_provision_page(self):
+        """Test staff can provision users from the user admin"""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='testpass123')
+        self.client.login(username='admin', password='testpass123')
+        self.assertContains(self.client.get('/admin/auth/user/'), 'Provision from CSV')
+        upload = SimpleUploadedFile('users.csv', b'username,email\ndave,dave@example.com\n', content_type='text/csv')
+        response = self.client.post('/admin/auth/user/provision/', {'file': upload})
+        self.assertRedirects(response, '/admin/auth/user/')
+        self.assertFalse(User.objects.get(username='dave').has_usable_password())
+    
+    def test_admin_provision_page_refuses_large_files(self):
+        """Test files over the admin row cap create nobody and point at the command"""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from .provision_utils import ADMIN_PROVISION_MAX_ROWS
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='testpass123')
+        self.client.login(username='admin', password='testpass123')
+        rows = ''.join(f'user{i},user{i}@example.com\n' for i in range(ADMIN_PROVISION_MAX_ROWS + 1))
+        upload = SimpleUploadedFile('users.csv', f'username,email\n{rows}'.encode(), content_type='text/csv')
+        response = self.client.post('/admin/auth/user/provision/', {'file': upload})
+        self.assertContains(response, 'provision_users management command')
+        self.assertFalse(User.objects.filter(username__startswith='user').exists())
+
+
+class PasswordHasherTests(TestCase):
+    def test_password_rehashed_on_login(self):
+        """Test a hash made by an older hasher is upgraded transparently at login"""
+        from django.contrib.auth.hashers import make_password
+        from django.test import override_settings
+        hashers = ['django.contrib.auth.hashers.PBKDF2PasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher']
+        with override_settings(PASSWORD_HASHERS=hashers):
+            user = User.objects.create(username='legacy', password=make_password('testpass123', hasher='md5'))
+            response = self.client.post('/login/', {'username': 'legacy', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, 302)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+    
+    @unittest.skipUnless(importlib.util.find_spec('argon2'), 'argon2-cffi is not installed')
+    def test_tuned_argon2_parameters(self):
+        """Test Argon2 hashes use the configured cost and are redone when it changes"""
+        from django.contrib.auth.hashers import check_password, make_password
+        from django.test import override_settings
+        hashers = ['home.hashers.TunedArgon2PasswordHasher']
+        with override_settings(PASSWORD_HASHERS=hashers, ARGON2_TIME_COST=1, ARGON2_MEMORY_COST=1024):
+            encoded = make_password('testpass123')
+            self.assertIn('m=1024,t=1', encoded)
+            with override_settings(ARGON2_TIME_COST=2):
+                upgraded = []
+                self.assertTrue(check_password('testpass123', encoded, setter=upgraded.append))
+                self.assertEqual(upgraded, ['testpass123'])
+    
+    def test_benchmark_login_command(self):
+        """Test the login benchmark reports a per-step breakdown"""
+        from django.core.management import call_command
+        out = io.StringIO()
+        call_command('benchmark_login', iterations=1, hashers=['django.contrib.auth.hashers.MD5PasswordHasher'], stdout=out)
+        for step in ('hash:', 'user lookup:', 'session:', 'last_login:', 'audit:', 'end-to-end:', 'queries:'):
+            self.assertIn(step, out.getvalue())
+        self.assertFalse(User.objects.filter(username='__login_benchmark__').exists())
+
+
 class AuthenticationTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -204,6 +504,30 @@ class OrderTests(TestCase):
         }, follow=True)
         self.assertTrue(Order.objects.filter(title='Test Order').exists())
     
+    def test_multi_line_order(self):
+        """Test one submission creates an order with all its line items"""
+        from django.core import mail
+        response = self.client.post('/orders/', {
+            'title': 'Thread Colours',
+            'client_name': 'Test Client',
+            'priority': 'Normal',
+            'quantity': '',
+            'description': 'Assorted colours',
+            'lines-TOTAL_FORMS': '4',
+            'lines-INITIAL_FORMS': '0',
+            'lines-0-item': 'Navy', 'lines-0-quantity': '10',
+            'lines-1-item': 'Red', 'lines-1-quantity': '5',
+            'lines-2-item': 'White', 'lines-2-quantity': '7',
+            'lines-3-item': '', 'lines-3-quantity': '',
+        })
+        self.assertEqual(response.status_code, 302)
+        order = Order.objects.get(title='Thread Colours')
+        self.assertEqual(order.quantity, 22)
+        self.assertEqual([line.item for line in order.lines.all()], ['Navy', 'Red', 'White'])
+        self.assertEqual(AuditLog.objects.filter(action='order_created').count(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('White', mail.outbox[0].alternatives[0][0])
+    
     def test_order_status_page(self):
         """Test order status page"""
         response = self.client.get('/status/', follow=True)
@@ -229,6 +553,757 @@ class OrderTests(TestCase):
         self.assertEqual(len(response.context['orders']), 15)
 
 
+class OrderStatusCacheTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.order = Order.objects.create(
+            user=self.user,
+            title='Cached Order',
+            client_name='Test Client',
+            priority='Normal',
+            quantity=1,
+            description='Test'
+        )
+    
+    def test_status_page_reflects_updates(self):
+        """Test cached order cards are replaced when an order changes"""
+        self.assertContains(self.client.get('/status/'), 'Pending')
+        self.order.status = 'Shipped'
+        self.order.save()
+        response = self.client.get('/status/')
+        self.assertContains(response, 'bg-primary fs-6">Shipped')
+        self.assertNotContains(response, 'Pending</span>')
+    
+    def test_admin_bulk_status_update_invalidates_cache(self):
+        """Test queryset updates from admin actions also refresh the page"""
+        self.client.get('/status/')
+        Order.objects.filter(pk=self.order.pk).update(status='Delivered', updated_at=timezone.now())
+        self.assertContains(self.client.get('/status/'), 'bg-success fs-6">Delivered')
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.order = Order.objects.create(
+            user=self.user,
+            title='Tracked Order',
+            client_name='Test Client',
+            priority='Normal',
+            quantity=1,
+            description='Test'
+        )
+    
+    def test_unchanged_status_page_returns_304(self):
+        """Test a repeated request with the same ETag is answered with 304"""
+        response = self.client.get('/status/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('ETag'))
+        # Only the order stamp aggregate: session and user come from the cache
+        with self.assertNumQueries(1):
+            response = self.client.get('/status/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+    
+    def test_changed_orders_return_200(self):
+        """Test the ETag changes when an order changes"""
+        etag = self.client.get('/status/')['ETag']
+        self.order.status = 'Shipped'
+        self.order.save()
+        response = self.client.get('/status/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+    
+    def test_hard_delete_is_not_answered_with_304(self):
+        """Test removing an order revalidates whatever validator the client sends back"""
+        from django.utils.http import http_date
+        etag = self.client.get('/status/')['ETag']
+        Order.all_objects.filter(pk=self.order.pk).delete()
+        since = http_date(timezone.now().timestamp() + 60)
+        self.assertEqual(self.client.get('/status/', HTTP_IF_MODIFIED_SINCE=since).status_code, 200)
+        self.assertEqual(self.client.get('/status/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+    
+    def test_search_etag_depends_on_query(self):
+        """Test different searches do not share an ETag"""
+        etag = self.client.get('/search/', {'q': 'Tracked'})['ETag']
+        self.assertEqual(self.client.get('/search/', {'q': 'Tracked'}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get('/search/', {'q': 'Client'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+    
+    def test_services_etag_follows_content_version(self):
+        """Test services page revalidates until its content is edited"""
+        self.client.get('/services/')  # Creates the default content
+        etag = self.client.get('/services/')['ETag']
+        self.assertEqual(self.client.get('/services/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        ServicePage.objects.update_or_create(defaults={'heading': 'New Heading'})
+        self.assertEqual(self.client.get('/services/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class OrderEventTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+    
+    def test_events_fallback_returns_changes_since_cursor(self):
+        """Test the non-streaming response lists orders changed after Last-Event-ID"""
+        response = self.client.get('/status/events/', HTTP_LAST_EVENT_ID='2000-01-01T00:00:00+00:00')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertNotContains(response, 'event: order')
+        Order.objects.create(
+            user=self.user,
+            title='Live Order',
+            client_name='Test Client',
+            priority='Normal',
+            quantity=1,
+            description='Test'
+        )
+        response = self.client.get('/status/events/', HTTP_LAST_EVENT_ID='2000-01-01T00:00:00+00:00')
+        self.assertContains(response, 'event: order')
+        self.assertContains(response, 'Live Order')
+    
+    def test_events_without_last_event_id_send_resume_point(self):
+        """Test a fresh connection gets an id line and resumes from it, missing no changes"""
+        response = self.client.get('/status/events/')
+        match = re.search(r'^id: (\S+)$', response.content.decode(), re.MULTILINE)
+        self.assertIsNotNone(match)
+        Order.objects.create(
+            user=self.user, title='Between Polls', client_name='Test Client',
+            priority='Normal', quantity=1, description='Test'
+        )
+        response = self.client.get('/status/events/', HTTP_LAST_EVENT_ID=match.group(1))
+        self.assertContains(response, 'Between Polls')
+    
+    def test_invalid_last_event_id_starts_from_now(self):
+        """Test impossible dates, naive timestamps and junk ids fall back to a fresh stream"""
+        for value in ['2024-02-30T00:00:00+00:00', '2000-01-01T00:00:00', '2000-01-01T00:00:00+00:00|x', 'junk']:
+            with self.subTest(last_event_id=value):
+                response = self.client.get('/status/events/', HTTP_LAST_EVENT_ID=value)
+                self.assertEqual(response.status_code, 200)
+    
+    def test_orders_sharing_a_timestamp_are_not_skipped(self):
+        """Test resuming from an event id returns later orders with the same updated_at"""
+        from .order_events import changed_orders
+        orders = [
+            Order.objects.create(user=self.user, title=f'Same Time {i}', client_name='Test Client',
+                                 priority='Normal', quantity=1, description='Test')
+            for i in range(3)
+        ]
+        same_time = timezone.now()
+        Order.all_objects.filter(pk__in=[o.pk for o in orders]).update(updated_at=same_time)
+        first = changed_orders(self.user.pk, (same_time, 0), limit=1)
+        rest = changed_orders(self.user.pk, (same_time, first[0]['id']))
+        self.assertEqual([e['id'] for e in first + rest], sorted(o.pk for o in orders))
+    
+    async def test_stream_receives_published_events(self):
+        """Test the broker pushes an event to an open stream"""
+        from .order_events import broker, stream_order_events
+        stream = stream_order_events(self.user.pk, (timezone.now(), 0))
+        opening = await stream.__anext__()
+        self.assertTrue(opening.startswith('retry:'))
+        self.assertIn('\nid: ', opening)
+        next_message = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+        broker.publish(self.user.pk, {
+            'id': 1, 'title': 'Pushed', 'status': 'Shipped', 'priority': 'Normal',
+            'is_deleted': False, 'updated_at': timezone.now(),
+        })
+        message = await asyncio.wait_for(next_message, timeout=5)
+        self.assertIn('"status": "Shipped"', message)
+        await stream.aclose()
+
+
+class OrderSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.orders = [
+            Order.objects.create(
+                user=self.user,
+                title=f'Sync Order {i}',
+                client_name='Test Client',
+                priority='Normal',
+                quantity=i + 1,
+                description='Test'
+            )
+            for i in range(3)
+        ]
+    
+    def get_changes(self, **params):
+        response = self.client.get('/api/orders/changes/', params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(b''.join(response.streaming_content))
+    
+    def test_paging_with_cursor(self):
+        """Test batches follow the cursor until all changes are returned"""
+        first = self.get_changes(limit=2)
+        self.assertEqual([o['title'] for o in first['orders']], ['Sync Order 0', 'Sync Order 1'])
+        self.assertTrue(first['has_more'])
+        second = self.get_changes(limit=2, cursor=first['next_cursor'])
+        self.assertEqual([o['title'] for o in second['orders']], ['Sync Order 2'])
+        self.assertFalse(second['has_more'])
+        # Nothing changed since: empty batch, same cursor
+        third = self.get_changes(cursor=second['next_cursor'])
+        self.assertEqual(third, {'orders': [], 'next_cursor': second['next_cursor'], 'has_more': False})
+    
+    def test_soft_deleted_orders_are_tombstones(self):
+        """Test deletions since the cursor are reported"""
+        cursor = self.get_changes()['next_cursor']
+        self.orders[0].delete()
+        changes = self.get_changes(cursor=cursor)['orders']
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0]['id'], self.orders[0].id)
+        self.assertTrue(changes[0]['is_deleted'])
+        self.assertNotIn('title', changes[0])
+    
+    def test_gzip_and_authentication(self):
+        """Test gzip on request, cursor validation and anonymous access"""
+        response = self.client.get('/api/orders/changes/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(self.client.get('/api/orders/changes/', {'cursor': 'bogus'}).status_code, 400)
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/orders/changes/').status_code, 401)
+
+
+class WebhookReceiver(BaseHTTPRequestHandler):
+    """Local HTTP endpoint recording webhook POSTs for the tests."""
+    
+    requests = []
+    status_code = 200
+    location = None
+    
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        WebhookReceiver.requests.append((dict(self.headers), body))
+        self.send_response(WebhookReceiver.status_code)
+        if WebhookReceiver.location:
+            self.send_header('Location', WebhookReceiver.location)
+        self.end_headers()
+    
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(WEBHOOK_ALLOW_PRIVATE_ADDRESSES=True)  # The receiver runs on 127.0.0.1
+class WebhookTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), WebhookReceiver)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+    
+    def setUp(self):
+        WebhookReceiver.requests = []
+        WebhookReceiver.status_code = 200
+        WebhookReceiver.location = None
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.subscription = WebhookSubscription.objects.create(
+            user=self.user,
+            url=f'http://127.0.0.1:{self.server.server_address[1]}/hook',
+            secret='test-secret'
+        )
+        for i in range(3):
+            Order.objects.create(
+                user=self.user,
+                title=f'Hooked Order {i}',
+                client_name='Test Client',
+                priority='Normal',
+                quantity=1,
+                description='Test'
+            )
+    
+    def test_events_delivered_in_one_signed_batch(self):
+        """Test pending events for an endpoint are batched and signed"""
+        from .webhooks import WebhookDispatcher, sign_payload
+        dispatcher = WebhookDispatcher()
+        self.assertEqual(dispatcher.deliver_due(), (3, 0))
+        dispatcher.close()
+        
+        self.assertEqual(len(WebhookReceiver.requests), 1)
+        headers, body = WebhookReceiver.requests[0]
+        self.assertEqual(
+            headers['X-Webhook-Signature'],
+            sign_payload('test-secret', headers['X-Webhook-Timestamp'], body)
+        )
+        events = json.loads(body)['events']
+        self.assertEqual([e['type'] for e in events], ['order.created'] * 3)
+        self.assertFalse(WebhookDelivery.objects.exclude(status='delivered').exists())
+    
+    def test_failed_delivery_backs_off(self):
+        """Test failures are rescheduled with backoff and not retried immediately"""
+        from .webhooks import WebhookDispatcher
+        WebhookReceiver.status_code = 500
+        dispatcher = WebhookDispatcher()
+        self.assertEqual(dispatcher.deliver_due(), (0, 3))
+        self.assertEqual(dispatcher.deliver_due(), (0, 0))  # Not due yet
+        dispatcher.close()
+        
+        delivery = WebhookDelivery.objects.first()
+        self.assertEqual((delivery.status, delivery.attempts, delivery.last_error), ('pending', 1, 'HTTP 500'))
+        self.assertGreater(delivery.next_attempt_at, timezone.now())
+    
+    def test_delivery_rechecks_endpoint_address(self):
+        """Test events are not sent to an endpoint that now resolves to a private address"""
+        from .webhooks import WebhookDispatcher
+        dispatcher = WebhookDispatcher()
+        with self.settings(WEBHOOK_ALLOW_PRIVATE_ADDRESSES=False):
+            self.assertEqual(dispatcher.deliver_due(), (0, 3))
+        dispatcher.close()
+        self.assertEqual(WebhookReceiver.requests, [])
+        self.assertIn('not a public address', WebhookDelivery.objects.first().last_error)
+    
+    def test_redirects_not_followed(self):
+        """Test a redirect (e.g. to a metadata service) fails the delivery instead of re-posting"""
+        from .webhooks import WebhookDispatcher
+        WebhookReceiver.status_code = 307
+        WebhookReceiver.location = f'http://127.0.0.1:{self.server.server_address[1]}/internal'
+        dispatcher = WebhookDispatcher()
+        self.assertEqual(dispatcher.deliver_due(), (0, 3))
+        dispatcher.close()
+        self.assertEqual(len(WebhookReceiver.requests), 1)
+        self.assertIn('HTTP 307 redirect', WebhookDelivery.objects.first().last_error)
+    
+    def test_delivery_connects_to_checked_address(self):
+        """Test the request goes to the resolved IP while keeping the endpoint's Host header"""
+        from .webhooks import WebhookDispatcher
+        port = self.server.server_address[1]
+        WebhookSubscription.objects.filter(pk=self.subscription.pk).update(url=f'http://localhost:{port}/hook')
+        dispatcher = WebhookDispatcher()
+        self.assertEqual(dispatcher.deliver_due(), (3, 0))
+        dispatcher.close()
+        headers, _ = WebhookReceiver.requests[0]
+        self.assertEqual(headers['Host'], f'localhost:{port}')
+    
+    def test_lease_covers_batches_queued_per_endpoint(self):
+        """Test the claim lease lasts until the last batch for a busy endpoint can finish"""
+        from .webhooks import WebhookDispatcher
+        dispatcher = WebhookDispatcher(workers=8, endpoint_concurrency=2, batch_size=1)
+        with self.settings(WEBHOOK_TIMEOUT=10):
+            before = timezone.now()
+            deliveries = dispatcher.claim_due()
+        # 3 single-event batches, 2 at a time: 1 round for the pool + 2 for the endpoint
+        self.assertEqual(dispatcher.lease_seconds(dispatcher.plan_batches(deliveries)), 3 * 10 * 3)
+        locked_until = WebhookDelivery.objects.first().locked_until
+        self.assertGreaterEqual((locked_until - before).total_seconds(), 90)
+        self.assertEqual(dispatcher.deliver_due(), (0, 0))  # Still leased
+        dispatcher.close()
+    
+    def test_subscription_page(self):
+        """Test users can add webhook endpoints with a generated secret"""
+        self.client.login(username='testuser', password='testpass123')
+        self.client.post('/profile/webhooks/', {'action': 'add', 'url': 'https://93.184.215.14/hook'})
+        subscription = WebhookSubscription.objects.get(url='https://93.184.215.14/hook')
+        self.assertEqual(len(subscription.secret), 64)
+        self.client.post('/profile/webhooks/', {'action': 'add', 'url': 'ftp://example.com/'})
+        self.assertFalse(WebhookSubscription.objects.filter(url='ftp://example.com/').exists())
+        response = self.client.post('/profile/webhooks/', {'action': 'delete', 'subscription_id': 'abc'})
+        self.assertEqual(response.status_code, 404)
+    
+    def test_subscription_rejects_internal_addresses(self):
+        """Test endpoints resolving to loopback, private or link-local addresses are refused"""
+        self.client.login(username='testuser', password='testpass123')
+        urls = ['http://127.0.0.1:8000/hook', 'http://10.0.0.5/hook', 'http://169.254.169.254/latest/', 'http://[::1]/']
+        with self.settings(WEBHOOK_ALLOW_PRIVATE_ADDRESSES=False):
+            for url in urls:
+                self.client.post('/profile/webhooks/', {'action': 'add', 'url': url})
+        self.assertFalse(WebhookSubscription.objects.filter(url__in=urls).exists())
+
+
+class OrderExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        other = User.objects.create_user(username='otheruser', password='testpass123')
+        for owner, title in [(self.user, 'Mine, "quoted"'), (self.user, 'Mine too'), (other, 'Not mine')]:
+            Order.objects.create(
+                user=owner,
+                title=title,
+                client_name='Test Client',
+                priority='Normal',
+                quantity=1,
+                description='Line one\nLine two'
+            )
+    
+    def test_csv_export(self):
+        """Test CSV export streams only the user's orders"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get('/status/export/', {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(sorted(r['title'] for r in rows), ['Mine too', 'Mine, "quoted"'])
+        self.assertEqual(rows[0]['description'], 'Line one\nLine two')
+    
+    def test_csv_export_escapes_formulas(self):
+        """Test cells a spreadsheet would evaluate are prefixed with a quote"""
+        Order.objects.filter(title='Mine too').update(
+            title='=HYPERLINK("http://evil.example")', client_name='@SUM(A1)', description='-2+3'
+        )
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get('/status/export/', {'format': 'csv'})
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        row = next(r for r in rows if 'HYPERLINK' in r['title'])
+        self.assertEqual(row['title'], '\'=HYPERLINK("http://evil.example")')
+        self.assertEqual((row['client_name'], row['description'], row['quantity']), ("'@SUM(A1)", "'-2+3", '1'))
+    
+    def test_ndjson_export(self):
+        """Test NDJSON export writes one JSON object per line"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get('/status/export/', {'format': 'ndjson'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[0])['client_name'], 'Test Client')
+        self.assertEqual(self.client.get('/status/export/', {'format': 'xml'}).status_code, 400)
+    
+    def test_admin_export_action(self):
+        """Test staff can export selected orders from the admin"""
+        User.objects.create_superuser(username='admin', password='adminpass123', email='admin@example.com')
+        self.client.login(username='admin', password='adminpass123')
+        response = self.client.post('/admin/home/order/', {
+            'action': 'export_as_csv',
+            '_selected_action': list(Order.objects.values_list('pk', flat=True)),
+        })
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 4)  # Header plus all three orders
+
+
+class OrderImportTests(TestCase):
+    CSV = (
+        'title,client_name,priority,quantity,description\n'
+        'Shirts,Nishat Linen,Normal,10,Blue\n'
+        'Caps,nishat linen.,Urgent,5,Red\n'
+        ',Nishat Linen,Normal,3,Missing title\n'
+        'Bags,Khaadi,Someday,2,Bad priority\n'
+    )
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123', email='test@example.com')
+    
+    def test_import_creates_valid_rows(self):
+        """Test a CSV import creates valid rows in bulk and reports the rest"""
+        from django.core import mail
+        from .import_utils import import_orders_csv
+        result = import_orders_csv(self.user, io.StringIO(self.CSV), batch_size=1)
+        self.assertEqual(result.created, 2)
+        self.assertEqual([row for row, _ in result.errors], [4, 5])
+        self.assertEqual(Order.objects.filter(user=self.user).count(), 2)
+        client = ClientRecord.objects.get()
+        self.assertEqual((client.order_count, client.total_quantity), (2, 15))
+        self.assertEqual(AuditLog.objects.filter(action='orders_imported').count(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+    
+    def test_missing_columns(self):
+        """Test a file without the required header is rejected as a whole"""
+        from .import_utils import import_orders_csv
+        result = import_orders_csv(self.user, io.StringIO('name,qty\nShirts,1\n'))
+        self.assertEqual(result.created, 0)
+        self.assertIn('title', result.errors[0][1])
+    
+    def test_unreadable_data_partway_keeps_audit_and_report(self):
+        """Test a decode error after committed batches is reported with what was imported"""
+        from django.core import mail
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        self.client.login(username='testuser', password='testpass123')
+        rows = ''.join(f'Order {i},Nishat Linen,Normal,1,Row {i}\n' for i in range(1200))
+        data = f'title,client_name,priority,quantity,description\n{rows}'.encode() + b'Bad,\xff\xfe,Normal,1,x\n'
+        upload = SimpleUploadedFile('orders.csv', data, content_type='text/csv')
+        response = self.client.post('/orders/import/', {'file': upload})
+        created = Order.objects.count()
+        self.assertGreater(created, 0)
+        self.assertEqual(response.context['result'].created, created)
+        self.assertContains(response, 'Could not read the file after row')
+        self.assertIn(f'Imported {created} order(s)', AuditLog.objects.get(action='orders_imported').description)
+        self.assertEqual(len(mail.outbox), 1)
+    
+    def test_import_view(self):
+        """Test the upload page imports a CSV file"""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        self.client.login(username='testuser', password='testpass123')
+        upload = SimpleUploadedFile('orders.csv', self.CSV.encode('utf-8-sig'), content_type='text/csv')
+        response = self.client.post('/orders/import/', {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Rejected Rows (2)')
+        self.assertEqual(Order.objects.count(), 2)
+
+
+class AttachmentStorageTests(TestCase):
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+    
+    def tearDown(self):
+        import shutil
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+    
+    def create_order(self, filename, content):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        return Order.objects.create(
+            user=self.user, title='Catalogue', client_name='Test Client', priority='Normal',
+            quantity=1, description='Test', file=SimpleUploadedFile(filename, content)
+        )
+    
+    def test_identical_uploads_share_one_file(self):
+        """Test repeated attachments are stored once and reference-counted"""
+        import os
+        from .models import StoredBlob
+        first = self.create_order('catalogue.pdf', b'%PDF same bytes')
+        second = self.create_order('catalogue (1).pdf', b'%PDF same bytes')
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(second.file_name, 'catalogue (1).pdf')
+        blob = StoredBlob.objects.get()
+        self.assertEqual((blob.ref_count, blob.size), (2, 15))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete(hard=True)
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+        self.assertTrue(os.path.exists(second.file.path))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete(hard=True)
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertFalse(os.path.exists(second.file.path))
+    
+    def test_replacing_attachment_releases_old_blob(self):
+        """Test replacing an order's file releases the previous blob"""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from .models import StoredBlob
+        order = self.create_order('old.pdf', b'old')
+        order.file = SimpleUploadedFile('new.pdf', b'new')
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()
+        self.assertEqual(list(StoredBlob.objects.values_list('name', flat=True)), [order.file.name])
+        self.assertEqual(order.file.read(), b'new')
+    
+    def test_attachment_download_checks_owner(self):
+        """Test only the order's owner can download its attachment"""
+        order = self.create_order('catalogue.pdf', b'0123456789')
+        User.objects.create_user(username='otheruser', password='testpass123')
+        self.client.login(username='otheruser', password='testpass123')
+        self.assertEqual(self.client.get(f'/orders/{order.id}/attachment/').status_code, 404)
+        
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(f'/orders/{order.id}/attachment/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertIn('filename="catalogue.pdf"', response['Content-Disposition'])
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+    
+    def test_attachment_range_requests(self):
+        """Test byte ranges are served as partial content"""
+        order = self.create_order('catalogue.pdf', b'0123456789')
+        self.client.login(username='testuser', password='testpass123')
+        url = f'/orders/{order.id}/attachment/'
+        response = self.client.get(url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        response = self.client.get(url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+        self.assertEqual(self.client.get(url, HTTP_RANGE='bytes=20-').status_code, 416)
+    
+    def test_attachment_handed_to_proxy(self):
+        """Test X-Accel-Redirect is used when nginx serves the file"""
+        from django.test import override_settings
+        order = self.create_order('catalogue.pdf', b'0123456789')
+        self.client.login(username='testuser', password='testpass123')
+        with override_settings(SENDFILE_BACKEND='nginx'):
+            response = self.client.get(f'/orders/{order.id}/attachment/')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + order.file.name)
+        self.assertEqual(response.content, b'')
+
+
+    def test_image_thumbnails(self):
+        """Test image attachments get a background WebP thumbnail, reused for duplicates"""
+        from PIL import Image
+        from .thumbnails import generate_pending_thumbnails
+        buffer = io.BytesIO()
+        Image.new('RGB', (1200, 800), 'navy').save(buffer, 'PNG')
+        order = self.create_order('swatch.png', buffer.getvalue())
+        self.assertEqual(order.thumbnail, '')
+        
+        self.assertEqual(generate_pending_thumbnails(workers=1), (1, 0))
+        order.refresh_from_db()
+        self.assertTrue(order.thumbnail.endswith('.thumb.webp'))
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(f'/orders/{order.id}/thumbnail/')
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        with Image.open(io.BytesIO(b''.join(response.streaming_content))) as thumbnail:
+            self.assertEqual(thumbnail.size, (320, 213))
+        
+        duplicate = self.create_order('swatch copy.png', buffer.getvalue())
+        self.assertEqual(duplicate.thumbnail, order.thumbnail)
+        self.assertContains(self.client.get('/status/'), f'/orders/{order.id}/thumbnail/')
+        
+        order.delete()
+        self.assertEqual(self.client.get(f'/orders/{order.id}/thumbnail/').status_code, 404)
+        User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        self.client.login(username='staff', password='testpass123')
+        self.assertEqual(self.client.get(f'/orders/{order.id}/thumbnail/').status_code, 200)
+    
+    def test_thumbnail_pool_reused_across_rounds(self):
+        """Test thumbnails are generated in one spawned pool that outlives each round"""
+        from PIL import Image
+        from . import thumbnails
+        self.addCleanup(thumbnails.shutdown_pool)
+        pools = []
+        for name, colour in (('first.png', 'navy'), ('second.png', 'teal')):
+            buffer = io.BytesIO()
+            Image.new('RGB', (640, 480), colour).save(buffer, 'PNG')
+            self.create_order(name, buffer.getvalue())
+            self.assertEqual(thumbnails.generate_pending_thumbnails(workers=2), (1, 0))
+            pools.append(thumbnails.get_pool(2))
+        self.assertIs(pools[0], pools[1])
+        self.assertEqual(pools[0]._mp_context.get_start_method(), 'spawn')
+    
+    def test_image_crashing_worker_marked_failed(self):
+        """Test an image that kills its worker fails alone and the rest of the batch still gets thumbnails"""
+        from PIL import Image
+        from .models import StoredBlob
+        from . import thumbnails
+        self.addCleanup(thumbnails.shutdown_pool)
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), 'green').save(buffer, 'PNG')
+        self.create_order('poison.png', b'POISON' + buffer.getvalue())
+        self.create_order('fine.png', buffer.getvalue())
+        
+        result = thumbnails.generate_pending_thumbnails(workers=2, thumbnailer=crashing_thumbnailer)
+        self.assertEqual(result, (1, 1))
+        statuses = dict(StoredBlob.objects.values_list('name', 'thumbnail_status'))
+        self.assertEqual(sorted(statuses.values()), ['failed', 'ready'])
+        self.assertEqual(thumbnails.generate_pending_thumbnails(workers=2), (0, 0))  # Nothing left to crash on
+
+
+def crashing_thumbnailer(source, target):
+    """Thumbnailer whose worker process dies on files starting with b'POISON'; run by spawned pool workers."""
+    from .thumbnails import make_thumbnail
+    with open(source, 'rb') as image:
+        if image.read(6) == b'POISON':
+            os._exit(1)
+    return make_thumbnail(source, target)
+
+
+class ResumableUploadTests(TestCase):
+    def setUp(self):
+        import os
+        import tempfile
+        from django.test import override_settings
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, CHUNKED_UPLOAD_DIR=os.path.join(self.media_root, 'partial_uploads')
+        )
+        self.settings_override.enable()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.order = Order.objects.create(
+            user=self.user, title='Drawings', client_name='Test Client', priority='Normal',
+            quantity=1, description='Test'
+        )
+        self.client.login(username='testuser', password='testpass123')
+    
+    def tearDown(self):
+        import shutil
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+    
+    def create_upload(self, data, **metadata):
+        import base64
+        import hashlib
+        metadata = {'filename': 'drawing.pdf', 'order_id': str(self.order.id),
+                    'checksum': hashlib.sha256(data).hexdigest(), **metadata}
+        header = ','.join(f'{key} {base64.b64encode(value.encode()).decode()}' for key, value in metadata.items())
+        return self.client.post('/api/uploads/', HTTP_UPLOAD_LENGTH=str(len(data)), HTTP_UPLOAD_METADATA=header)
+    
+    def patch(self, location, chunk, offset, **headers):
+        return self.client.generic(
+            'PATCH', location, chunk, content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset), **headers
+        )
+    
+    def test_chunked_upload_attaches_file(self):
+        """Test an upload sent in chunks is resumable and ends up on the order"""
+        data = b'%PDF-' + b'x' * 1000
+        response = self.create_upload(data)
+        self.assertEqual(response.status_code, 201)
+        location = response['Location']
+        
+        self.assertEqual(self.patch(location, data[:400], 0)['Upload-Offset'], '400')
+        self.assertEqual(self.patch(location, data[400:], 0).status_code, 409)  # Wrong offset
+        self.assertEqual(self.client.head(location)['Upload-Offset'], '400')
+        
+        response = self.patch(location, data[400:], 400)
+        self.assertEqual(response.status_code, 204)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.file_name, 'drawing.pdf')
+        self.assertEqual(self.order.file.read(), data)
+        self.assertEqual(self.client.head(location).status_code, 404)
+    
+    def test_chunk_checksum_mismatch(self):
+        """Test a corrupted chunk is rejected and not kept"""
+        import base64
+        import hashlib
+        location = self.create_upload(b'0123456789')['Location']
+        bad = 'sha1 ' + base64.b64encode(hashlib.sha1(b'other').digest()).decode()
+        response = self.patch(location, b'01234', 0, HTTP_UPLOAD_CHECKSUM=bad)
+        self.assertEqual(response.status_code, 460)
+        self.assertEqual(self.client.head(location)['Upload-Offset'], '0')
+    
+    def test_append_checks_stored_offset(self):
+        """Test a writer holding an outdated session sees the offset another request stored"""
+        from .models import UploadSession
+        from .upload_utils import UploadError, append_chunk
+        location = self.create_upload(b'0123456789')['Location']
+        stale = UploadSession.objects.get()
+        self.patch(location, b'01234', 0)
+        with self.assertRaises(UploadError) as raised:
+            append_chunk(stale, io.BytesIO(b'01234'), 0, 5)
+        self.assertEqual(raised.exception.status, 409)
+        self.assertEqual(stale.offset, 5)
+    
+    def test_concurrent_writer_is_turned_away_until_lease_expires(self):
+        """Test a second PATCH gets 423 while another holds the upload, and can take over an expired lease"""
+        from datetime import timedelta
+        from .models import UploadSession
+        location = self.create_upload(b'0123456789')['Location']
+        UploadSession.objects.update(lease_token='other', lease_expires=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(self.patch(location, b'01234', 0).status_code, 423)
+        UploadSession.objects.update(lease_expires=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.patch(location, b'01234', 0)['Upload-Offset'], '5')
+    
+    def test_writer_that_lost_its_lease_is_not_committed(self):
+        """Test a chunk whose lease was taken over mid-stream leaves the offset and files untouched"""
+        from .models import UploadSession
+        from .upload_utils import UploadError, append_chunk
+        self.create_upload(b'0123456789')
+        session = UploadSession.objects.get()
+        
+        class TakenOverStream(io.BytesIO):
+            def read(self, size=-1):
+                UploadSession.objects.update(lease_token='other')
+                return super().read(size)
+        
+        with self.assertRaises(UploadError) as raised:
+            append_chunk(session, TakenOverStream(b'01234'), 0, 5)
+        self.assertEqual(raised.exception.status, 409)
+        self.assertEqual(UploadSession.objects.get().offset, 0)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'partial_uploads')), [])
+    
+    def test_upload_requires_own_order(self):
+        """Test uploads can only target the user's own orders"""
+        User.objects.create_user(username='otheruser', password='testpass123')
+        self.client.login(username='otheruser', password='testpass123')
+        self.assertEqual(self.create_upload(b'data').status_code, 404)
+        self.assertEqual(self.create_upload(b'data', filename='run.exe').status_code, 400)
+
+
 class ContactTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -297,6 +1372,117 @@ class SearchTests(TestCase):
         self.assertContains(response, 'ABC Corp')
 
 
+class FuzzySearchTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            email='test@example.com'
+        )
+        self.client.login(username='testuser', password='testpass123')
+        
+        for client_name in ['Nishat Linen', 'Nishat Linens', 'Serena Fabrics']:
+            Order.objects.create(
+                user=self.user,
+                title='Thread Order',
+                client_name=client_name,
+                priority='Normal',
+                quantity=10,
+                description='Test'
+            )
+    
+    def test_trigram_similarity(self):
+        """Test similarity follows pg_trgm semantics"""
+        from .search_utils import similarity
+        self.assertEqual(similarity('Nishat Linen', 'nishat linen'), 1.0)
+        self.assertGreater(similarity('Nishat Linen', 'Nishat Linens'), 0.7)
+        self.assertLess(similarity('Nishat Linen', 'Serena Fabrics'), 0.3)
+    
+    def test_fuzzy_search_finds_variants(self):
+        """Test fuzzy search matches spelling variants ranked by similarity"""
+        response = self.client.get('/search/', {'q': 'Nishat Linen', 'fuzzy': '1'})
+        self.assertEqual(response.status_code, 200)
+        orders = list(response.context['orders'])
+        self.assertEqual([o.client_name for o in orders], ['Nishat Linen', 'Nishat Linens'])
+        self.assertGreater(orders[0].similarity, orders[1].similarity)
+    
+    def test_fuzzy_search_tracks_renames(self):
+        """Test trigram index follows client name changes"""
+        order = Order.objects.get(client_name='Serena Fabrics')
+        order.client_name = 'Nishat Linen Mills'
+        order.save()
+        response = self.client.get('/search/', {'q': 'Serena Fabrics', 'fuzzy': '1'})
+        self.assertEqual(response.context['total_results'], 0)
+
+
+class ClientTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+    
+    def create_order(self, client_name, quantity=10):
+        return Order.objects.create(
+            user=self.user,
+            title='Thread Order',
+            client_name=client_name,
+            priority='Normal',
+            quantity=quantity,
+            description='Test'
+        )
+    
+    def test_orders_share_normalized_client(self):
+        """Test spelling variations map to a single client"""
+        first = self.create_order('Nishat Linen')
+        second = self.create_order('  nishat   LINEN. ')
+        self.assertEqual(first.client_id, second.client_id)
+        self.assertEqual(ClientRecord.objects.count(), 1)
+    
+    def test_client_counters(self):
+        """Test counters follow create, quantity change, rename and soft delete"""
+        order = self.create_order('ABC Corp', quantity=10)
+        self.create_order('ABC Corp', quantity=5)
+        client = ClientRecord.objects.get(normalized_name='abc corp')
+        self.assertEqual((client.order_count, client.total_quantity), (2, 15))
+        
+        order.quantity = 20
+        order.save()
+        client.refresh_from_db()
+        self.assertEqual((client.order_count, client.total_quantity), (2, 25))
+        
+        order.client_name = 'XYZ Inc'
+        order.save()
+        client.refresh_from_db()
+        self.assertEqual((client.order_count, client.total_quantity), (1, 5))
+        self.assertEqual(ClientRecord.objects.get(normalized_name='xyz inc').total_quantity, 20)
+        
+        order.delete()
+        self.assertEqual(ClientRecord.objects.get(normalized_name='xyz inc').order_count, 0)
+        order.restore()
+        self.assertEqual(ClientRecord.objects.get(normalized_name='xyz inc').order_count, 1)
+    
+    def test_recalculate_counters(self):
+        """Test counters can be rebuilt from the orders table"""
+        self.create_order('ABC Corp', quantity=3)
+        ClientRecord.objects.update(order_count=0, total_quantity=0)
+        ClientRecord.objects.recalculate_counters()
+        client = ClientRecord.objects.get(normalized_name='abc corp')
+        self.assertEqual((client.order_count, client.total_quantity), (1, 3))
+    
+    def test_admin_rename_to_existing_client_is_a_form_error(self):
+        """Test renaming a client onto another client's normalized name shows a form error"""
+        self.create_order('ABC Corp')
+        other = self.create_order('XYZ Inc').client
+        User.objects.create_superuser(username='admin', password='testpass123')
+        self.client.login(username='admin', password='testpass123')
+        url = reverse('admin:home_client_change', args=[other.pk])
+        response = self.client.post(url, {'name': 'abc  corp.'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'A client with this name already exists')
+        self.client.post(url, {'name': 'XYZ Incorporated'})
+        other.refresh_from_db()
+        self.assertEqual(other.normalized_name, 'xyz incorporated')
+
+
 class AuditLogTests(TransactionTestCase):
     def setUp(self):
         self.client = Client()
@@ -411,6 +1597,398 @@ class ServicePageTests(TestCase):
         self.assertContains(response, 'Test Content')
 
 
+class ServicePageCacheTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        ServicePage.objects.create(title='Our Partners', heading='Cached Heading', content='Cached Content')
+    
+    def test_services_page_served_from_cache(self):
+        """Test steady-state services page needs no database queries"""
+        self.client.get('/services/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/services/')
+        self.assertContains(response, 'Cached Heading')
+    
+    def test_services_page_invalidated_on_save(self):
+        """Test editing content or logos bumps the cached page version"""
+        self.client.get('/services/')
+        service_page = ServicePage.objects.get()
+        service_page.heading = 'Updated Heading'
+        service_page.save()
+        response = self.client.get('/services/')
+        self.assertContains(response, 'Updated Heading')
+        self.assertNotContains(response, 'Cached Heading')
+    
+    def test_partner_logo_normalized_on_upload(self):
+        """Test uploaded logos are resized into WebP and fallback variants"""
+        import shutil
+        import tempfile
+        from PIL import Image
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from django.test import override_settings
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        buffer = io.BytesIO()
+        Image.new('RGBA', (2000, 1000), (255, 0, 0, 128)).save(buffer, 'PNG')
+        with override_settings(MEDIA_ROOT=media_root):
+            logo = PartnerLogo.objects.create(
+                name='Acme', logo=SimpleUploadedFile('Acme Logo.png', buffer.getvalue())
+            )
+            self.assertEqual((logo.width, logo.height), (250, 125))
+            self.assertEqual(set(logo.variants), {'webp_1x', 'webp_2x', 'fallback_1x', 'fallback_2x'})
+            with Image.open(logo.logo.path) as stored:
+                self.assertEqual(stored.size, (500, 250))
+            response = self.client.get('/services/')
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, 'width="250" height="125"')
+
+
+class StaticAssetTests(TestCase):
+    def test_collectstatic_precompresses_and_converts(self):
+        """Test production collectstatic writes gzip copies and WebP variants used by static_picture"""
+        import os
+        import shutil
+        import tempfile
+        from PIL import Image
+        from django.core.management import call_command
+        from django.template import Context, Template
+        from django.test import override_settings
+        source_dir, static_root = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source_dir, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, static_root, ignore_errors=True)
+        os.makedirs(os.path.join(source_dir, 'css'))
+        os.makedirs(os.path.join(source_dir, 'images'))
+        with open(os.path.join(source_dir, 'css', 'site.css'), 'w') as f:
+            f.write('body { margin: 0; padding: 0; }\n' * 50)
+        Image.new('RGB', (400, 300), (30, 90, 160)).save(os.path.join(source_dir, 'images', 'hero.png'))
+        
+        storages = {
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'home.static_storage.OptimizedStaticFilesStorage'},
+        }
+        finders = ['django.contrib.staticfiles.finders.FileSystemFinder']  # Skip the admin's files
+        with override_settings(STATICFILES_DIRS=[source_dir], STATICFILES_FINDERS=finders,
+                               STATIC_ROOT=static_root, STORAGES=storages):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            from django.contrib.staticfiles.storage import staticfiles_storage
+            css_name = staticfiles_storage.stored_name('css/site.css')
+            self.assertNotEqual(css_name, 'css/site.css')
+            self.assertTrue(os.path.exists(os.path.join(static_root, css_name + '.gz')))
+            self.assertIn('webp', staticfiles_storage.variant_urls('images/hero.png'))
+            html = Template(
+                "{% load static_tags %}{% static_picture 'images/hero.png' alt='Hero' %}"
+            ).render(Context())
+        self.assertIn('<picture><source type="image/webp"', html)
+        self.assertIn('alt="Hero"', html)
+    
+    def test_static_picture_without_variants(self):
+        """Test static_picture falls back to a plain img with the default storage"""
+        from django.template import Context, Template
+        html = Template(
+            "{% load static_tags %}{% static_picture 'images/logo.jpeg' class='rounded-circle' width=150 %}"
+        ).render(Context())
+        self.assertEqual(html, '<img src="/static/images/logo.jpeg" class="rounded-circle" width="150">')
+
+
+class TieredCacheTests(TestCase):
+    def setUp(self):
+        from django.conf import settings
+        from django.test import override_settings
+        caches = dict(settings.CACHES, l2={
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tiered-l2'
+        })
+        self.settings_override = override_settings(CACHES=caches)
+        self.settings_override.enable()
+    
+    def tearDown(self):
+        self.settings_override.disable()
+    
+    def make_cache(self, **options):
+        from .tiered_cache import TieredCache
+        return TieredCache('', {'OPTIONS': dict({
+            'L2_CACHE': 'l2',
+            'STAMP_CHECK_INTERVAL': 0,
+            'L1_NAMESPACES': {'pexels': 'pexels:', 'cache_version': 'cache_version:', 'item': 'item:'},
+        }, **options)})
+    
+    def test_reads_served_from_l1(self):
+        """Test repeated reads hit the process cache and are counted per tier"""
+        worker = self.make_cache(STAMP_CHECK_INTERVAL=60)
+        self.make_cache().set('pexels:cats', ['a.jpg'])
+        self.assertEqual(worker.get('pexels:cats'), ['a.jpg'])
+        self.assertEqual(worker.get('pexels:cats'), ['a.jpg'])
+        self.assertIsNone(worker.get('pexels:dogs'))
+        stats = worker.stats()
+        self.assertEqual((stats['l1']['hits'], stats['l1']['misses']), (1, 2))
+        self.assertEqual((stats['l2']['hits'], stats['l2']['misses']), (1, 1))
+        self.assertEqual(stats['l1']['hit_ratio'], 0.3333)
+    
+    def test_writes_invalidate_other_workers(self):
+        """Test a write or namespace bump in one worker reaches another worker's L1"""
+        worker_a, worker_b = self.make_cache(), self.make_cache()
+        worker_a.set('cache_version:services_page', 1)
+        self.assertEqual(worker_b.get('cache_version:services_page'), 1)
+        worker_a.incr('cache_version:services_page')
+        self.assertEqual(worker_b.get('cache_version:services_page'), 2)
+        worker_a.delete('cache_version:services_page')
+        self.assertIsNone(worker_b.get('cache_version:services_page'))
+    
+    def test_l1_is_bounded(self):
+        """Test the least recently used L1 entries are evicted"""
+        worker = self.make_cache(L1_MAX_ENTRIES=2)
+        for key in ('a', 'b', 'c'):
+            worker.set(f'item:{key}', key)
+        self.assertEqual(worker.stats()['l1']['entries'], 2)
+        self.assertEqual(worker.get('item:a'), 'a')  # Still in L2
+        self.assertEqual(worker.stats()['l1']['evictions'], 2)
+    
+    def test_unregistered_keys_bypass_l1(self):
+        """Test session-like keys go straight to L2 and leave registered namespaces warm"""
+        worker_a, worker_b = self.make_cache(), self.make_cache()
+        worker_a.set('pexels:cats', ['a.jpg'])
+        worker_b.get('pexels:cats')
+        worker_a.set('django.contrib.sessions.cached_dbabc', {'user': 1})
+        worker_a.set('template.cache.services_content.abc', '<p>')
+        worker_a.delete('template.cache.services_content.abc')
+        self.assertEqual(worker_b.get('django.contrib.sessions.cached_dbabc'), {'user': 1})
+        self.assertEqual(worker_b.get('pexels:cats'), ['a.jpg'])
+        stats = worker_b.stats()
+        self.assertEqual(stats['l1']['entries'], 1)
+        self.assertEqual((stats['l1']['hits'], stats['l1']['misses']), (1, 1))
+        self.assertIsNone(worker_b.l2.get('tiered_stamp:'))
+    
+    def test_cache_stats_staff_only(self):
+        """Test the cache stats endpoint is only shown to staff"""
+        User.objects.create_user(username='member', password='testpass123')
+        User.objects.create_user(username='admin', password='testpass123', is_staff=True)
+        self.client.login(username='member', password='testpass123')
+        self.assertEqual(self.client.get('/api/cache-stats/').status_code, 404)
+        self.client.login(username='admin', password='testpass123')
+        response = self.client.get('/api/cache-stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('pid', response.json())
+
+
+def query_fingerprint(sql):
+    """SQL with literals and IN lists replaced, so repeated queries group together."""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+(\.\d+)?\b', '?', sql)
+    return re.sub(r'IN \([?, ]+\)', 'IN (...)', sql)
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Query and time budgets for every page and admin changelist, on realistic data.
+    
+    A page whose query count grows with the data (an N+1) blows its budget; the
+    failure lists the most repeated query fingerprints. Each page is measured
+    twice: right after the cache is cleared (cold), then again (warm).
+    Wall-clock limits vary too much between machines to fail CI on, so they
+    are only enforced with ENFORCE_TIME_BUDGETS=1 in the environment.
+    """
+    
+    # name -> (path, max warm queries, max cold queries, max milliseconds);
+    # paths are formatted with the seeded ids
+    URL_BUDGETS = {
+        'home': ('/', 0, 2, 500),
+        'about': ('/about/', 0, 2, 500),
+        'services': ('/services/', 0, 4, 500),
+        'contact': ('/contact/', 0, 2, 500),
+        'login': ('/login/', 0, 0, 500),
+        'signup': ('/signup/', 0, 0, 500),
+        'status': ('/status/', 2, 5, 1000),
+        'export_orders': ('/status/export/', 1, 3, 1000),
+        'orders': ('/orders/', 0, 2, 500),
+        'import_orders': ('/orders/import/', 0, 2, 500),
+        'order_attachment': ('/orders/{order_id}/attachment/', 1, 3, 500),
+        'order_thumbnail': ('/orders/{order_id}/thumbnail/', 1, 3, 500),
+        'success': ('/success/', 0, 2, 500),
+        'search': ('/search/?q=Thread', 3, 5, 1000),
+        'order_changes': ('/api/orders/changes/', 1, 3, 1000),
+        'cache_stats': ('/api/cache-stats/', 0, 2, 500),
+        'uploads': ('/api/uploads/', 0, 2, 500),
+        'upload_detail': ('/api/uploads/{upload_id}/', 1, 3, 500),
+        'profile': ('/profile/', 0, 2, 500),
+        'edit_profile': ('/profile/edit/', 0, 2, 500),
+        'change_password': ('/profile/change-password/', 0, 2, 500),
+        'webhooks': ('/profile/webhooks/', 1, 3, 500),
+        'password_reset': ('/password-reset/', 0, 2, 500),
+        'password_reset_done': ('/password-reset/done/', 0, 2, 500),
+        'password_reset_confirm': ('/password-reset-confirm/MQ/set-password/', 1, 3, 500),
+        'password_reset_complete': ('/password-reset-complete/', 0, 2, 500),
+    }
+    # Not budgeted: long-lived event stream, and logout ends the session
+    UNBUDGETED_URLS = {'order_events', 'logout'}
+    
+    # Admin changelists by model name -> (max warm queries, max cold queries, max milliseconds);
+    # per-row queries show up as large counts here
+    ADMIN_BUDGETS = {
+        'auditlog': (6, 8, 1500),
+        'contact': (6, 8, 1500),
+        'order': (6, 8, 1500),
+        'client': (4, 6, 1000),
+        'servicepage': (5, 7, 1000),
+        'partnerlogo': (4, 6, 1000),
+        'webhooksubscription': (4, 6, 1000),
+        'webhookdelivery': (5, 7, 1000),
+        'storedblob': (4, 6, 1000),
+        'user': (5, 7, 1000),
+        'group': (4, 6, 1000),
+    }
+    
+    @classmethod
+    def setUpTestData(cls):
+        from .import_utils import bulk_create_orders
+        from .models import Contact, OrderLine, UploadSession
+        cls.admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='testpass123')
+        cls.member = User.objects.create_user(username='member', email='member@example.com', password='testpass123')
+        others = User.objects.bulk_create(User(username=f'user{i}', email=f'user{i}@example.com') for i in range(20))
+        WebhookSubscription.objects.create(user=cls.member, url='https://hooks.example.com/orders', secret='s' * 32)
+        ServicePage.objects.create(title='Our Partners', heading='Heading', content='Content')
+        
+        statuses = [choice for choice, label in Order.STATUS_CHOICES]
+        for owner in [cls.member, *others[:5]]:
+            orders = bulk_create_orders(owner, [
+                Order(
+                    title=f'Thread order {i}', client_name=f'Client {i % 7}', priority='Normal',
+                    quantity=i + 1, description='Cotton thread', status=statuses[i % len(statuses)]
+                )
+                for i in range(40)
+            ])
+            OrderLine.objects.bulk_create(
+                OrderLine(order=order, item='Cotton thread', quantity=1, position=0) for order in orders
+            )
+        Contact.objects.bulk_create(
+            Contact(name=f'Contact {i}', email=f'c{i}@example.com', phone='+14155550100',
+                    desc='Question', date=date.today(), user=others[i % 20])
+            for i in range(60)
+        )
+        AuditLog.objects.bulk_create(
+            AuditLog(user=others[i % 20], action='login', description=f'User user{i % 20} logged in')
+            for i in range(200)
+        )
+        cls.order = Order.objects.filter(user=cls.member).first()
+        cls.upload = UploadSession.objects.create(
+            user=cls.member, order=cls.order, filename='big.pdf', length=1024
+        )
+    
+    def setUp(self):
+        self.clear_cache()
+    
+    def clear_cache(self):
+        from django.core.cache import cache
+        cache.clear()
+        # Pages with a Pexels banner read the images from the cache; no network here
+        for theme, count in [('textile industry', 8), ('thread', 8), ('contact', 8),
+                             ('user profile', 3), ('edit profile', 3), ('security', 3)]:
+            cache.set(f'pexels:{theme.replace(" ", "_")}_{count}', ['https://images.example.com/1.jpg'])
+    
+    def measure(self, path, method):
+        """(response, queries, elapsed ms) of one request."""
+        import time
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = getattr(self.client, method)(path)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = (time.perf_counter() - start) * 1000
+        self.assertLess(response.status_code, 500, path)
+        return response, queries, elapsed
+    
+    def assertWithinBudget(self, path, max_warm_queries, max_cold_queries, max_ms, method='get'):
+        from collections import Counter
+        self.clear_cache()
+        cold = self.measure(path, method)
+        warm = self.measure(path, method)  # Per-process caches (sessions, user, fragments) now filled
+        for label, (response, queries, elapsed), max_queries in [
+            ('cold', cold, max_cold_queries), ('warm', warm, max_warm_queries)
+        ]:
+            if len(queries) > max_queries:
+                repeated = Counter(query_fingerprint(query['sql']) for query in queries.captured_queries)
+                report = '\n'.join(f'  {count:3d} x {sql[:300]}' for sql, count in repeated.most_common(10))
+                self.fail(f'{path} ran {len(queries)} queries {label} (budget {max_queries}):\n{report}')
+            if os.environ.get('ENFORCE_TIME_BUDGETS') == '1':
+                self.assertLessEqual(elapsed, max_ms, f'{path} took {elapsed:.0f} ms {label} (budget {max_ms} ms)')
+    
+    def test_every_url_has_a_budget(self):
+        """Test new URLs get a budget here"""
+        from .urls import urlpatterns
+        names = {pattern.name for pattern in urlpatterns}
+        self.assertEqual(names - set(self.URL_BUDGETS) - self.UNBUDGETED_URLS, set())
+    
+    def test_page_budgets(self):
+        """Test each page stays within its query and time budget for a logged-in member"""
+        self.client.login(username='member', password='testpass123')
+        for name, (path, *budget) in self.URL_BUDGETS.items():
+            with self.subTest(url=name):
+                path = path.format(order_id=self.order.pk, upload_id=self.upload.pk)
+                method = 'head' if name == 'upload_detail' else 'get'
+                self.assertWithinBudget(path, *budget, method=method)
+    
+    def test_pages_render_with_static_manifest(self):
+        """Test every page renders with the production static storage and a collected manifest"""
+        import shutil
+        import tempfile
+        from django.conf import settings
+        from django.core.management import call_command
+        from django.test import override_settings
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root, ignore_errors=True)
+        storages = dict(settings.STORAGES, staticfiles={'BACKEND': 'home.static_storage.OptimizedStaticFilesStorage'})
+        finders = ['django.contrib.staticfiles.finders.FileSystemFinder']  # Site pages only, not the admin's
+        self.client.login(username='member', password='testpass123')
+        with override_settings(DEBUG=False, STATIC_ROOT=static_root, STORAGES=storages, STATICFILES_FINDERS=finders):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            for name, (path, *_) in self.URL_BUDGETS.items():
+                with self.subTest(url=name):
+                    path = path.format(order_id=self.order.pk, upload_id=self.upload.pk)
+                    response = self.client.head(path) if name == 'upload_detail' else self.client.get(path)
+                    self.assertLess(response.status_code, 500, path)
+    
+    def test_admin_changelist_budgets(self):
+        """Test each admin changelist stays within its query and time budget"""
+        from django.contrib import admin
+        self.client.login(username='admin', password='testpass123')
+        registered = {model._meta.model_name: model for model in admin.site._registry}
+        self.assertEqual(set(registered) - set(self.ADMIN_BUDGETS), set())
+        for model_name, budget in self.ADMIN_BUDGETS.items():
+            with self.subTest(changelist=model_name):
+                opts = registered[model_name]._meta
+                path = reverse(f'admin:{opts.app_label}_{opts.model_name}_changelist')
+                self.assertWithinBudget(path, *budget)
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+    
+    def test_large_unfiltered_count_cached(self):
+        """Test a large table's count is reused while filtered counts stay exact"""
+        from .paginators import EstimatedCountPaginator
+        
+        class SmallThresholdPaginator(EstimatedCountPaginator):
+            estimate_threshold = 10
+        
+        AuditLog.objects.bulk_create(AuditLog(action='login') for _ in range(12))
+        self.assertEqual(SmallThresholdPaginator(AuditLog.objects.order_by('pk'), 5).count, 12)
+        AuditLog.objects.create(action='logout')
+        with self.assertNumQueries(0):
+            self.assertEqual(SmallThresholdPaginator(AuditLog.objects.order_by('pk'), 5).count, 12)
+        self.assertEqual(SmallThresholdPaginator(AuditLog.objects.filter(action='logout'), 5).count, 1)
+    
+    def test_small_table_counted_exactly(self):
+        """Test tables under the threshold are always counted exactly"""
+        from .paginators import EstimatedCountPaginator
+        AuditLog.objects.create(action='login')
+        self.assertEqual(EstimatedCountPaginator(AuditLog.objects.order_by('pk'), 5).count, 1)
+        AuditLog.objects.create(action='login')
+        self.assertEqual(EstimatedCountPaginator(AuditLog.objects.order_by('pk'), 5).count, 2)
+
+
 class URLTests(TestCase):
     """Test that all URLs are properly configured"""
     
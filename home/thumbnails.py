@@ -0,0 +1,139 @@
+"""
+Background WebP thumbnails for image attachments.
+
+Image uploads are marked ``pending`` on their StoredBlob. A worker
+(``manage.py generate_thumbnails``) decodes them in a process pool, writes
+a small WebP next to the original and records it on the blob and on every
+order using it. Pages only ever link to the finished thumbnail; no request
+decodes an image.
+
+The pool is created once per process and reused for every round. Its
+workers are spawned, not forked, so they do not inherit the parent's
+database connections or threads. If an image kills a worker, the batch is
+retried image by image and only that image is marked failed.
+"""
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from home.models import Order, StoredBlob
+from home.storage import attachment_storage, thumbnail_name
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = (320, 320)
+THUMBNAIL_QUALITY = 80
+
+_pool = None  # (workers, ProcessPoolExecutor)
+
+
+def make_thumbnail(source_path, target_path, size=THUMBNAIL_SIZE):
+    """
+    Write a WebP thumbnail of an image; returns an error message, or '' on success.
+
+    Runs in worker processes, so it only takes and returns plain values.
+    """
+    temp_path = target_path + '.tmp'
+    try:
+        with Image.open(source_path) as image:
+            image.draft('RGB', size)  # JPEG: decode at reduced scale
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail(size)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+            image.save(temp_path, 'WEBP', quality=THUMBNAIL_QUALITY, method=4)
+        os.replace(temp_path, target_path)
+        return ''
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return str(e)[:500]
+
+
+def get_pool(workers=None):
+    """The process pool for thumbnail work, created on first use."""
+    global _pool
+    if _pool is None or _pool[0] != workers:
+        shutdown_pool()
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,  # Spawned workers import this module, which needs the app registry
+        )
+        _pool = (workers, executor)
+    return _pool[1]
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool[1].shutdown()
+        _pool = None
+
+
+def set_order_thumbnails(name, thumbnail):
+    """Point every order using the attachment ``name`` at its thumbnail."""
+    # updated_at moves so cached status pages and ETags refresh
+    return Order.all_objects.filter(file=name).update(thumbnail=thumbnail, updated_at=timezone.now())
+
+
+def _thumbnails_one_by_one(thumbnailer, sources, targets, workers):
+    """
+    Run each image as its own pool task, after the batch broke the pool.
+
+    An image that kills its worker (e.g. a crash inside a decoder) gets an
+    error of its own, so it is marked failed instead of being picked up
+    again by every later round.
+    """
+    errors = []
+    for source, target in zip(sources, targets):
+        try:
+            errors.append(get_pool(workers).submit(thumbnailer, source, target).result())
+        except BrokenProcessPool:
+            shutdown_pool()
+            errors.append('Thumbnail worker crashed on this image.')
+    return errors
+
+
+def generate_pending_thumbnails(batch_size=50, workers=None, thumbnailer=make_thumbnail):
+    """
+    Generate thumbnails for up to ``batch_size`` pending blobs; returns (done, failed).
+
+    ``thumbnailer`` is the function run per image; it must be importable by
+    the spawned workers.
+    """
+    blobs = list(StoredBlob.objects.filter(thumbnail_status='pending').order_by('created_at')[:batch_size])
+    if not blobs:
+        return 0, 0
+
+    sources = [attachment_storage.path(blob.name) for blob in blobs]
+    targets = [attachment_storage.path(thumbnail_name(blob.name)) for blob in blobs]
+    if workers == 1:
+        errors = list(map(thumbnailer, sources, targets))
+    else:
+        try:
+            errors = list(get_pool(workers).map(thumbnailer, sources, targets))
+        except BrokenProcessPool:
+            shutdown_pool()  # A worker died; find out which image did it
+            errors = _thumbnails_one_by_one(thumbnailer, sources, targets, workers)
+
+    done = failed = 0
+    for blob, error in zip(blobs, errors):
+        with transaction.atomic():
+            if error:
+                logger.warning(f"Thumbnail for {blob.name} failed: {error}")
+                StoredBlob.objects.filter(pk=blob.pk).update(thumbnail_status='failed')
+                failed += 1
+                continue
+            thumbnail = thumbnail_name(blob.name)
+            StoredBlob.objects.filter(pk=blob.pk).update(thumbnail=thumbnail, thumbnail_status='ready')
+            set_order_thumbnails(blob.name, thumbnail)
+            done += 1
+    return done, failed
@@ -0,0 +1,222 @@
+"""
+Two-tier cache backend: a small per-process LRU (L1) in front of a shared cache (L2).
+
+Only key families registered in L1_NAMESPACES ({name: key prefix}) use L1.
+These should be read-heavy, rarely written keys such as version stamps, API
+results, sessions and session users. Each registered namespace has a
+version stamp in L2, and a write to one of its keys replaces that stamp.
+Each process re-reads the stamps it uses at most every STAMP_CHECK_INTERVAL
+seconds, and ignores L1 entries filled under an older stamp. So a write or
+``invalidate_namespace`` reaches every worker's L1 within that interval,
+and only one small L2 read is needed per namespace.
+
+Every other key (template fragments, locks, ...) goes straight to L2. It
+is never copied into L1 and never invalidates anything.
+
+L1 entries also expire after L1_TIMEOUT seconds, which bounds how long a
+value can outlive its L2 expiry in a worker. Hit and miss counts per tier
+are kept for each process (``stats()``).
+
+CACHES = {
+    'shared': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache_table'},
+    'default': {
+        'BACKEND': 'home.tiered_cache.TieredCache',
+        'OPTIONS': {'L2_CACHE': 'shared', 'L1_NAMESPACES': {'pexels': 'pexels:'}},
+    },
+}
+"""
+import pickle
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_MISSING = object()
+
+
+class TieredCache(BaseCache):
+    """Per-process LRU cache backed by another (shared) cache alias."""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.l2_alias = options.get('L2_CACHE', 'shared')
+        self.l1_max_entries = int(options.get('L1_MAX_ENTRIES', 1000))
+        self.l1_timeout = float(options.get('L1_TIMEOUT', 60))
+        self.stamp_check_interval = float(options.get('STAMP_CHECK_INTERVAL', 1))
+        # Longest prefix first, so nested prefixes pick the most specific namespace
+        self.namespaces = sorted(
+            options.get('L1_NAMESPACES', {}).items(), key=lambda item: len(item[1]), reverse=True
+        )
+        self._l1 = OrderedDict()  # L1 key -> (pickled value, expires at, namespace stamp)
+        self._stamps = {}  # namespace -> (stamp, next check at)
+        self._stats = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    # Namespace stamps
+
+    def namespace(self, key):
+        """Registered namespace a key belongs to, or None (L2 only)."""
+        for name, prefix in self.namespaces:
+            if key.startswith(prefix):
+                return name
+        return None
+
+    def _stamp_key(self, namespace):
+        return f'tiered_stamp:{namespace}'
+
+    def _stamp(self, namespace):
+        now = time.monotonic()
+        cached = self._stamps.get(namespace)
+        if cached and now < cached[1]:
+            return cached[0]
+        self._stats['stamp_checks'] += 1
+        key = self._stamp_key(namespace)
+        stamp = self.l2.get(key)
+        if stamp is None:
+            self.l2.add(key, uuid.uuid4().hex, None)
+            stamp = self.l2.get(key)
+        self._stamps[namespace] = (stamp, now + self.stamp_check_interval)
+        return stamp
+
+    def invalidate_namespace(self, namespace):
+        """Make every worker's L1 entries for ``namespace`` stale; returns the new stamp."""
+        stamp = uuid.uuid4().hex
+        self.l2.set(self._stamp_key(namespace), stamp, None)
+        self._stamps[namespace] = (stamp, time.monotonic() + self.stamp_check_interval)
+        return stamp
+
+    # L1
+
+    def _l1_get(self, l1_key, stamp):
+        with self._lock:
+            entry = self._l1.get(l1_key)
+            if entry is None or entry[1] <= time.monotonic() or entry[2] != stamp:
+                return _MISSING
+            self._l1.move_to_end(l1_key)
+        return pickle.loads(entry[0])
+
+    def _l1_set(self, l1_key, value, timeout, stamp):
+        timeout = self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+        ttl = self.l1_timeout if timeout is None else min(timeout, self.l1_timeout)
+        if ttl <= 0:
+            self._l1_delete(l1_key)
+            return
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._l1[l1_key] = (pickled, time.monotonic() + ttl, stamp)
+            self._l1.move_to_end(l1_key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+                self._stats['l1_evictions'] += 1
+
+    def _l1_delete(self, l1_key):
+        with self._lock:
+            self._l1.pop(l1_key, None)
+
+    # Cache API
+
+    def get(self, key, default=None, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        namespace = self.namespace(key)
+        if namespace is not None:
+            stamp = self._stamp(namespace)
+            value = self._l1_get(l1_key, stamp)
+            if value is not _MISSING:
+                self._stats['l1_hits'] += 1
+                return value
+            self._stats['l1_misses'] += 1
+        value = self.l2.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._stats['l2_misses'] += 1
+            return default
+        self._stats['l2_hits'] += 1
+        if namespace is not None:
+            self._l1_set(l1_key, value, self.l1_timeout, stamp)
+        return value
+
+    def _written(self, key, version, value=_MISSING, timeout=DEFAULT_TIMEOUT):
+        """After an L2 write: move the key's namespace to a new stamp and refill L1."""
+        namespace = self.namespace(key)
+        if namespace is None:
+            return
+        l1_key = self.make_key(key, version=version)
+        stamp = self.invalidate_namespace(namespace)
+        if value is _MISSING:
+            self._l1_delete(l1_key)
+        else:
+            self._l1_set(l1_key, value, timeout, stamp)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.make_and_validate_key(key, version=version)
+        self.l2.set(key, value, timeout, version=version)
+        self._written(key, version, value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        """Write several keys with one new stamp per namespace, so they stay in L1 together."""
+        for key in data:
+            self.make_and_validate_key(key, version=version)
+        failed = self.l2.set_many(data, timeout, version=version)
+        stamps = {}
+        for key, value in data.items():
+            namespace = self.namespace(key)
+            if namespace is None or key in failed:
+                continue
+            if namespace not in stamps:
+                stamps[namespace] = self.invalidate_namespace(namespace)
+            self._l1_set(self.make_key(key, version=version), value, timeout, stamps[namespace])
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.make_and_validate_key(key, version=version)
+        if not self.l2.add(key, value, timeout, version=version):
+            return False
+        self._written(key, version, value, timeout)
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        self.make_and_validate_key(key, version=version)
+        value = self.l2.incr(key, delta, version=version)
+        self._written(key, version)
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.make_and_validate_key(key, version=version)
+        return self.l2.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.make_and_validate_key(key, version=version)
+        deleted = self.l2.delete(key, version=version)
+        self._written(key, version)
+        return deleted
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def clear(self):
+        self.l2.clear()
+        with self._lock:
+            self._l1.clear()
+        self._stamps.clear()
+
+    def stats(self):
+        """Hit/miss counts and hit ratios per tier for this process."""
+        def tier(name):
+            hits, misses = self._stats[f'{name}_hits'], self._stats[f'{name}_misses']
+            return {
+                'hits': hits,
+                'misses': misses,
+                'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+            }
+        return {
+            'l1': dict(tier('l1'), entries=len(self._l1), evictions=self._stats['l1_evictions']),
+            'l2': tier('l2'),
+            'stamp_checks': self._stats['stamp_checks'],
+        }
@@ -0,0 +1,263 @@
+"""
+Resumable, chunked order attachment uploads (a subset of the tus 1.0 protocol).
+
+A client creates an upload with its total length, then PATCHes the bytes in
+any number of chunks. After a dropped connection the client asks for the
+current offset (HEAD) and continues from there. When the last byte arrives
+the file is checked against the declared SHA-256, stored through the
+attachment storage and attached to the order.
+
+A PATCH first claims the upload at its offset with a short lease (one
+conditional UPDATE), so a second writer gets 423 instead of waiting. The
+body is then streamed in small blocks to a file of its own, outside any
+transaction, so worker memory stays flat and no row lock is held while the
+client sends. Finally the new offset is stored with a compare-and-set on
+the old offset and the lease; only if that succeeds does the chunk become
+the upload's segment for that offset. A writer whose lease ran out and was
+taken over loses the compare-and-set and its bytes are dropped. This works
+the same on SQLite, where select_for_update does nothing.
+"""
+import base64
+import binascii
+import hashlib
+import os
+import re
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from home.models import Order, UploadSession
+
+TUS_VERSION = '1.0.0'
+TUS_EXTENSIONS = 'creation,termination,checksum,expiration'
+TUS_CHECKSUM_ALGORITHMS = ('sha1', 'sha256', 'md5')
+
+UPLOAD_BLOCK_SIZE = 64 * 1024  # Bytes read from the request per write
+
+# Same formats as OrderForm's validate_file_type
+ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.pdf', '.doc', '.docx'}
+
+_SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class UploadError(Exception):
+    """A request the upload protocol rejects; ``status`` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_metadata(header):
+    """Decode a tus Upload-Metadata header ("key base64value,key2 base64value2")."""
+    metadata = {}
+    for pair in (header or '').split(','):
+        parts = pair.strip().split(' ')
+        if not parts[0]:
+            continue
+        try:
+            metadata[parts[0]] = base64.b64decode(parts[1]).decode() if len(parts) > 1 else ''
+        except (binascii.Error, UnicodeDecodeError):
+            raise UploadError(f'Invalid Upload-Metadata value for "{parts[0]}".')
+    return metadata
+
+
+def part_path(session):
+    """The assembled file, built from the segments once the upload is complete."""
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{session.pk}.part')
+
+
+def segment_path(session, offset):
+    # Zero-padded so the names sort in offset order
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{session.pk}.{offset:020d}.seg')
+
+
+def _upload_files(session):
+    prefix = f'{session.pk}.'
+    try:
+        names = os.listdir(settings.CHUNKED_UPLOAD_DIR)
+    except FileNotFoundError:
+        return []
+    return [os.path.join(settings.CHUNKED_UPLOAD_DIR, name) for name in names if name.startswith(prefix)]
+
+
+def expires_at(session):
+    return session.updated_at + timedelta(seconds=settings.CHUNKED_UPLOAD_EXPIRY)
+
+
+def create_upload(user, length, metadata):
+    """
+    Start an upload for one of the user's orders.
+
+    Args:
+        user: Uploading user
+        length: Upload-Length header value
+        metadata: Parsed Upload-Metadata; needs ``filename`` and ``order_id``,
+            ``checksum`` (hex SHA-256 of the whole file) is optional
+
+    Returns:
+        UploadSession
+    """
+    try:
+        length = int(length)
+    except (TypeError, ValueError):
+        raise UploadError('Upload-Length header is required.')
+    if length <= 0:
+        raise UploadError('Upload-Length must be positive.')
+    if length > settings.CHUNKED_UPLOAD_MAX_SIZE:
+        raise UploadError('File is larger than the maximum upload size.', status=413)
+
+    filename = os.path.basename(metadata.get('filename', '')).strip()
+    if not filename:
+        raise UploadError('Upload-Metadata must include a filename.')
+    if os.path.splitext(filename)[1].lower() not in ALLOWED_EXTENSIONS:
+        raise UploadError('Unsupported file type. Only images and documents are allowed.')
+
+    checksum = metadata.get('checksum', '').lower()
+    if checksum and not _SHA256_RE.match(checksum):
+        raise UploadError('checksum must be a hex SHA-256 digest.')
+
+    try:
+        order = Order.objects.get(pk=int(metadata.get('order_id', '')), user=user)
+    except (ValueError, Order.DoesNotExist):
+        raise UploadError('Upload-Metadata must include the order_id of one of your orders.', status=404)
+
+    session = UploadSession.objects.create(
+        user=user, order=order, filename=filename[:255], length=length, checksum=checksum
+    )
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    return session
+
+
+def _chunk_digest(header):
+    """Parse an Upload-Checksum header into (hash object, expected digest bytes)."""
+    try:
+        algorithm, value = header.split(' ', 1)
+        expected = base64.b64decode(value)
+    except (ValueError, binascii.Error):
+        raise UploadError('Invalid Upload-Checksum header.')
+    if algorithm not in TUS_CHECKSUM_ALGORITHMS:
+        raise UploadError(f'Unsupported checksum algorithm "{algorithm}".')
+    return hashlib.new(algorithm), expected
+
+
+def _release(session, token):
+    UploadSession.objects.filter(pk=session.pk, lease_token=token).update(lease_token='', lease_expires=None)
+
+
+def append_chunk(session, stream, offset, content_length, checksum_header=None):
+    """
+    Write one PATCH body at ``offset``; returns the order once the upload is complete.
+
+    Claims the upload, streams the body to its own file in UPLOAD_BLOCK_SIZE
+    blocks, then commits the new offset only if it is still the writer at
+    ``offset``. A chunk failing its Upload-Checksum is discarded, leaving
+    the offset where it was.
+    """
+    try:
+        offset = int(offset)
+        content_length = int(content_length or 0)
+    except ValueError:
+        raise UploadError('Upload-Offset and Content-Length must be integers.')
+    digest, expected = _chunk_digest(checksum_header) if checksum_header else (None, None)
+    if offset >= session.length:
+        raise UploadError('The upload is already complete.', status=409)
+    if offset + content_length > session.length:
+        raise UploadError('Chunk goes past Upload-Length.', status=413)
+
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    claimed = UploadSession.objects.filter(pk=session.pk, offset=offset).filter(
+        Q(lease_expires__isnull=True) | Q(lease_expires__lt=now)
+    ).update(lease_token=token, lease_expires=now + timedelta(seconds=settings.CHUNKED_UPLOAD_LEASE))
+    if not claimed:
+        session.refresh_from_db()
+        if offset != session.offset:
+            raise UploadError(f'Upload-Offset must be {session.offset}.', status=409)
+        raise UploadError('Another request is writing to this upload.', status=423)
+
+    chunk_path = f'{segment_path(session, offset)}.{token}'
+    written = 0
+    try:
+        with open(chunk_path, 'wb') as chunk:
+            while written < content_length:
+                block = stream.read(min(UPLOAD_BLOCK_SIZE, content_length - written))
+                if not block:
+                    break
+                chunk.write(block)
+                written += len(block)
+                if digest:
+                    digest.update(block)
+        if digest and digest.digest() != expected:
+            raise UploadError('Chunk checksum mismatch.', status=460)
+
+        updated_at = timezone.now()
+        with transaction.atomic():
+            committed = UploadSession.objects.filter(pk=session.pk, offset=offset, lease_token=token).update(
+                offset=offset + written, lease_token='', lease_expires=None, updated_at=updated_at
+            )
+            if committed:
+                # Renamed before the commit, so the next writer's claim cannot succeed first
+                os.replace(chunk_path, segment_path(session, offset))
+        if not committed:
+            raise UploadError('This chunk took too long and another request took over the upload.', status=409)
+    except BaseException:
+        _release(session, token)
+        try:
+            os.remove(chunk_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    session.offset, session.updated_at = offset + written, updated_at
+    if session.offset == session.length:
+        return finalize_upload(session)
+    return None
+
+
+def finalize_upload(session):
+    """Join the segments, verify the file, attach it to the order and clean up."""
+    path = part_path(session)
+    segments = sorted(name for name in _upload_files(session) if name.endswith('.seg'))
+    digest = hashlib.sha256()
+    with open(path, 'wb') as part:
+        for segment in segments:
+            with open(segment, 'rb') as chunk:
+                for block in iter(lambda: chunk.read(UPLOAD_BLOCK_SIZE), b''):
+                    part.write(block)
+                    digest.update(block)
+    if session.checksum and digest.hexdigest() != session.checksum:
+        delete_upload(session)
+        raise UploadError('File checksum mismatch; the upload was discarded.', status=460)
+
+    order = session.order
+    with open(path, 'rb') as part:
+        order.file.save(session.filename, File(part), save=False)
+    order.file_name = session.filename
+    order.save()
+    delete_upload(session)
+    return order
+
+
+def delete_upload(session):
+    """Discard an upload and its files."""
+    for path in _upload_files(session):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    session.delete()
+
+
+def clear_expired_uploads():
+    """Delete uploads idle for longer than CHUNKED_UPLOAD_EXPIRY; returns how many."""
+    cutoff = timezone.now() - timedelta(seconds=settings.CHUNKED_UPLOAD_EXPIRY)
+    expired = list(UploadSession.objects.filter(updated_at__lt=cutoff))
+    for session in expired:
+        delete_upload(session)
+    return len(expired)
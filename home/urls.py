@@ -14,14 +14,24 @@ urlpatterns = [
     path("logout/", views.logoutuser, name='logout'),
     path('signup/', views.signupUser, name='signup'),
     path("status/", views.status, name='status'),
+    path("status/events/", views.order_events, name='order_events'),
+    path("status/export/", views.export_orders, name='export_orders'),
     path("orders/", views.orders, name='orders'),
+    path("orders/import/", views.import_orders, name='import_orders'),
+    path("orders/<int:order_id>/attachment/", views.order_attachment, name='order_attachment'),
+    path("orders/<int:order_id>/thumbnail/", views.order_thumbnail, name='order_thumbnail'),
     path('success/', views.success, name='success'),
     path('search/', views.search, name='search'),
+    path('api/orders/changes/', views.order_changes, name='order_changes'),
+    path('api/cache-stats/', views.cache_stats, name='cache_stats'),
+    path('api/uploads/', views.uploads, name='uploads'),
+    path('api/uploads/<uuid:upload_id>/', views.upload_detail, name='upload_detail'),
     
     # User Profile URLs
     path('profile/', views.profile, name='profile'),
     path('profile/edit/', views.edit_profile, name='edit_profile'),
     path('profile/change-password/', views.change_password, name='change_password'),
+    path('profile/webhooks/', views.webhooks, name='webhooks'),
     
     # Password Reset URLs
     path('password-reset/', 
@@ -1,13 +1,13 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 import requests
 from datetime import datetime, date
 from django.contrib import messages
 from django.contrib.auth.models import User 
 from django.contrib.auth import logout, authenticate , login 
-from home.models import Contact, Order
+from home.models import Contact, Order, OrderLine, ServicePage, PartnerLogo, WebhookSubscription, UploadSession
 from django.contrib.auth.decorators import login_required
-from .forms import OrderForm
-from django.urls import reverse_lazy
+from .forms import OrderForm, OrderLineFormSet, WebhookSubscriptionForm, OrderImportForm
+from django.urls import reverse, reverse_lazy
 import os
 from django.core.cache import cache
 from django.conf import settings
@@ -19,15 +19,39 @@ from .email_utils import (
 )
 from django_ratelimit.decorators import ratelimit
 from .audit_utils import log_activity
-from django.db.models import Q
-from django.http import JsonResponse
+from .search_utils import fuzzy_search_orders
+from .webhooks import generate_secret
+from .export_utils import export_orders_response, EXPORT_FORMATS
+from .import_utils import import_orders_csv
+from .download_utils import protected_file_response
+from .upload_utils import (
+    TUS_VERSION, TUS_EXTENSIONS, TUS_CHECKSUM_ALGORITHMS, UploadError,
+    create_upload, append_chunk, delete_upload, parse_metadata, expires_at
+)
+from .cache_utils import get_cache_version, SERVICES_PAGE_NAMESPACE
+from .order_events import stream_order_events, changed_orders, format_cursor, format_event, parse_cursor
+from django.db import transaction
+from django.db.models import Q, Max, Count
+from django.http import JsonResponse, HttpResponse, HttpResponseNotAllowed, StreamingHttpResponse, Http404
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.http import condition
+from django.views.decorators.gzip import gzip_page
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+import hashlib
+import base64
+import io
+import json
 
 API_KEY = os.getenv('PEXELS_API_KEY', 'lwDW7CBQoNtS0iOxfGSzD2wQvnaAuGo7ikma5d2FPnBt7KrNPxqBDHVQ') 
 
 def fetch_random_images(query, num_images=8):
     """Fetch random images from Pexels API based on a query with caching."""
     # Create a cache-safe key by replacing spaces and special characters
-    cache_key = f'pexels_images_{query.replace(" ", "_")}_{num_images}'
+    cache_key = f'pexels:{query.replace(" ", "_")}_{num_images}'
     images = cache.get(cache_key)
     
     if images is not None:
@@ -62,33 +86,79 @@ def about(request):
     return render(request, 'about.html', {'random_images': random_images})
 
 
-def services(request):
-    """Display services page with configurable content."""
-    from home.models import ServicePage, PartnerLogo
-    
-    # Get or create service page content
-    service_page, created = ServicePage.objects.get_or_create(
-        defaults={
-            'title': 'Our Partners',
-            'heading': "Let's Collaborate",
-            'content': '''At Enterprises, we take pride in being the trusted thread supplier for leading brands such as Nishat Linen, Shahkam Industries, Outfitters, Leisure Club, Sadaqat Limited, Serena Fabrics, and Ayesha Fabrics. Whether for export or local production, we are dedicated to delivering high-quality thread in bulk or tailored to your specific requirements. Our commitment to timely delivery ensures that our partners receive their materials on schedule, every time, anywhere in Pakistan.
+DEFAULT_SERVICE_PAGE = {
+    'title': 'Our Partners',
+    'heading': "Let's Collaborate",
+    'content': '''At Enterprises, we take pride in being the trusted thread supplier for leading brands such as Nishat Linen, Shahkam Industries, Outfitters, Leisure Club, Sadaqat Limited, Serena Fabrics, and Ayesha Fabrics. Whether for export or local production, we are dedicated to delivering high-quality thread in bulk or tailored to your specific requirements. Our commitment to timely delivery ensures that our partners receive their materials on schedule, every time, anywhere in Pakistan.
 
 If you seek to establish a strategic partnership with a reliable supplier committed to excellence and customer satisfaction, we welcome the opportunity to connect. Our team is ready to discuss how we can provide customized solutions that align with your operational needs and enhance your product offerings.'''
-        }
-    )
-    
-    # Get active partner logos
-    partner_logos = PartnerLogo.objects.filter(is_active=True).order_by('order')
-    
+}
+
+
+def get_service_page():
+    """Get or create the singleton service page content."""
+    service_page, created = ServicePage.objects.get_or_create(defaults=DEFAULT_SERVICE_PAGE)
+    return service_page
+
+
+def services_etag(request):
+    return build_etag(request, 'services', get_cache_version(SERVICES_PAGE_NAMESPACE))
+
+
+@condition(etag_func=services_etag)
+def services(request):
+    """Display services page with configurable content."""
+    # Content and logos are rendered inside a fragment cached under the
+    # services_page version, so both are loaded lazily and only on a miss.
     return render(request, 'services.html', {
-        'service_page': service_page,
-        'partner_logos': partner_logos
+        'service_page': SimpleLazyObject(get_service_page),
+        'partner_logos': PartnerLogo.objects.filter(is_active=True).order_by('order'),
+        'content_version': get_cache_version(SERVICES_PAGE_NAMESPACE),
+        'content_cache_timeout': settings.CONTENT_CACHE_TIMEOUT,
     })
 
+def get_order_list_stamp(orders_list):
+    """
+    Summarize an order queryset as (latest updated_at, count) in one indexed query.
+
+    Any edit, soft delete or restore moves updated_at and any insert or hard
+    delete changes the count, so the pair identifies the list's current state.
+    """
+    stats = orders_list.aggregate(latest=Max('updated_at'), total=Count('id'))
+    return stats['latest'], stats['total']
+
+
+def get_user_order_stamp(request):
+    """Order list stamp for the current user, computed at most once per request."""
+    if not hasattr(request, '_order_list_stamp'):
+        request._order_list_stamp = get_order_list_stamp(Order.objects.filter(user=request.user))
+    return request._order_list_stamp
+
+
+def build_etag(request, *parts):
+    """
+    Build an ETag from the given parts, the viewer and pending flash messages.
+
+    Pages show the logged-in user and any queued messages, so both are part
+    of the tag; a page with a message to display is never answered with 304.
+    """
+    key = ':'.join(str(part) for part in (request.user.pk, len(messages.get_messages(request)), *parts))
+    return hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+
+
+def status_etag(request):
+    latest_update, total_orders = get_user_order_stamp(request)
+    return build_etag(request, 'status', request.GET.get('page', 1), latest_update, total_orders)
+
+
+# No Last-Modified: max(updated_at) stays put when an order is hard-deleted, so a client
+# revalidating with If-Modified-Since alone would get a stale 304. The ETag covers the count.
 @login_required(login_url='/login/')
+@condition(etag_func=status_etag)
 def status(request):
     """Display user's order history with status tracking and pagination."""
     orders_list = Order.objects.filter(user=request.user).order_by('-created_at')
+    latest_update, total_orders = get_user_order_stamp(request)
     
     # Pagination - 15 orders per page
     paginator = Paginator(orders_list, 15)
@@ -103,7 +173,99 @@ def status(request):
         # If page is out of range, deliver last page of results
         orders = paginator.page(paginator.num_pages)
     
-    return render(request, 'status.html', {'orders': orders})
+    return render(request, 'status.html', {
+        'orders': orders,
+        'latest_update': latest_update,
+        'total_orders': total_orders,
+        'content_cache_timeout': settings.CONTENT_CACHE_TIMEOUT,
+    })
+
+@login_required(login_url='/login/')
+async def order_events(request):
+    """Stream the user's order status changes as Server-Sent Events."""
+    user = await request.auser()
+    cursor = parse_cursor(request.headers.get('Last-Event-ID'))
+    
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(
+            stream_order_events(user.pk, cursor), content_type='text/event-stream'
+        )
+    else:
+        # WSGI workers can't hold idle connections: answer with the changes so
+        # far and let EventSource reconnect after the poll interval.
+        # The id line is the resume point when there are no events to carry one
+        events = await sync_to_async(changed_orders)(user.pk, cursor)
+        body = f'retry: {settings.ORDER_EVENTS_POLL_INTERVAL * 1000}\n{format_cursor(cursor)}\n'
+        body += ''.join(format_event(event) for event in events)
+        response = HttpResponse(body, content_type='text/event-stream')
+    
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable nginx response buffering
+    return response
+
+@login_required(login_url='/login/')
+def export_orders(request):
+    """Download all of the user's orders as CSV or NDJSON (?format=csv|ndjson)."""
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponse('Unsupported export format.', status=400)
+    return export_orders_response(Order.objects.filter(user=request.user), export_format)
+
+@login_required(login_url='/login/')
+def order_attachment(request, order_id):
+    """Download an order's attachment; only its owner (or staff) may fetch it."""
+    orders = Order.objects.all() if request.user.is_staff else Order.objects.filter(user=request.user)
+    order = get_object_or_404(orders, pk=order_id)
+    if not order.file:
+        raise Http404("This order has no attachment.")
+    try:
+        return protected_file_response(request, order.file.storage, order.file.name, filename=order.file_name)
+    except FileNotFoundError:
+        raise Http404("Attachment file is missing.")
+
+@login_required(login_url='/login/')
+def order_thumbnail(request, order_id):
+    """Small WebP preview of an order's image attachment (owner or staff only)."""
+    # Staff also get soft-deleted orders, which the order admin lists and previews
+    orders = Order.all_objects.all() if request.user.is_staff else Order.objects.filter(user=request.user)
+    order = get_object_or_404(orders, pk=order_id)
+    if not order.thumbnail:
+        raise Http404("No thumbnail for this order.")
+    try:
+        # Thumbnails are content-addressed, so browsers may keep them for a day
+        return protected_file_response(
+            request, order.file.storage, order.thumbnail, as_attachment=False, max_age=86400
+        )
+    except FileNotFoundError:
+        raise Http404("Thumbnail file is missing.")
+
+@login_required(login_url='/login/')
+@ratelimit(key='user', rate='10/h', method='POST', block=True)
+def import_orders(request):
+    """Create many orders at once from an uploaded CSV file."""
+    result = None
+    if request.method == 'POST':
+        form = OrderImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            result = import_orders_csv(request.user, stream, request=request, source=upload.name)
+            if result.created:
+                messages.success(request, f"{result.created} order(s) imported. A summary email has been sent.")
+            if result.read_error:
+                messages.error(
+                    request,
+                    f"{result.read_error}. The orders listed as imported were kept; "
+                    f"fix the file and import only the rows after that point."
+                )
+            if result.rejected:
+                messages.warning(request, f"{result.rejected} row(s) were rejected; see the details below.")
+        else:
+            messages.error(request, "Please correct the errors in the form")
+    else:
+        form = OrderImportForm()
+    
+    return render(request, 'import_orders.html', {'form': form, 'result': result})
 
 from .forms import OrderForm
 
@@ -114,10 +276,22 @@ def orders(request):
     
     if request.method == 'POST':
         form = OrderForm(request.POST, request.FILES)
-        if form.is_valid():
+        # Clients posting single-item orders may omit the line formset entirely
+        has_lines = 'lines-TOTAL_FORMS' in request.POST
+        line_formset = OrderLineFormSet(request.POST if has_lines else None, prefix='lines')
+        lines = line_formset.lines() if has_lines and line_formset.is_valid() else []
+        if lines:
+            form.fields['quantity'].required = False
+        if form.is_valid() and (not has_lines or line_formset.is_valid()):
             order = form.save(commit=False)
             order.user = request.user  # Link order to user
-            order.save()
+            if lines:
+                order.quantity = sum(line.quantity for line in lines)
+            with transaction.atomic():
+                order.save()
+                for line in lines:
+                    line.order = order
+                OrderLine.objects.bulk_create(lines)
             
             # Send order confirmation email
             send_order_confirmation_email(order, request)
@@ -128,8 +302,9 @@ def orders(request):
             messages.error(request, "Please correct the errors in the form")
     else:
         form = OrderForm()
+        line_formset = OrderLineFormSet(prefix='lines')
     
-    return render(request, 'orders.html', {'form': form})
+    return render(request, 'orders.html', {'form': form, 'line_formset': line_formset})
 
 
 
@@ -348,6 +523,34 @@ def edit_profile(request):
         'user': request.user
     })
 
+@login_required(login_url='/login/')
+def webhooks(request):
+    """Manage the user's order webhook endpoints."""
+    form = WebhookSubscriptionForm()
+    if request.method == 'POST':
+        if request.POST.get('action') == 'delete':
+            subscription_id = request.POST.get('subscription_id', '')
+            if not subscription_id.isdigit():
+                raise Http404("Webhook endpoint not found")
+            WebhookSubscription.objects.filter(user=request.user, pk=subscription_id).delete()
+            messages.success(request, "Webhook endpoint removed.")
+            return redirect('webhooks')
+        
+        form = WebhookSubscriptionForm(request.POST)
+        if form.is_valid():
+            subscription = form.save(commit=False)
+            subscription.user = request.user
+            subscription.secret = generate_secret()
+            subscription.save()
+            messages.success(request, "Webhook endpoint added. Use the secret shown to verify signatures.")
+            return redirect('webhooks')
+        messages.error(request, "Please correct the errors in the form")
+    
+    return render(request, 'webhooks.html', {
+        'form': form,
+        'subscriptions': WebhookSubscription.objects.filter(user=request.user),
+    })
+
 @login_required(login_url='/login/')
 def change_password(request):
     """Change user password."""
@@ -410,13 +613,26 @@ def ratelimit_error(request, exception=None):
     return render(request, 'ratelimit.html', status=429)
 
 
+def search_etag(request):
+    latest_update, total_orders = get_user_order_stamp(request)
+    return build_etag(
+        request, 'search', request.GET.get('q', '').strip(), request.GET.get('fuzzy') == '1',
+        request.GET.get('page', 1), latest_update, total_orders
+    )
+
+
 @login_required(login_url='/login/')
+@condition(etag_func=search_etag)
 def search(request):
     """Search for orders by title, client name, or description."""
     query = request.GET.get('q', '').strip()
+    fuzzy = request.GET.get('fuzzy') == '1'
     orders_list = []
     
-    if query:
+    if query and fuzzy:
+        # Trigram similarity on title/client name, ranked best match first
+        orders_list = fuzzy_search_orders(query, Order.objects.filter(user=request.user))
+    elif query:
         # Search across multiple fields using Q objects
         orders_list = Order.objects.filter(
             Q(user=request.user) &  # Only show user's own orders
@@ -443,8 +659,204 @@ def search(request):
     context = {
         'orders': orders,
         'query': query,
-        'total_results': orders_list.count() if query else 0
+        'fuzzy': fuzzy,
+        'total_results': paginator.count if query else 0
     }
     
     return render(request, 'search.html', context)
 
+
+# Fields returned by the order sync API for live orders
+SYNC_FIELDS = (
+    'id', 'title', 'description', 'priority', 'quantity', 'client_name',
+    'status', 'file', 'created_at', 'updated_at', 'is_deleted', 'deleted_at',
+)
+SYNC_PAGE_SIZE = 500
+SYNC_MAX_PAGE_SIZE = 2000
+SYNC_CHUNK_ROWS = 100  # Rows serialized per streamed chunk
+
+
+def encode_sync_cursor(updated_at, pk):
+    """Opaque cursor for the (updated_at, id) position of the last synced order."""
+    raw = f'{updated_at.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_sync_cursor(cursor):
+    """Return (updated_at, id) from a cursor, or None if it is malformed."""
+    try:
+        updated_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        updated_at = parse_datetime(updated_at)
+        return (updated_at, int(pk)) if updated_at else None
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def sync_record(row):
+    """Sync representation of an order row; soft-deleted orders become tombstones."""
+    if row['is_deleted']:
+        return {
+            'id': row['id'],
+            'is_deleted': True,
+            'deleted_at': row['deleted_at'],
+            'updated_at': row['updated_at'],
+        }
+    return row
+
+
+def stream_order_changes(rows, limit, cursor):
+    """Yield the sync response as JSON text, SYNC_CHUNK_ROWS records at a time."""
+    yield '{"orders": ['
+    buffer = []
+    count = 0
+    last = None
+    has_more = False
+    for row in rows:
+        if count == limit:
+            has_more = True
+            break
+        buffer.append(json.dumps(sync_record(row), cls=DjangoJSONEncoder))
+        last = row
+        count += 1
+        if len(buffer) == SYNC_CHUNK_ROWS:
+            yield ('' if count == len(buffer) else ',') + ','.join(buffer)
+            buffer = []
+    if buffer:
+        yield ('' if count == len(buffer) else ',') + ','.join(buffer)
+    if last:
+        cursor = encode_sync_cursor(last['updated_at'], last['id'])
+    yield f'], "next_cursor": {json.dumps(cursor)}, "has_more": {json.dumps(has_more)}}}'
+
+
+@gzip_page
+def order_changes(request):
+    """
+    Incremental order sync for client integrations.
+
+    Returns the user's orders changed after ``cursor`` (all orders when
+    omitted), oldest change first, including tombstones for soft-deleted
+    orders. Pass ``next_cursor`` from the response to fetch the next batch.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    
+    try:
+        limit = min(int(request.GET.get('limit', SYNC_PAGE_SIZE)), SYNC_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = SYNC_PAGE_SIZE
+    limit = max(limit, 1)
+    
+    cursor = request.GET.get('cursor', '')
+    changes = Order.all_objects.filter(user=request.user)
+    if cursor:
+        position = decode_sync_cursor(cursor)
+        if position is None:
+            return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+        updated_at, pk = position
+        changes = changes.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk))
+    
+    # Fetch one extra row to know whether another batch follows
+    rows = changes.order_by('updated_at', 'id').values(*SYNC_FIELDS)[:limit + 1].iterator(chunk_size=SYNC_CHUNK_ROWS)
+    return StreamingHttpResponse(
+        stream_order_changes(rows, limit, cursor or None),
+        content_type='application/json'
+    )
+
+
+def cache_stats(request):
+    """Cache hit ratios per tier for the worker answering the request (staff only)."""
+    if not request.user.is_staff:
+        raise Http404
+    stats = cache.stats() if hasattr(cache, 'stats') else {}
+    return JsonResponse({'backend': settings.CACHES['default']['BACKEND'], 'pid': os.getpid(), **stats})
+
+
+def _tus_response(status=204, headers=None, reason=None):
+    response = HttpResponse(status=status, reason=reason)
+    response['Tus-Resumable'] = TUS_VERSION
+    for name, value in (headers or {}).items():
+        response[name] = value
+    return response
+
+
+def _upload_error(error):
+    response = JsonResponse(
+        {'error': str(error)}, status=error.status,
+        reason='Checksum Mismatch' if error.status == 460 else None
+    )
+    response['Tus-Resumable'] = TUS_VERSION
+    return response
+
+
+def uploads(request):
+    """
+    Create a resumable attachment upload (tus "creation").
+
+    Send Upload-Length and Upload-Metadata (base64 ``filename``, ``order_id``
+    and optionally ``checksum``, the hex SHA-256 of the file), then PATCH the
+    bytes to the returned Location. OPTIONS describes what the server supports.
+    """
+    if request.method == 'OPTIONS':
+        return _tus_response(204, {
+            'Tus-Version': TUS_VERSION,
+            'Tus-Extension': TUS_EXTENSIONS,
+            'Tus-Max-Size': settings.CHUNKED_UPLOAD_MAX_SIZE,
+            'Tus-Checksum-Algorithm': ','.join(TUS_CHECKSUM_ALGORITHMS),
+        })
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST', 'OPTIONS'])
+    
+    try:
+        session = create_upload(
+            request.user,
+            request.headers.get('Upload-Length'),
+            parse_metadata(request.headers.get('Upload-Metadata'))
+        )
+    except UploadError as e:
+        return _upload_error(e)
+    return _tus_response(201, {
+        'Location': reverse('upload_detail', args=[session.pk]),
+        'Upload-Offset': 0,
+        'Upload-Expires': http_date(expires_at(session).timestamp()),
+    })
+
+
+def upload_detail(request, upload_id):
+    """Resume (HEAD), continue (PATCH) or cancel (DELETE) a resumable upload."""
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    session = UploadSession.objects.filter(pk=upload_id, user=request.user).first()
+    if session is None:
+        return _tus_response(404)
+    
+    if request.method == 'HEAD':
+        return _tus_response(200, {
+            'Upload-Offset': session.offset,
+            'Upload-Length': session.length,
+            'Upload-Expires': http_date(expires_at(session).timestamp()),
+            'Cache-Control': 'no-store',
+        })
+    if request.method == 'DELETE':
+        delete_upload(session)
+        return _tus_response(204)
+    if request.method != 'PATCH':
+        return HttpResponseNotAllowed(['HEAD', 'PATCH', 'DELETE'])
+    
+    if request.content_type != 'application/offset+octet-stream':
+        return _tus_response(415)
+    try:
+        order = append_chunk(
+            session,
+            request,
+            request.headers.get('Upload-Offset'),
+            request.META.get('CONTENT_LENGTH'),
+            request.headers.get('Upload-Checksum')
+        )
+    except UploadError as e:
+        return _upload_error(e)
+    headers = {'Upload-Offset': session.offset}
+    if order is None:
+        headers['Upload-Expires'] = http_date(expires_at(session).timestamp())
+    return _tus_response(204, headers)
@@ -0,0 +1,341 @@
+"""
+Order webhooks: outbox enqueueing and a batched, retrying delivery worker.
+
+Order changes are written to the WebhookDelivery outbox in the same
+transaction as the order itself. A worker (``manage.py deliver_webhooks``)
+claims due entries, POSTs them in signed batches per subscription over a
+pooled HTTP session, and reschedules failures with exponential backoff.
+Endpoints must resolve to public addresses, checked when subscribing and
+again before every delivery. Deliveries connect to the address that was
+checked and never follow redirects.
+"""
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import math
+import random
+import secrets
+import socket
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from home.models import WebhookSubscription, WebhookDelivery
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = 'X-Webhook-Signature'
+TIMESTAMP_HEADER = 'X-Webhook-Timestamp'
+
+
+def generate_secret():
+    """Random secret for signing a new subscription's payloads."""
+    return secrets.token_hex(32)
+
+
+class UnsafeEndpoint(ValueError):
+    """The webhook URL does not resolve to a public address."""
+
+
+def check_endpoint(url):
+    """
+    Resolve the URL's host and refuse non-public addresses.
+
+    Private, loopback, link-local, reserved and multicast addresses are
+    rejected so subscriptions cannot be used to reach internal services.
+    Returns the resolved addresses.
+    """
+    parts = urlsplit(url)
+    host = parts.hostname
+    if not host:
+        raise UnsafeEndpoint('The URL has no host.')
+    try:
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        infos = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)
+    except (OSError, UnicodeError, ValueError):
+        raise UnsafeEndpoint(f'{host} could not be resolved.')
+    addresses = {ipaddress.ip_address(info[4][0].split('%')[0]) for info in infos}
+    if settings.WEBHOOK_ALLOW_PRIVATE_ADDRESSES:
+        return addresses
+    for address in addresses:
+        if getattr(address, 'ipv4_mapped', None):
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise UnsafeEndpoint(f'{host} resolves to {address}, which is not a public address.')
+    return addresses
+
+
+class PinnedAddressAdapter(HTTPAdapter):
+    """
+    Connects to the address ``check_endpoint`` validated, not to a fresh DNS answer.
+
+    The URL's host is replaced by that IP. The original name is still sent
+    in the Host header and used for TLS SNI and certificate checks. A host
+    that rebinds its DNS between the check and the connect therefore cannot
+    redirect the request to an internal address.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._tls_hostname = threading.local()
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        address = min(check_endpoint(request.url), key=lambda a: (a.version, str(a)))  # IPv4 first
+        ip_host = f'[{address}]' if address.version == 6 else str(address)
+        request.headers['Host'] = parts.hostname + (f':{parts.port}' if parts.port else '')
+        request.url = urlunsplit(parts._replace(netloc=ip_host + (f':{parts.port}' if parts.port else '')))
+        self._tls_hostname.value = parts.hostname
+        try:
+            return super().send(request, **kwargs)
+        finally:
+            self._tls_hostname.value = None
+
+    def get_connection(self, url, proxies=None):
+        hostname = getattr(self._tls_hostname, 'value', None)
+        if hostname is None or not url.lower().startswith('https'):
+            return super().get_connection(url, proxies)
+        # Pools are keyed by these too, so each name gets its own pool per IP
+        return self.poolmanager.connection_from_url(
+            url, pool_kwargs={'server_hostname': hostname, 'assert_hostname': hostname}
+        )
+
+
+def sign_payload(secret, timestamp, body):
+    """
+    HMAC-SHA256 signature of ``"{timestamp}.{body}"``.
+
+    Receivers recompute it with their copy of the secret and should reject
+    stale timestamps to prevent replays.
+    """
+    message = f'{timestamp}.'.encode() + body
+    return 'sha256=' + hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def order_event_type(order, created):
+    """Webhook event type for an order save."""
+    if created:
+        return 'order.created'
+    if order.is_deleted:
+        return 'order.deleted'
+    if getattr(order, '_status_changed', False):
+        return 'order.status_changed'
+    return 'order.updated'
+
+
+def order_payload(order, event_type):
+    """JSON-ready webhook event for an order."""
+    return json.loads(json.dumps({
+        'type': event_type,
+        'occurred_at': timezone.now(),
+        'order': {
+            'id': order.id,
+            'title': order.title,
+            'client_name': order.client_name,
+            'quantity': order.quantity,
+            'priority': order.priority,
+            'status': order.status,
+            'is_deleted': order.is_deleted,
+            'updated_at': order.updated_at,
+        },
+    }, cls=DjangoJSONEncoder))
+
+
+def enqueue_order_event(order, event_type):
+    """Add an event to the outbox of every active subscription of the order's owner."""
+    return enqueue_order_events([order], event_type)
+
+
+def enqueue_order_events(orders, event_type):
+    """Outbox events for several orders with one subscription query and one insert."""
+    user_ids = {order.user_id for order in orders if order.user_id}
+    if not user_ids:
+        return 0
+    subscriptions = defaultdict(list)
+    for pk, user_id in WebhookSubscription.objects.filter(
+        user_id__in=user_ids, is_active=True
+    ).values_list('pk', 'user_id'):
+        subscriptions[user_id].append(pk)
+    if not subscriptions:
+        return 0
+    deliveries = [
+        WebhookDelivery(subscription_id=pk, event_type=event_type, payload=order_payload(order, event_type))
+        for order in orders
+        for pk in subscriptions.get(order.user_id, ())
+    ]
+    WebhookDelivery.objects.bulk_create(deliveries, batch_size=500)
+    return len(deliveries)
+
+
+def backoff_delay(attempts):
+    """Seconds before retry number ``attempts``: exponential, capped, with jitter."""
+    delay = min(settings.WEBHOOK_BACKOFF_BASE * (2 ** (attempts - 1)), settings.WEBHOOK_BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class WebhookDispatcher:
+    """
+    Delivers due outbox entries.
+
+    HTTP requests run on a thread pool sharing one pooled session. A batch
+    is only handed to the pool while its endpoint URL has fewer than
+    ``endpoint_concurrency`` requests in flight, so no pool thread waits on
+    a busy receiver and the time a round can take is bounded (see
+    ``lease_seconds``). All database work stays on the calling thread.
+    """
+
+    def __init__(self, workers=None, endpoint_concurrency=None, batch_size=None):
+        self.workers = workers or settings.WEBHOOK_WORKERS
+        self.endpoint_concurrency = endpoint_concurrency or settings.WEBHOOK_ENDPOINT_CONCURRENCY
+        self.batch_size = batch_size or settings.WEBHOOK_BATCH_SIZE
+        self.session = requests.Session()
+        self.session.trust_env = False  # No proxies from the environment: connect to the checked address
+        adapter = PinnedAddressAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = 'Enterprise-Webhooks/1.0'
+
+    def close(self):
+        self.session.close()
+
+    def plan_batches(self, deliveries):
+        """Per-subscription batches of at most ``batch_size``, grouped by endpoint URL."""
+        by_subscription = defaultdict(list)
+        for delivery in deliveries:
+            by_subscription[delivery.subscription_id].append(delivery)
+        by_endpoint = defaultdict(deque)
+        for group in by_subscription.values():
+            for i in range(0, len(group), self.batch_size):
+                by_endpoint[group[0].subscription.url].append(group[i:i + self.batch_size])
+        return by_endpoint
+
+    def lease_seconds(self, by_endpoint):
+        """
+        Upper bound on how long delivering ``by_endpoint`` can take.
+
+        Whenever a pool thread is idle, every endpoint with batches left is
+        at its concurrency limit, so the round ends within
+        ceil(batches / workers) + the most ceil(endpoint batches / endpoint
+        concurrency) over endpoints requests, each bounded by the timeout.
+        """
+        if not by_endpoint:
+            return 0
+        total = sum(len(batches) for batches in by_endpoint.values())
+        rounds = math.ceil(total / self.workers) + max(
+            math.ceil(len(batches) / self.endpoint_concurrency) for batches in by_endpoint.values()
+        )
+        return rounds * settings.WEBHOOK_TIMEOUT * 3
+
+    def claim_due(self, limit=500):
+        """
+        Lease up to ``limit`` due deliveries so concurrent workers skip them.
+
+        The lease covers the whole round, including batches queued behind
+        others for the same endpoint.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            due = WebhookDelivery.objects.filter(
+                status='pending', next_attempt_at__lte=now
+            ).filter(
+                Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+            ).order_by('next_attempt_at', 'id')
+            if connection.features.has_select_for_update_skip_locked:
+                due = due.select_for_update(skip_locked=True, of=('self',))
+            deliveries = list(due.select_related('subscription')[:limit])
+            lease = self.lease_seconds(self.plan_batches(deliveries))
+            WebhookDelivery.objects.filter(pk__in=[d.pk for d in deliveries]).update(
+                locked_until=now + timedelta(seconds=lease)
+            )
+        return deliveries
+
+    def post_batch(self, subscription, deliveries):
+        """POST one signed batch; returns an error message, or '' on success."""
+        body = json.dumps({'events': [d.payload for d in deliveries]}).encode()
+        timestamp = str(int(time.time()))
+        headers = {
+            'Content-Type': 'application/json',
+            TIMESTAMP_HEADER: timestamp,
+            SIGNATURE_HEADER: sign_payload(subscription.secret, timestamp, body),
+        }
+        try:
+            # The adapter re-checks the address (DNS may have changed) and connects to it.
+            # Redirects are not followed: they could point anywhere, including internal hosts.
+            response = self.session.post(
+                subscription.url, data=body, headers=headers, timeout=settings.WEBHOOK_TIMEOUT,
+                allow_redirects=False
+            )
+        except (UnsafeEndpoint, requests.RequestException) as e:
+            return str(e)[:500]
+        if 200 <= response.status_code < 300:
+            return ''
+        if response.is_redirect:
+            return f'HTTP {response.status_code} redirect to {response.headers.get("Location", "")[:200]} not followed'
+        return f'HTTP {response.status_code}'
+
+    def deliver_due(self):
+        """Deliver one round of due events; returns (delivered, failed) counts."""
+        deliveries = self.claim_due()
+        if not deliveries:
+            return 0, 0
+
+        by_endpoint = self.plan_batches(deliveries)
+        results = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            running = {}
+
+            def start(url):
+                batch = by_endpoint[url].popleft()
+                running[executor.submit(self.post_batch, batch[0].subscription, batch)] = (url, batch)
+
+            for url, batches in by_endpoint.items():
+                for _ in range(min(self.endpoint_concurrency, len(batches))):
+                    start(url)
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, batch = running.pop(future)
+                    results.append((batch, future.result()))
+                    if by_endpoint[url]:
+                        start(url)
+
+        now = timezone.now()
+        delivered, failed = [], []
+        for batch, error in results:
+            for delivery in batch:
+                delivery.attempts += 1
+                delivery.locked_until = None
+                if not error:
+                    delivery.status = 'delivered'
+                    delivery.delivered_at = now
+                    delivery.last_error = ''
+                    delivered.append(delivery)
+                else:
+                    delivery.last_error = error
+                    if delivery.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+                        delivery.status = 'failed'
+                    else:
+                        delivery.next_attempt_at = now + timedelta(seconds=backoff_delay(delivery.attempts))
+                    failed.append(delivery)
+            if error:
+                logger.warning(f"Webhook batch of {len(batch)} to {batch[0].subscription.url} failed: {error}")
+
+        WebhookDelivery.objects.bulk_update(
+            delivered + failed,
+            ['status', 'attempts', 'locked_until', 'delivered_at', 'last_error', 'next_attempt_at'],
+            batch_size=500
+        )
+        return len(delivered), len(failed)